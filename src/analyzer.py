@@ -0,0 +1,371 @@
+# analyzer.py
+# Lógica de análise por frame (Haar + MediaPipe + EAR + piscos + RiskModel),
+# separada da UI para poder rodar tanto no loop sequencial quanto no modo
+# em pipeline (threads de captura / inferência / render).
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils import ear_batch
+from risk_model import RiskModel
+from metrics import METRICS
+
+# ---- Landmarks dos olhos (MediaPipe FaceMesh) ----
+LEFT  = [33,160,158,133,153,144]
+RIGHT = [263,387,385,362,380,373]
+EYE_IDX = LEFT + RIGHT                      # 12 pontos, na ordem de ear_batch
+
+# ---- Parâmetros de anti-ruído ----
+EAR_SMOOTH_N     = 5       # média móvel do EAR (frames)
+CLOSED_MIN_S     = 0.12    # duração mínima "fechado" para contar piscar
+REFRACTORY_S     = 0.80    # intervalo mínimo entre piscos
+EAR_HYST         = 0.03    # histerese entre fechar/abrir
+
+# ---- Agendamento do Haar (o estágio mais caro em CPUs fracas) ----
+# "full":    Haar no frame inteiro, sempre (comportamento original)
+# "every_n": com o FaceMesh rastreando, Haar no frame inteiro a cada N frames
+# "roi":     com o FaceMesh rastreando, Haar a cada N frames só na ROI do
+#            rosto (bbox dos landmarks) e em escala reduzida
+HAAR_MODES       = ("full", "every_n", "roi")
+HAAR_EVERY_N     = 5       # intervalo (frames) entre execuções com rosto rastreado
+TRACK_MIN_FRAMES = 3       # frames seguidos com landmarks p/ considerar "rastreando"
+ROI_MARGIN       = 0.25    # margem ao redor da bbox dos landmarks (fração)
+ROI_TARGET_W     = 160     # largura (px) da ROI reduzida enviada ao Haar
+HAAR_MIN_WIN     = 24      # janela mínima do haarcascade_frontalface_default
+FACE_BOX_SCALE   = 2.2     # largura do rosto ~ 2,2x a distância entre os cantos dos olhos
+
+# ---- Resolução de inferência ----
+# Haar e FaceMesh rodam numa cópia reduzida do frame (largura INFER_WIDTH);
+# retângulos e pontos dos olhos voltam para as coordenadas do frame original.
+INFER_WIDTH      = 0       # 0 = resolução completa da câmera
+
+# spans por estágio (/metrics); no-ops com ALERTABET_METRICS=0
+_SP_RESIZE = METRICS.span("resize")
+_SP_RGB    = METRICS.span("cvt_rgb")
+_SP_MESH   = METRICS.span("mesh")
+_SP_HAAR   = METRICS.span("haar")
+_SP_EAR    = METRICS.span("ear")
+
+
+@dataclass
+class FrameResult:
+    """Resultado da análise de um frame (tudo que a UI/API precisa)."""
+    seq: int
+    ts: float                                   # timestamp de captura
+    have_face: bool = False
+    haar: str = "full"                          # "full" | "roi" | "skip"
+    faces: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    eye_pts: Optional[np.ndarray] = None        # (12, 2) float32, px de exibição
+    ear: float = 0.0                            # EAR suavizado
+    ear_raw: float = 0.0                        # EAR instantâneo do frame
+    # todos os rostos com landmarks (sessões): id do tracker e EAR instantâneo
+    face_ids: List[str] = field(default_factory=list)
+    face_ears: Optional[np.ndarray] = None      # (K,) float32
+    face_boxes: Optional[np.ndarray] = None     # (K, 4) int32 x,y,w,h (aprox., p/ identificação)
+    blink_rate: float = 0.0
+    blink_count: int = 0
+    minutes_on: float = 0.0
+    risky: bool = False
+
+
+def face_boxes_from_eyes(eyes: np.ndarray, W: int, H: int) -> np.ndarray:
+    """
+    Caixa aproximada do rosto (x, y, w, h) a partir dos pontos dos olhos
+    (K, 12, 2): barata, sem percorrer os 478 landmarks.
+    """
+    c = eyes.mean(axis=1)
+    span = eyes[:, :, 0].max(axis=1) - eyes[:, :, 0].min(axis=1)
+    w = span * FACE_BOX_SCALE
+    h = w * 1.25
+    x0 = np.clip(c[:, 0] - w / 2, 0, W - 1)
+    y0 = np.clip(c[:, 1] - h * 0.4, 0, H - 1)
+    x1 = np.clip(c[:, 0] + w / 2, 0, W)
+    y1 = np.clip(c[:, 1] + h * 0.6, 0, H)
+    return np.stack([x0, y0, x1 - x0, y1 - y0], axis=1).astype(np.int32)
+
+
+def load_face_cascade():
+    """Carrega o Haar Cascade frontal que vem com o OpenCV."""
+    path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise FileNotFoundError(f"Não consegui carregar o Haar Cascade em {path}")
+    return cascade
+
+
+def open_face_mesh(static_image_mode: bool = False, max_num_faces: int = 1):
+    """FaceMesh com os parâmetros do app (usar como context manager)."""
+    # silencia os logs do TF/MediaPipe (precisa vir antes do 1º import)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    os.environ.setdefault("GLOG_minloglevel", "2")
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode, refine_landmarks=True,
+        max_num_faces=max_num_faces,
+        min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+def eye_points(lm, W: int, H: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Copia os 12 landmarks dos olhos (EYE_IDX) para um array (12, 2) float32
+    em px de exibição, sem arredondar. 'out' permite reaproveitar o buffer.
+    """
+    if out is None:
+        out = np.empty((len(EYE_IDX), 2), dtype=np.float32)
+    for k, i in enumerate(EYE_IDX):
+        p = lm[i]
+        out[k, 0] = p.x
+        out[k, 1] = p.y
+    out *= (W, H)
+    return out
+
+
+def ear_from_landmarks(lm, W: int, H: int, out: Optional[np.ndarray] = None):
+    """EAR médio dos dois olhos em coordenadas de exibição (W x H)."""
+    eyes = eye_points(lm, W, H, out)
+    return float(ear_batch(eyes)), eyes
+
+
+class FrameAnalyzer:
+    """
+    Processa frames EM ORDEM usando o timestamp de captura (não o relógio
+    do momento da inferência), para que o estado de piscos e o RiskModel
+    fiquem corretos mesmo quando a inferência roda em outra thread.
+    """
+    def __init__(self, face_cascade, mesh, model: RiskModel | None = None,
+                 haar_mode: str = "roi", haar_every_n: int = HAAR_EVERY_N,
+                 infer_width: int = INFER_WIDTH, tracker=None):
+        if haar_mode not in HAAR_MODES:
+            raise ValueError(f"haar_mode inválido: {haar_mode!r} (use {HAAR_MODES})")
+        self.face_cascade = face_cascade
+        self.mesh = mesh
+        self.model = model or RiskModel()
+
+        self.haar_mode = haar_mode
+        self.haar_every_n = max(1, int(haar_every_n))
+        self._track_len: int = 0             # frames seguidos com landmarks
+        self._since_haar: int = 0            # frames desde o último Haar
+        self._last_faces: List[Tuple[int, int, int, int]] = []  # coords de inferência
+
+        self.infer_width = max(0, int(infer_width or 0))
+
+        self.blink_count: int = 0
+        self._ear_hist: List[float] = []
+        self._eyes = np.empty((1, len(EYE_IDX), 2), dtype=np.float32)  # buffer reaproveitado (K rostos)
+        self.tracker = tracker   # sessions.FaceTracker (opcional, p/ vários rostos)
+        self._bufs: dict = {}    # buffers de imagem reaproveitados (ver _scratch)
+        self._is_closed: bool = False
+        self._closed_start_t: float | None = None
+        self._last_blink_t: float = 0.0
+        # ajustáveis pela config (ver _configure)
+        self.ear_smooth_n: int = EAR_SMOOTH_N
+        self.refractory_s: float = REFRACTORY_S
+        self._params = None      # último params aplicado
+
+        # reset pedido por outra thread (tecla R / POST /reset)
+        self._reset_req = threading.Event()
+
+    # -------- controle --------
+    def request_reset(self) -> None:
+        """Agenda um reset para o próximo frame (seguro entre threads)."""
+        self._reset_req.set()
+
+    def _apply_reset(self) -> None:
+        self.blink_count = 0
+        self.model.reset_counters()
+
+    def _configure(self, params) -> None:
+        """Aplica o que não muda por frame só quando os params mudam (nova versão da config)."""
+        self.model.set_risk_minutes(params["risk_minutes"])
+        if "blink_rate_hi" in params:
+            self.model.cfg.blink_rate_hi = float(params["blink_rate_hi"])
+        self.ear_smooth_n = int(params.get("EAR_smooth_n", EAR_SMOOTH_N))
+        self.refractory_s = float(params.get("refractory_s", REFRACTORY_S))
+        self._params = params
+
+    def _scratch(self, key: str, shape) -> np.ndarray:
+        """
+        Buffer uint8 reaproveitado entre frames, usado como dst= do OpenCV.
+        É uma view contígua de um bloco que só cresce, então ROIs de tamanho
+        variável também não alocam em regime.
+        """
+        n = int(np.prod(shape))
+        buf = self._bufs.get(key)
+        if buf is None or buf.size < n:
+            buf = self._bufs[key] = np.empty(n, dtype=np.uint8)
+        return buf[:n].reshape(shape)
+
+    # -------- passo por frame --------
+    def process(self, frame, ts: float, params: dict, seq: int = 0) -> FrameResult:
+        """Analisa 'frame' (BGR, não é modificado) capturado em 'ts'."""
+        if self._reset_req.is_set():
+            self._reset_req.clear()
+            self._apply_reset()
+
+        if params is not self._params and params != self._params:
+            self._configure(params)
+        ear_low  = params["EAR_thr"]
+        ear_high = ear_low + EAR_HYST
+
+        res = FrameResult(seq=seq, ts=ts)
+
+        # ---- resolução de inferência (s = fator inferência / exibição) ----
+        H, W = frame.shape[:2]
+        small, s = frame, 1.0
+        if self.infer_width and W > self.infer_width:
+            s = self.infer_width / float(W)
+            h = max(1, int(round(H * s)))
+            with _SP_RESIZE:
+                small = cv2.resize(frame, (self.infer_width, h),
+                                   dst=self._scratch("small", (h, self.infer_width, 3)),
+                                   interpolation=cv2.INTER_AREA)
+
+        # ---- MediaPipe (landmarks); o FaceMesh copia a imagem, o buffer pode ser reusado ----
+        with _SP_RGB:
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self._scratch("rgb", small.shape))
+        with _SP_MESH:
+            mp_res = self.mesh.process(rgb)
+        lm = mp_res.multi_face_landmarks[0].landmark if mp_res.multi_face_landmarks else None
+
+        # ---- Haar (retângulos de rosto), agendado pelo rastreio do FaceMesh ----
+        with _SP_HAAR:
+            faces, res.haar = self._detect_faces(small, lm, params, s)
+        if s != 1.0:
+            inv = 1.0 / s
+            faces = [(int(x * inv), int(y * inv), int(w * inv), int(h * inv))
+                     for (x, y, w, h) in faces]
+        res.faces = faces
+
+        # considera rosto presente se HAAR OU MediaPipe detectarem
+        res.have_face = (lm is not None) or (len(res.faces) > 0)
+
+        ear = 0.0
+        if lm is not None:
+            # landmarks são normalizados: mapeia direto p/ o frame de exibição;
+            # todos os rostos num só array (K, 12, 2) e um único ear_batch
+            all_lm = mp_res.multi_face_landmarks
+            if self._eyes.shape[0] < len(all_lm):
+                self._eyes = np.empty((len(all_lm), len(EYE_IDX), 2), dtype=np.float32)
+            eyes = self._eyes[:len(all_lm)]
+            with _SP_EAR:
+                for k, face in enumerate(all_lm):
+                    eye_points(face.landmark, W, H, eyes[k])
+                ears = np.atleast_1d(ear_batch(eyes))
+            ear_inst = float(ears[0])
+            res.eye_pts = eyes[0].copy()   # o resultado pode ir para outra thread
+            res.ear_raw = ear_inst
+            if self.tracker is not None:
+                centers = eyes.mean(axis=1) / (W, H)
+                res.face_ids = self.tracker.assign(centers)
+                res.face_ears = ears.astype(np.float32)
+                res.face_boxes = face_boxes_from_eyes(eyes, W, H)
+
+            # EAR suavizado
+            self._ear_hist = (self._ear_hist + [ear_inst])[-self.ear_smooth_n:]
+            ear = sum(self._ear_hist) / len(self._ear_hist)
+        res.ear = ear
+
+        self._update_blink(ear, ts, ear_low, ear_high)
+
+        # ---- risco (passa se há rosto) ----
+        risky, rate, mins = self.model.update(face_present=res.have_face, t=ts)
+        res.risky, res.blink_rate, res.minutes_on = risky, rate, mins
+        res.blink_count = self.blink_count
+        return res
+
+    # -------- Haar --------
+    def _detect_faces(self, frame, lm, params: dict, s: float = 1.0):
+        """
+        Decide se/onde rodar o Haar. Sem rastreio confiável do FaceMesh faz
+        varredura completa; com rastreio, roda a cada N frames (no frame todo
+        ou só na ROI) e reaproveita o último resultado nos demais.
+        'frame' já está na resolução de inferência; 's' ajusta o minSize.
+        """
+        self._track_len = self._track_len + 1 if lm is not None else 0
+        tracking = self._track_len >= TRACK_MIN_FRAMES
+
+        if self.haar_mode == "full" or not tracking:
+            faces, kind = self._haar_full(frame, params, s), "full"
+        else:
+            self._since_haar += 1
+            if self._since_haar < self.haar_every_n:
+                return self._last_faces, "skip"
+            if self.haar_mode == "roi":
+                faces, kind = self._haar_roi(frame, lm, params, s), "roi"
+            else:
+                faces, kind = self._haar_full(frame, params, s), "full"
+
+        self._since_haar = 0
+        self._last_faces = faces
+        return faces, kind
+
+    def _haar_full(self, frame, params: dict, s: float = 1.0):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._scratch("gray", frame.shape[:2]))
+        ms = params["minSize"] if s == 1.0 else max(HAAR_MIN_WIN, int(params["minSize"] * s))
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=params["scaleFactor"],
+            minNeighbors=params["minNeighbors"],
+            minSize=(ms, ms),
+        )
+        return [tuple(int(v) for v in f) for f in faces]
+
+    def _haar_roi(self, frame, lm, params: dict, s: float = 1.0):
+        """Haar só na bbox (com margem) dos landmarks, reduzida p/ ROI_TARGET_W."""
+        H, W = frame.shape[:2]
+        xy = np.array([(p.x, p.y) for p in lm], dtype=np.float32)
+        (nx0, ny0), (nx1, ny1) = xy.min(axis=0), xy.max(axis=0)
+        bw, bh = (nx1 - nx0) * W, (ny1 - ny0) * H
+        x0 = int(max(0, nx0 * W - bw * ROI_MARGIN))
+        y0 = int(max(0, ny0 * H - bh * ROI_MARGIN))
+        x1 = int(min(W, nx1 * W + bw * ROI_MARGIN))
+        y1 = int(min(H, ny1 * H + bh * ROI_MARGIN))
+        if x1 - x0 < HAAR_MIN_WIN or y1 - y0 < HAAR_MIN_WIN:
+            return self._haar_full(frame, params, s)
+
+        gray = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY,
+                            dst=self._scratch("roi", (y1 - y0, x1 - x0)))
+        scale = min(1.0, ROI_TARGET_W / float(x1 - x0))
+        if scale < 1.0:
+            rw = max(1, int(round((x1 - x0) * scale)))
+            rh = max(1, int(round((y1 - y0) * scale)))
+            gray = cv2.resize(gray, (rw, rh), dst=self._scratch("roi_small", (rh, rw)),
+                              interpolation=cv2.INTER_AREA)
+        ms = max(HAAR_MIN_WIN, int(params["minSize"] * s * scale))
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=params["scaleFactor"],
+            minNeighbors=params["minNeighbors"],
+            minSize=(ms, ms),
+        )
+        # volta para coordenadas do frame de inferência
+        inv = 1.0 / scale
+        return [(x0 + int(fx * inv), y0 + int(fy * inv), int(fw * inv), int(fh * inv))
+                for (fx, fy, fw, fh) in faces]
+
+    def _update_blink(self, ear: float, tnow: float, ear_low: float, ear_high: float) -> None:
+        """Máquina de estados de piscos robustos (fechado -> aberto)."""
+        # entrou no estado "olho fechado"
+        if not self._is_closed and ear < ear_low:
+            self._is_closed = True
+            self._closed_start_t = tnow
+
+        # saiu do estado "fechado" e voltou a abrir
+        elif self._is_closed and ear > ear_high:
+            closed_dur = (tnow - (self._closed_start_t or tnow))
+            enough_duration = closed_dur >= CLOSED_MIN_S   # 0.12s ~ 3-4 frames
+            enough_gap      = (tnow - self._last_blink_t) >= self.refractory_s  # 0.8s (padrão)
+
+            if enough_duration and enough_gap:
+                self.blink_count += 1
+                self._last_blink_t = tnow
+                self.model.note_blink(tnow)
+
+            self._is_closed = False
+            self._closed_start_t = None
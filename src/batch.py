@@ -0,0 +1,242 @@
+# batch.py
+# Análise offline (sem janelas) de vídeos gravados ou sequências de imagens,
+# com a mesma lógica do app ao vivo (Haar + FaceMesh + EAR + RiskModel), mas
+# no relógio da mídia e o mais rápido que a CPU permitir. Vários arquivos
+# rodam em paralelo (um processo por arquivo). Rodar a partir de src/:
+#
+#   python batch.py sessao1.mp4 sessao2.mp4 --out resultados/
+#   python batch.py frames_dir/ --fps 30 --ear-thr 0.19 --risk-minutes 10
+#   python batch.py arquivo/*.mp4 --workers 6 --format parquet
+#
+# Saída: um arquivo por fonte (<nome>.npz ou <nome>.parquet) com as séries
+# por frame: t, have_face, faces, ear_raw, ear, blink, blink_count,
+# blink_rate, minutes_on, risky.
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from analyzer import FrameAnalyzer, load_face_cascade, open_face_mesh
+from risk_model import RiskModel
+from utils import DEFAULT_PARAMS
+
+IMAGE_EXT = {".jpg", ".jpeg", ".png", ".bmp"}
+FORMATS = ("npz", "parquet")
+
+
+# ---------------- fontes ----------------
+def iter_source(path: str, fps: float = 30.0) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    (timestamp de mídia em s, frame BGR) de um vídeo ou de uma pasta de
+    imagens (ordem alfabética, 'fps' define o espaçamento).
+    """
+    if os.path.isdir(path):
+        files = sorted(f for f in os.listdir(path) if os.path.splitext(f)[1].lower() in IMAGE_EXT)
+        for i, name in enumerate(files):
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                yield i / fps, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Não consegui abrir: {path}")
+    vfps = cap.get(cv2.CAP_PROP_FPS) or fps
+    frame, i = None, 0
+    try:
+        while True:
+            ok, frame = cap.read(image=frame)
+            if not ok:
+                break
+            ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            yield (ms / 1000.0 if ms > 0 or i == 0 else i / vfps), frame
+            i += 1
+    finally:
+        cap.release()
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Aceita arquivos, pastas de imagens e padrões glob (o cmd do Windows não expande '*')."""
+    out = []
+    for p in inputs:
+        matches = sorted(glob.glob(p)) if any(c in p for c in "*?[") else [p]
+        out.extend(matches)
+    return out
+
+
+def output_stems(paths: List[str]) -> Dict[str, str]:
+    """
+    Nome de saída (sem extensão) por entrada: o nome do arquivo/pasta; se ele
+    se repetir (a/cam.mp4 e b/cam.mp4), o caminho relativo à pasta comum
+    ("a__cam"), e com a extensão se ainda assim repetir (cam.mp4 e cam.avi).
+    ValueError se sobrar colisão: nenhuma saída sobrescreve outra.
+    """
+    full = {p: os.path.abspath(os.path.normpath(p)) for p in paths}
+    stems = {p: os.path.splitext(os.path.basename(full[p]))[0] for p in paths}
+    for keep_ext in (False, True):
+        counts = Counter(stems.values())
+        dup = [p for p in paths if counts[stems[p]] > 1]
+        if not dup:
+            return stems
+        try:
+            root = os.path.commonpath([os.path.dirname(full[p]) for p in dup])
+        except ValueError:   # drives diferentes (Windows)
+            root = None
+        for p in dup:
+            rel = os.path.relpath(full[p], root) if root else full[p].replace(":", "")
+            rel = rel if keep_ext else os.path.splitext(rel)[0]
+            stems[p] = rel.strip(os.sep).replace(os.sep, "__")
+    counts = Counter(stems.values())
+    clash = sorted(p for p in paths if counts[stems[p]] > 1)
+    if clash:
+        raise ValueError("entradas com o mesmo nome de saída: " + ", ".join(clash))
+    return stems
+
+
+# ---------------- análise de uma fonte ----------------
+def analyze_source(path: str, params: dict, model_kw: dict, haar_mode: str = "roi",
+                   infer_width: int = 0, fps: float = 30.0) -> Dict[str, np.ndarray]:
+    """Roda o pipeline completo sobre 'path' e devolve as séries por frame."""
+    cols = {k: [] for k in ("t", "have_face", "faces", "ear_raw", "ear", "blink",
+                            "blink_count", "blink_rate", "minutes_on", "risky")}
+    frames = iter_source(path, fps)
+    first = next(frames, None)
+    cascade = load_face_cascade()
+    # relógio do modelo = mídia: parte do 1º timestamp, nada de perf_counter
+    t_first = first[0] if first is not None else 0.0
+    model = RiskModel(clock=lambda: t_first, **model_kw)
+    with open_face_mesh() as mesh:
+        an = FrameAnalyzer(cascade, mesh, model, haar_mode=haar_mode, infer_width=infer_width)
+        prev = 0
+        src = itertools.chain([first], frames) if first is not None else ()
+        for seq, (ts, frame) in enumerate(src, 1):
+            r = an.process(frame, ts, params, seq)
+            cols["t"].append(ts)
+            cols["have_face"].append(r.have_face)
+            cols["faces"].append(len(r.faces))
+            cols["ear_raw"].append(r.ear_raw if r.eye_pts is not None else np.nan)
+            cols["ear"].append(r.ear)
+            cols["blink"].append(r.blink_count > prev)
+            cols["blink_count"].append(r.blink_count)
+            cols["blink_rate"].append(r.blink_rate)
+            cols["minutes_on"].append(r.minutes_on)
+            cols["risky"].append(r.risky)
+            prev = r.blink_count
+
+    dtypes = {"t": np.float64, "have_face": bool, "faces": np.int16, "ear_raw": np.float32,
+              "ear": np.float32, "blink": bool, "blink_count": np.int32,
+              "blink_rate": np.float32, "minutes_on": np.float32, "risky": bool}
+    return {k: np.asarray(v, dtype=dtypes[k]) for k, v in cols.items()}
+
+
+def write_series(series: Dict[str, np.ndarray], out_path: str, meta: dict, fmt: str = "npz") -> str:
+    """Grava as séries em NPZ (sempre disponível) ou Parquet (requer pyarrow)."""
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Formato parquet requer pyarrow (pip install pyarrow)")
+        table = pa.table(series).replace_schema_metadata({"alertabet": json.dumps(meta)})
+        path = out_path + ".parquet"
+        pq.write_table(table, path)
+    else:
+        path = out_path + ".npz"
+        np.savez_compressed(path, meta=json.dumps(meta), **series)
+    return path
+
+
+def _job(path: str, out_dir: str, stem: str, opts: dict) -> dict:
+    """Tarefa de um processo: analisa, grava e devolve um resumo."""
+    t0 = time.perf_counter()
+    series = analyze_source(path, opts["params"], opts["model_kw"], opts["haar_mode"],
+                            opts["infer_width"], opts["fps"])
+    elapsed = time.perf_counter() - t0
+    n = len(series["t"])
+    risky_idx = np.flatnonzero(series["risky"])
+    summary = {
+        "source": path,
+        "frames": n,
+        "media_s": float(series["t"][-1]) if n else 0.0,
+        "blinks": int(series["blink_count"][-1]) if n else 0,
+        "face_frames": int(series["have_face"].sum()),
+        "risky_frames": int(len(risky_idx)),
+        "first_risk_t": float(series["t"][risky_idx[0]]) if len(risky_idx) else None,
+        "proc_fps": n / elapsed if elapsed > 0 else 0.0,
+    }
+    meta = {**summary, "params": opts["params"], "model": opts["model_kw"],
+            "haar_mode": opts["haar_mode"], "infer_width": opts["infer_width"]}
+    summary["output"] = write_series(series, os.path.join(out_dir, stem), meta, opts["format"])
+    return summary
+
+
+# ---------------- CLI ----------------
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Análise offline de sessões gravadas (Alerta Bet BR)")
+    ap.add_argument("inputs", nargs="+", help="vídeos, pastas de imagens ou padrões glob")
+    ap.add_argument("--out", default="batch_out", help="pasta de saída")
+    ap.add_argument("--format", choices=FORMATS, default="npz")
+    ap.add_argument("--workers", type=int, default=0, help="processos em paralelo (0 = nº de CPUs)")
+    ap.add_argument("--fps", type=float, default=30.0, help="fps das sequências de imagens")
+    ap.add_argument("--haar-mode", default="roi", help="modo do Haar (ver analyzer.HAAR_MODES)")
+    ap.add_argument("--infer-width", type=int, default=0, help="largura de inferência (0 = original)")
+    # limiares (para re-pontuar sessões com outros valores)
+    ap.add_argument("--ear-thr", type=float, default=DEFAULT_PARAMS["EAR_thr"])
+    ap.add_argument("--risk-minutes", type=float, default=DEFAULT_PARAMS["risk_minutes"])
+    ap.add_argument("--blink-rate-hi", type=float, default=60.0, help="piscos/min p/ risco")
+    ap.add_argument("--blink-window-s", type=float, default=15.0)
+    ap.add_argument("--warmup-s", type=float, default=5.0)
+    args = ap.parse_args(argv)
+
+    paths = list(dict.fromkeys(expand_inputs(args.inputs)))
+    if not paths:
+        print("[ERRO] Nenhuma entrada encontrada")
+        return 2
+    try:
+        stems = output_stems(paths)
+    except ValueError as e:
+        print("[ERRO]", e)
+        return 2
+    opts = {
+        "params": {**DEFAULT_PARAMS, "EAR_thr": args.ear_thr, "risk_minutes": args.risk_minutes,
+                   "blink_rate_hi": args.blink_rate_hi},
+        "model_kw": {"blink_rate_hi": args.blink_rate_hi, "blink_window_s": args.blink_window_s,
+                     "warmup_s": args.warmup_s},
+        "haar_mode": args.haar_mode,
+        "infer_width": args.infer_width,
+        "fps": args.fps,
+        "format": args.format,
+    }
+    workers = max(1, min(len(paths), args.workers or os.cpu_count() or 1))
+
+    t0 = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futs = {pool.submit(_job, p, args.out, stems[p], opts): p for p in paths}
+        for fut in as_completed(futs):
+            try:
+                s = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"[ERRO] {futs[fut]}: {e}")
+                continue
+            risk = f"{s['first_risk_t']:.1f}s" if s["first_risk_t"] is not None else "-"
+            print(f"[OK] {s['source']}: {s['frames']} frames ({s['media_s']:.0f}s de mídia), "
+                  f"{s['blinks']} piscos, 1º risco {risk}, {s['proc_fps']:.0f} fps -> {s['output']}")
+    print(f"[INFO] {len(paths) - failed}/{len(paths)} fontes em {time.perf_counter() - t0:.1f}s "
+          f"com {workers} processos")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,496 @@
+# bench.py
+# Benchmarks do pipeline de detecção (rodar a partir de src/).
+#
+#   python bench.py scale --video clip.mp4 --widths 0,640,480,320
+#   python bench.py scale --camera 0 --frames 300 --json scale.json
+#   python bench.py alloc --video clip.mp4 --frames 1000
+#   python bench.py stages --video clip.mp4 --json stages.json
+#   python bench.py stages --synthetic 200 --size 1280x720
+#   python bench.py startup --repeat 5 --camera 0
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from analyzer import (FrameAnalyzer, load_face_cascade, open_face_mesh,
+                      eye_points, EYE_IDX)
+from frame_ring import SharedFrameRing
+from risk_model import RiskModel
+from utils import DEFAULT_PARAMS, ear_batch, panel, badge, big_alert, label_value
+
+
+# ---------------- fontes de frames ----------------
+def load_frames(video=None, camera=None, max_frames=300):
+    """
+    Lê até 'max_frames' frames (vídeo ou câmera) para a memória, junto com
+    o timestamp de mídia (s). Todos os cenários do benchmark veem os mesmos frames.
+    """
+    cap = cv2.VideoCapture(video) if video else cv2.VideoCapture(int(camera or 0))
+    if not cap.isOpened():
+        raise RuntimeError(f"Não consegui abrir a fonte: {video or camera}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames, stamps = [], []
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        ms = cap.get(cv2.CAP_PROP_POS_MSEC) if video else 0.0
+        stamps.append(ms / 1000.0 if ms > 0 else len(frames) / fps)
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError("Nenhum frame lido da fonte")
+    return frames, stamps
+
+
+def synthetic_frames(n=200, size=(1280, 720), fps=30.0, seed=0):
+    """
+    Frames sintéticos determinísticos (ruído + gradiente + um 'rosto' claro
+    que se move): mesmo conteúdo em toda execução, sem precisar de vídeo.
+    """
+    W, H = size
+    rng = np.random.default_rng(seed)
+    base = np.linspace(40, 200, W, dtype=np.float32)[None, :, None].repeat(H, 0).repeat(3, 2)
+    frames, stamps = [], []
+    for i in range(n):
+        f = base + rng.normal(0, 8, size=(H, W, 3)).astype(np.float32)
+        cx = int(W * (0.4 + 0.2 * np.sin(i / 25.0)))
+        cv2.ellipse(f, (cx, H // 2), (W // 10, H // 5), 0, 0, 360, (200, 190, 180), -1)
+        frames.append(np.clip(f, 0, 255).astype(np.uint8))
+        stamps.append(i / fps)
+    return frames, stamps
+
+
+def _print_table(rows, cols):
+    print("  ".join(f"{c:>12}" for c in cols))
+    for r in rows:
+        cells = []
+        for c in cols:
+            v = r.get(c, "")
+            cells.append(f"{v:>12.4f}" if isinstance(v, float) else f"{v!s:>12}")
+        print("  ".join(cells))
+
+
+# ---------------- scale: FPS e erro do EAR por resolução ----------------
+def bench_scale(frames, stamps, widths, haar_mode="full", warmup=10):
+    """
+    Roda o FrameAnalyzer em cada largura de inferência e compara o EAR
+    instantâneo (ear_raw) com a referência em resolução completa (largura 0).
+    """
+    cascade = load_face_cascade()
+    widths = [0] + [w for w in widths if w]  # referência sempre primeiro
+    full_w = frames[0].shape[1]
+    ref = None
+    rows = []
+
+    for w in widths:
+        ears = np.full(len(frames), np.nan, dtype=np.float64)
+        times = np.zeros(len(frames), dtype=np.float64)
+        with open_face_mesh() as mesh:
+            an = FrameAnalyzer(cascade, mesh, haar_mode=haar_mode, infer_width=w)
+            for i, (frame, ts) in enumerate(zip(frames, stamps)):
+                t0 = time.perf_counter()
+                r = an.process(frame, ts, DEFAULT_PARAMS, i)
+                times[i] = time.perf_counter() - t0
+                if r.eye_pts is not None:
+                    ears[i] = r.ear_raw
+
+        timed = times[warmup:] if len(times) > warmup else times
+        row = {
+            "width": int(w or full_w),
+            "fps": float(len(timed) / max(1e-9, timed.sum())),
+            "ms_p50": float(np.percentile(timed, 50) * 1000.0),
+            "face_frames": int(np.isfinite(ears).sum()),
+        }
+        if ref is None:
+            ref = ears
+        else:
+            both = np.isfinite(ref) & np.isfinite(ears)
+            err = np.abs(ears[both] - ref[both])
+            row["ear_mae"] = float(err.mean()) if err.size else float("nan")
+            row["ear_p95"] = float(np.percentile(err, 95)) if err.size else float("nan")
+            row["ear_max"] = float(err.max()) if err.size else float("nan")
+        rows.append(row)
+    return rows
+
+
+def cmd_scale(args):
+    frames, stamps = load_frames(args.video, args.camera, args.frames)
+    widths = [int(w) for w in args.widths.split(",") if w.strip()]
+    rows = bench_scale(frames, stamps, widths, haar_mode=args.haar_mode)
+    _print_table(rows, ["width", "fps", "ms_p50", "face_frames", "ear_mae", "ear_p95", "ear_max"])
+    return {"bench": "scale", "frames": len(frames), "haar_mode": args.haar_mode, "rows": rows}
+
+
+# ---------------- stages: latência por estágio ----------------
+def _latency_row(stage, samples_s):
+    """p50/p95/p99 (ms) e frames/s de um estágio."""
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    return {
+        "stage": stage,
+        "n": int(ms.size),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "fps": float(1000.0 / ms.mean()) if ms.size and ms.mean() > 0 else float("inf"),
+    }
+
+
+def _time_each(fn, items, warmup=5, before=None):
+    """Tempo de fn(item) para cada item; 'before(item)' roda fora da medição."""
+    for it in items[:warmup]:
+        if before is not None:
+            before(it)
+        fn(it)
+    out = np.empty(len(items), dtype=np.float64)
+    for i, it in enumerate(items):
+        if before is not None:
+            before(it)
+        t0 = time.perf_counter()
+        fn(it)
+        out[i] = time.perf_counter() - t0
+    return out
+
+
+HAAR_GRID = {
+    "scaleFactor": (1.1, 1.2, 1.3),
+    "minNeighbors": (4, 6),
+    "minSize": (60, 100),
+}
+
+
+def bench_stages(frames, stamps, haar_grid=HAAR_GRID):
+    """
+    Repassa os mesmos frames por cada estágio isoladamente, na ordem do app:
+    conversões de cor, Haar (grade de parâmetros), FaceMesh, EAR,
+    RiskModel.update e o desenho da UI (panel/badge/big_alert).
+    """
+    rows = []
+    H, W = frames[0].shape[:2]
+    gray_buf = np.empty((H, W), dtype=np.uint8)
+    rgb_buf = np.empty((H, W, 3), dtype=np.uint8)
+
+    rows.append(_latency_row("cvt_gray", _time_each(
+        lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2GRAY, dst=gray_buf), frames)))
+    rows.append(_latency_row("cvt_rgb", _time_each(
+        lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2RGB, dst=rgb_buf), frames)))
+
+    # Haar: grade de parâmetros sobre os frames já em cinza
+    cascade = load_face_cascade()
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    for sf in haar_grid["scaleFactor"]:
+        for mn in haar_grid["minNeighbors"]:
+            for ms in haar_grid["minSize"]:
+                fn = lambda g: cascade.detectMultiScale(g, scaleFactor=sf, minNeighbors=mn,
+                                                        minSize=(ms, ms))
+                rows.append(_latency_row(f"haar sf={sf} mn={mn} ms={ms}", _time_each(fn, grays)))
+
+    # FaceMesh (modo vídeo, frames em ordem) e os olhos encontrados
+    rgbs = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+    results = []
+    with open_face_mesh() as mesh:
+        rows.append(_latency_row("mesh.process", _time_each(
+            lambda r: results.append(mesh.process(r)), rgbs, warmup=0)))
+    eyes = [eye_points(r.multi_face_landmarks[0].landmark, W, H)
+            for r in results if r.multi_face_landmarks]
+    if not eyes:
+        # sem rosto (ex.: frames sintéticos): pontos fixos só p/ medir o EAR
+        rng = np.random.default_rng(0)
+        eyes = [rng.uniform(0, (W, H), size=(len(EYE_IDX), 2)).astype(np.float32)
+                for _ in range(len(frames))]
+    rows.append(_latency_row("ear", _time_each(ear_batch, eyes)))
+
+    # RiskModel.update no relógio da mídia (com um pisco a cada ~3 s)
+    model = RiskModel(clock=lambda: 0.0)
+    def risk_step(i):
+        if i % 90 == 0:
+            model.note_blink(stamps[i])
+        model.update(True, t=stamps[i])
+    rows.append(_latency_row("risk.update", _time_each(risk_step, list(range(len(stamps))))))
+
+    # desenho da UI sobre uma cópia (restaurada fora da medição)
+    work = np.empty_like(frames[0])
+    restore = lambda f: np.copyto(work, f)
+    def ui_panel(_):
+        panel(work, 10, 50, 240, 220, 0.55)
+        label_value(work, "EAR", "0.250", 24, 150)
+    rows.append(_latency_row("panel", _time_each(ui_panel, frames, before=restore)))
+    rows.append(_latency_row("badge", _time_each(
+        lambda _: badge(work, "RISCO", 24, 234), frames, before=restore)))
+    rows.append(_latency_row("big_alert", _time_each(
+        lambda _: big_alert(work, pulse=0.5), frames, before=restore)))
+    return rows
+
+
+def cmd_stages(args):
+    if args.synthetic:
+        W, H = (int(v) for v in args.size.lower().split("x"))
+        frames, stamps = synthetic_frames(args.synthetic, (W, H))
+        source = f"synthetic:{args.synthetic}@{W}x{H}"
+    else:
+        frames, stamps = load_frames(args.video, args.camera, args.frames)
+        source = args.video or f"camera:{args.camera or 0}"
+    rows = bench_stages(frames, stamps)
+    _print_table(rows, ["stage", "n", "p50_ms", "p95_ms", "p99_ms", "fps"])
+    H, W = frames[0].shape[:2]
+    return {
+        "bench": "stages",
+        "source": source,
+        "frames": len(frames),
+        "resolution": [W, H],
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "rows": rows,
+    }
+
+
+# ---------------- alloc: alocações por frame (tracemalloc) ----------------
+class _LoopingSource:
+    """Câmera ou vídeo em loop (volta ao início no fim), para N frames contínuos."""
+    def __init__(self, video=None, camera=None):
+        self.video = video
+        self.cap = cv2.VideoCapture(video) if video else cv2.VideoCapture(int(camera or 0))
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Não consegui abrir a fonte: {video or camera}")
+
+    def read(self, image=None):
+        ok, img = self.cap.read(image=image)
+        if not ok and self.video:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, img = self.cap.read(image=image)
+        return ok, img
+
+    def release(self):
+        self.cap.release()
+
+
+def measure_alloc(step, frames=1000, warmup=30):
+    """
+    Roda step() sob tracemalloc. Por frame, mede o pico de memória Python/NumPy
+    acima do início do frame (o que foi alocado, mesmo que liberado depois).
+    Retorna bytes alocados, nº de alocações do tamanho de um frame e o
+    crescimento retido, tudo normalizado para 1000 frames.
+    """
+    for _ in range(warmup):
+        step()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    total, big, frame_bytes = 0, 0, 0
+    for _ in range(frames):
+        cur0 = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        frame_bytes = step() or frame_bytes
+        peak = tracemalloc.get_traced_memory()[1]
+        total += peak - cur0
+        if frame_bytes and peak - cur0 >= frame_bytes // 2:
+            big += 1
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    k = 1000.0 / frames
+    return {
+        "kb_per_1000": float(total * k / 1024.0),
+        "frame_allocs_per_1000": float(big * k),
+        "retained_kb": float(retained / 1024.0),
+    }
+
+
+def bench_alloc(source, frames=1000, process=False, haar_mode="roi", infer_width=0):
+    """
+    Compara cap.read() (aloca um frame por leitura) com o anel de frames em
+    shared memory (cap.read(image=slot)); com process=True inclui
+    FrameAnalyzer.process (que já reaproveita os buffers de cvtColor/resize).
+    """
+    ok, first = source.read()
+    if not ok:
+        raise RuntimeError("Nenhum frame lido da fonte")
+    ring = SharedFrameRing(first.shape, 1)
+    cascade = load_face_cascade() if process else None
+    rows = []
+
+    def run(name, use_ring, mesh=None):
+        an = FrameAnalyzer(cascade, mesh, haar_mode=haar_mode, infer_width=infer_width) if mesh else None
+        seq = [0]
+
+        def step():
+            if use_ring:
+                ok, slot = ring.read(source)
+                frame = ring.frames[slot] if slot is not None else None
+            else:
+                (ok, frame), slot = source.read(), None
+            if not ok or frame is None:
+                raise RuntimeError("Fonte parou de entregar frames")
+            if an is not None:
+                seq[0] += 1
+                an.process(frame, time.perf_counter(), DEFAULT_PARAMS, seq[0])
+            ring.release(slot)
+            return frame.nbytes
+
+        t0 = time.perf_counter()
+        row = {"scenario": name, **measure_alloc(step, frames)}
+        row["fps"] = float((frames + 30) / (time.perf_counter() - t0))
+        rows.append(row)
+
+    run("read", False)
+    run("read_ring", True)
+    if process:
+        for name, use_ring in (("process", False), ("process_ring", True)):
+            with open_face_mesh() as mesh:
+                run(name, use_ring, mesh)
+    ring.close()
+    return rows
+
+
+def cmd_alloc(args):
+    source = _LoopingSource(args.video, args.camera)
+    try:
+        rows = bench_alloc(source, args.frames, process=args.process,
+                           haar_mode=args.haar_mode, infer_width=args.infer_width)
+    finally:
+        source.release()
+    _print_table(rows, ["scenario", "kb_per_1000", "frame_allocs_per_1000", "retained_kb", "fps"])
+    return {"bench": "alloc", "frames": args.frames, "process": args.process, "rows": rows}
+
+
+# ---------------- startup: partida a frio (processos novos) ----------------
+# Cada cenário roda num interpretador novo (como o quiosque ao ligar) e
+# imprime o tempo medido depois de _MARK. {port}/{cam}/{cache} são trocados.
+_MARK = "@@startup "
+_STARTUP_SNIPPETS = {
+    "import_main": "import main",
+    "import_cv2": "import cv2",
+    "face_mesh": "from analyzer import open_face_mesh\nopen_face_mesh().close()",
+    "api_ready": (
+        "import urllib.request\n"
+        "import integration\n"
+        "integration.run_in_thread(port={port})\n"
+        "while True:\n"
+        "    try:\n"
+        "        urllib.request.urlopen('http://127.0.0.1:{port}/status', timeout=0.2); break\n"
+        "    except Exception:\n"
+        "        time.sleep(0.005)"
+    ),
+    # o mesmo caminho do main(): API e FaceMesh em 2º plano enquanto a câmera abre
+    "boot": (
+        "import main\n"
+        "from concurrent.futures import ThreadPoolExecutor\n"
+        "with ThreadPoolExecutor(2) as pool:\n"
+        "    api = pool.submit(main.load_api, port={port})\n"
+        "    mesh = pool.submit(main.open_face_mesh)\n"
+        "    cam = main.open_camera([{cam}], cache_path={cache!r}) if {cam} >= 0 else None\n"
+        "    api.result(); mesh.result().close()\n"
+        "    if cam is not None: cam.release()"
+    ),
+    "camera_probe": "from camera import open_camera\nopen_camera([{cam}], cache_path=None).release()",
+    "camera_cached": "from camera import open_camera\nopen_camera([{cam}], cache_path={cache!r}).release()",
+}
+
+
+def _time_snippet(code: str, timeout_s: float = 120.0) -> float:
+    """Roda 'code' num processo novo (cwd = src/) e devolve os segundos medidos lá dentro."""
+    prog = f"import time\n_t0 = time.perf_counter()\n{code}\nprint({_MARK!r} + repr(time.perf_counter() - _t0), flush=True)\n"
+    out = subprocess.run([sys.executable, "-c", prog], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, timeout=timeout_s)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith(_MARK):
+            return float(line[len(_MARK):])
+    raise RuntimeError(f"cenário falhou:\n{out.stderr.strip()[-800:]}")
+
+
+def bench_startup(repeat=5, camera=None, port=8765):
+    """Mediana/mín./máx. (ms) de cada cenário de partida, em processos novos."""
+    names = ["import_cv2", "import_main", "face_mesh", "api_ready"]
+    if camera is not None:
+        names += ["camera_probe", "camera_cached"]
+    names.append("boot")
+    cache = os.path.join(tempfile.mkdtemp(prefix="alertabet_"), "last_camera.json")
+    if camera is not None:
+        _time_snippet(f"from camera import open_camera\nopen_camera([{camera}], cache_path={cache!r}).release()")
+
+    rows = []
+    for name in names:
+        code = _STARTUP_SNIPPETS[name].format(port=port, cam=-1 if camera is None else camera,
+                                              cache=cache)
+        ts = []
+        for i in range(repeat):
+            try:
+                ts.append(_time_snippet(code))
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                print(f"[WARN] {name}: {e}")
+                break
+            if name in ("api_ready", "boot"):
+                port += 1   # porta nova: a anterior pode estar em TIME_WAIT
+        if not ts:
+            continue
+        ms = np.array(ts) * 1e3
+        rows.append({"scenario": name, "n": len(ts), "p50_ms": round(float(np.median(ms)), 1),
+                     "min_ms": round(float(ms.min()), 1), "max_ms": round(float(ms.max()), 1)})
+    return rows
+
+
+def cmd_startup(args):
+    rows = bench_startup(args.repeat, args.camera, args.port)
+    _print_table(rows, ["scenario", "n", "p50_ms", "min_ms", "max_ms"])
+    return {"bench": "startup", "repeat": args.repeat, "camera": args.camera,
+            "python": sys.version.split()[0], "opencv": cv2.__version__, "rows": rows}
+
+
+# ---------------- CLI ----------------
+def _add_common_args(p):
+    p.add_argument("--json", help="grava o resultado em JSON neste arquivo")
+
+
+def _add_source_args(p):
+    _add_common_args(p)
+    p.add_argument("--video", help="arquivo de vídeo (recomendado: resultados reproduzíveis)")
+    p.add_argument("--camera", type=int, help="índice da câmera (se não houver --video)")
+    p.add_argument("--frames", type=int, default=300, help="máximo de frames lidos")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks do Alerta Bet BR")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("scale", help="FPS e erro do EAR por resolução de inferência")
+    _add_source_args(p)
+    p.add_argument("--widths", default="640,480,320", help="larguras (px) separadas por vírgula")
+    p.add_argument("--haar-mode", default="full", help="modo do Haar (ver analyzer.HAAR_MODES)")
+    p.set_defaults(fn=cmd_scale)
+
+    p = sub.add_parser("stages", help="p50/p95/p99 por estágio (conversões, Haar, FaceMesh, EAR, risco, UI)")
+    _add_source_args(p)
+    p.add_argument("--synthetic", type=int, default=0, help="usa N frames sintéticos em vez de vídeo/câmera")
+    p.add_argument("--size", default="1280x720", help="resolução dos frames sintéticos (LxA)")
+    p.set_defaults(fn=cmd_stages)
+
+    p = sub.add_parser("alloc", help="alocações por 1000 frames: cap.read() vs anel em shared memory")
+    _add_source_args(p)
+    p.set_defaults(frames=1000)
+    p.add_argument("--process", action="store_true", help="inclui FrameAnalyzer.process no passo")
+    p.add_argument("--haar-mode", default="roi", help="modo do Haar (ver analyzer.HAAR_MODES)")
+    p.add_argument("--infer-width", type=int, default=0, help="largura de inferência (0 = original)")
+    p.set_defaults(fn=cmd_alloc)
+
+    p = sub.add_parser("startup", help="partida a frio: imports, FaceMesh, API pronta, câmera (processos novos)")
+    _add_common_args(p)
+    p.add_argument("--repeat", type=int, default=5, help="processos por cenário")
+    p.add_argument("--camera", type=int, help="índice da câmera (sem ele, os cenários de câmera ficam de fora)")
+    p.add_argument("--port", type=int, default=8765, help="1ª porta livre para os cenários da API")
+    p.set_defaults(fn=cmd_startup)
+
+    args = ap.parse_args(argv)
+    out = args.fn(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+        print("Resultado salvo em", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# camera.py
+# Abertura da webcam com fallback de APIs/índices, sem travar a partida:
+#  - o último par (índice, backend) que funcionou fica em data/last_camera.json
+#    e é testado primeiro (no quiosque, quase sempre basta ele);
+#  - senão os índices são testados em paralelo (uma thread por índice, que
+#    tenta os backends em ordem: dois backends no MESMO dispositivo ao mesmo
+#    tempo costumam brigar pela câmera);
+#  - cada teste (abrir + 1º cap.read()) tem prazo; um driver travado é
+#    abandonado (thread daemon) e conta como falha.
+# A prioridade continua a mesma de antes: DirectShow em todos os índices,
+# depois o backend padrão.
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "last_camera.json")
+PROBE_TIMEOUT_S = 3.0
+DEFAULT_INDICES = (0, 1, 2, 3)
+CACHE_MAX = 8            # pares lembrados (multi-câmera: um por índice)
+
+Candidate = Tuple[int, int]   # (índice, backend); backend 0 = CAP_ANY
+
+_cache_lock = threading.Lock()
+
+
+def candidates(indices: Optional[Sequence[int]] = None) -> List[Candidate]:
+    """Pares (índice, backend) em ordem de prioridade."""
+    try_indices = list(indices) if indices else list(DEFAULT_INDICES)
+    out: List[Candidate] = []
+    # 1) DirectShow primeiro (costuma evitar o bug do MSMF); 2) backend padrão.
+    # (CAP_ANY == 0: o antigo 3º grupo "qualquer backend" repetia o 2º)
+    for api in (cv2.CAP_DSHOW, cv2.CAP_ANY):
+        for idx in try_indices:
+            if (idx, api) not in out:
+                out.append((idx, api))
+    return out
+
+
+def _open(idx: int, api: int) -> Optional[cv2.VideoCapture]:
+    cap = cv2.VideoCapture(idx, api) if api != 0 else cv2.VideoCapture(idx)
+    if cap.isOpened():
+        # testa leitura real (alguns “abrem” mas não entregam frames)
+        ok, _ = cap.read()
+        if ok:
+            return cap
+    cap.release()
+    return None
+
+
+# ---------------- cache do último par que funcionou ----------------
+def _read_cache(path: Optional[str]) -> List[Candidate]:
+    if not path:
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [(int(i), int(a)) for i, a in json.load(f).get("working", [])]
+    except (OSError, ValueError, TypeError, AttributeError):
+        return []
+
+
+def _remember(path: Optional[str], cand: Candidate) -> None:
+    if not path:
+        return
+    with _cache_lock:
+        working = [c for c in _read_cache(path) if c != cand]
+        working.insert(0, cand)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"working": [list(c) for c in working[:CACHE_MAX]]}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("[WARN] Não consegui gravar o cache da câmera:", e)
+
+
+# ---------------- teste em paralelo ----------------
+class _Probe:
+    """Resultados dos testes; quem chega depois do vencedor solta a câmera."""
+    def __init__(self, cands: List[Candidate]):
+        self.cands = cands
+        self.result: Dict[Candidate, Optional[cv2.VideoCapture]] = {}
+        self.started: Dict[Candidate, float] = {}
+        self.timed_out: set = set()
+        self.done = False
+        self.cond = threading.Condition()
+
+    def run_index(self, cands: List[Candidate]) -> None:
+        for c in cands:
+            with self.cond:
+                if self.done:
+                    return
+                self.started[c] = time.perf_counter()
+            try:
+                cap = _open(*c)
+            except Exception:
+                cap = None
+            with self.cond:
+                if self.done:
+                    if cap is not None:
+                        cap.release()
+                    return
+                self.result[c] = cap
+                self.cond.notify_all()
+            if cap is not None:
+                return   # este índice já tem câmera; os outros backends ficam sem teste
+
+    def pick(self, timeout_s: float) -> Optional[Tuple[Candidate, cv2.VideoCapture]]:
+        """Primeiro candidato (na ordem de prioridade) que abriu; None se nenhum."""
+        with self.cond:
+            while True:
+                now = time.perf_counter()
+                wait = None
+                for c in self.cands:
+                    if c in self.result:
+                        if self.result[c] is not None:
+                            return self._finish(c)
+                        continue
+                    t0 = self.started.get(c)
+                    if t0 is not None and now - t0 > timeout_s:
+                        # driver travado: a thread do índice não sai mais daqui
+                        self.timed_out.add(c)
+                        for o in self.cands:
+                            if o[0] == c[0] and o not in self.result:
+                                self.result[o] = None
+                        continue
+                    # ainda não testado ou em teste: os de prioridade maior já falharam
+                    wait = timeout_s if t0 is None else t0 + timeout_s - now
+                    break
+                else:
+                    self.done = True
+                    return None
+                self.cond.wait(max(0.01, wait))
+
+    def _finish(self, win: Candidate) -> Tuple[Candidate, cv2.VideoCapture]:
+        self.done = True
+        for c, cap in self.result.items():
+            if c != win and cap is not None:
+                cap.release()
+        return win, self.result[win]
+
+
+def open_camera(indices: Optional[Sequence[int]] = None, timeout_s: float = PROBE_TIMEOUT_S,
+                cache_path: Optional[str] = CACHE_PATH) -> cv2.VideoCapture:
+    """Abre a webcam; 'indices' restringe os índices, cache_path=None ignora o cache."""
+    cands = candidates(indices)
+
+    for c in _read_cache(cache_path):
+        if c in cands:
+            probe = _Probe([c])
+            threading.Thread(target=probe.run_index, args=([c],), daemon=True).start()
+            hit = probe.pick(timeout_s)
+            if hit is not None:
+                print(f"[OK] Camera aberta: index={c[0]}, api={c[1]} (cache)")
+                return hit[1]
+            print(f"[INFO] Câmera do cache não abriu: index={c[0]}, api={c[1]}")
+            cands.remove(c)
+            break
+
+    probe = _Probe(cands)
+    for idx in dict.fromkeys(i for i, _ in cands):
+        mine = [c for c in cands if c[0] == idx]
+        threading.Thread(target=probe.run_index, args=(mine,), name=f"probe-cam{idx}",
+                         daemon=True).start()
+    hit = probe.pick(timeout_s)
+    for c in cands:
+        if c in probe.timed_out:
+            print(f"[FAIL] index={c[0]}, api={c[1]} (sem resposta em {timeout_s:.0f}s)")
+        elif c in probe.started and c in probe.result and probe.result[c] is None:
+            print(f"[FAIL] index={c[0]}, api={c[1]}")
+    if hit is None:
+        raise RuntimeError(
+            "Nenhuma câmera pôde ser aberta. "
+            "Feche apps que usam a webcam e verifique as permissões de câmera do Windows."
+        )
+    (idx, api), cap = hit
+    print(f"[OK] Camera aberta: index={idx}, api={api}")
+    _remember(cache_path, (idx, api))
+    return cap
@@ -0,0 +1,201 @@
+# config.py
+# Configuração central do app, com versões imutáveis e aviso de mudança.
+#  - ConfigService.current: versão atual (ConfigVersion, somente leitura). O
+#    loop compara só o número da versão e reaplica os parâmetros quando muda;
+#  - fontes: sliders da janela Controles (TrackbarSource), um arquivo JSON
+#    vigiado (FileWatcher, ALERTABET_CONFIG) e a API (GET/PATCH /config);
+#  - update() valida tudo antes de publicar: valor inválido não vira versão.
+# Os parâmetros continuam no formato de utils.DEFAULT_PARAMS (o que o
+# FrameAnalyzer.process recebe), só que num mapping somente leitura.
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+import cv2
+
+from utils import DEFAULT_PARAMS, TRACKBARS, create_trackbars
+
+# chave -> (tipo, mínimo, máximo)
+SCHEMA: Dict[str, Tuple[type, float, float]] = {
+    # Haar
+    "scaleFactor":   (float, 1.01, 2.0),
+    "minNeighbors":  (int,   0,    50),
+    "minSize":       (int,   0,    1000),
+    # olhos / piscos
+    "EAR_thr":       (float, 0.05, 0.5),
+    "EAR_smooth_n":  (int,   1,    30),
+    "refractory_s":  (float, 0.0,  5.0),
+    # risco
+    "risk_minutes":  (float, 1.0,  1440.0),   # como o antigo get_params: slider em 0 vale 1
+    "blink_rate_hi": (float, 1.0,  300.0),
+}
+FILE_POLL_S = 1.0   # intervalo de checagem do arquivo vigiado
+
+
+def validate(changes: Mapping[str, Any]) -> Dict[str, Any]:
+    """Confere chaves, tipos e faixas; devolve os valores convertidos ou levanta ValueError."""
+    if not isinstance(changes, Mapping):
+        raise ValueError("esperado um objeto {chave: valor}")
+    out, errors = {}, []
+    for key, value in changes.items():
+        spec = SCHEMA.get(key)
+        if spec is None:
+            errors.append(f"{key}: chave desconhecida")
+            continue
+        typ, lo, hi = spec
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{key}: esperado número")
+            continue
+        if typ is int and value != int(value):
+            errors.append(f"{key}: esperado inteiro")
+            continue
+        if not lo <= value <= hi:
+            errors.append(f"{key}: fora da faixa [{lo:g}, {hi:g}]")
+            continue
+        out[key] = typ(value)
+    if errors:
+        raise ValueError("; ".join(errors))
+    return out
+
+
+def clamp(key: str, value: float):
+    """Traz 'value' para a faixa da chave (sliders não têm mínimo próprio)."""
+    typ, lo, hi = SCHEMA[key]
+    return typ(min(max(value, lo), hi))
+
+
+@dataclass(frozen=True)
+class ConfigVersion:
+    """Uma versão da configuração; 'params' é somente leitura."""
+    version: int
+    params: Mapping[str, Any]
+    source: str        # "default" | "trackbars" | "file:<nome>" | "api"
+    ts: float          # epoch s
+
+    def as_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "updated_at": datetime.fromtimestamp(self.ts, tz=timezone.utc).isoformat(),
+            "params": dict(self.params),
+        }
+
+
+class ConfigService:
+    """
+    Referência para a versão atual, trocada por atribuição (como o
+    state.SnapshotCell): quem lê não precisa de lock. Escritores são
+    serializados; inscritos são avisados fora do lock, na thread de quem mudou.
+    """
+    def __init__(self, initial: Mapping[str, Any] = DEFAULT_PARAMS):
+        params = {k: v for k, v in initial.items() if k in SCHEMA}
+        self._cur = ConfigVersion(1, MappingProxyType(validate(params)), "default", time.time())
+        self._lock = threading.Lock()
+        self._subs: List[Callable[[ConfigVersion], None]] = []
+
+    @property
+    def current(self) -> ConfigVersion:
+        return self._cur
+
+    @property
+    def version(self) -> int:
+        return self._cur.version
+
+    def update(self, changes: Mapping[str, Any], source: str) -> ConfigVersion:
+        """Aplica 'changes' (parcial). Sem mudança efetiva, não cria versão nova."""
+        clean = validate(changes)
+        with self._lock:
+            cur = self._cur
+            params = {**cur.params, **clean}
+            if params == dict(cur.params):
+                return cur
+            ver = ConfigVersion(cur.version + 1, MappingProxyType(params), source, time.time())
+            self._cur = ver
+            subs = list(self._subs)
+        changed = ", ".join(f"{k}={v:g}" for k, v in clean.items() if cur.params.get(k) != v)
+        print(f"[INFO] Config v{ver.version} ({source}): {changed}")
+        for fn in subs:
+            try:
+                fn(ver)
+            except Exception as e:
+                print("[ERRO] Inscrito da config falhou:", e)
+        return ver
+
+    def subscribe(self, fn: Callable[[ConfigVersion], None]) -> None:
+        with self._lock:
+            self._subs.append(fn)
+
+
+class FileWatcher(threading.Thread):
+    """
+    Vigia um arquivo JSON ({chave: valor}, parcial) e publica cada mudança.
+    Por checagem de mtime/tamanho (sem dependências); o arquivo pode estar
+    numa pasta compartilhada para ajustar todas as máquinas de uma vez.
+    """
+    def __init__(self, service: ConfigService, path: str, poll_s: float = FILE_POLL_S):
+        super().__init__(name="config-file", daemon=True)
+        self.service, self.path, self.poll_s = service, path, poll_s
+        self._sig = None
+        self._stop = threading.Event()
+        self.check()   # valores do arquivo já valem antes do 1º frame
+
+    def check(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        sig = (st.st_mtime, st.st_size)
+        if sig == self._sig:
+            return
+        self._sig = sig
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.service.update(data, f"file:{os.path.basename(self.path)}")
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Config {self.path} ignorada: {e}")
+
+    def run(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            self.check()
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+class TrackbarSource:
+    """
+    Sliders da janela de controles ligados à config. Movimentos viram
+    update() pelo callback do HighGUI (sem ler os sliders a cada frame);
+    sync() (na thread da UI) reposiciona os sliders quando outra fonte muda.
+    """
+    def __init__(self, service: ConfigService, win: str):
+        self.service, self.win = service, win
+        self._shown = service.version
+        self._top = {key: top for _, key, _, top in TRACKBARS}
+        create_trackbars(win, service.current.params, self._on_change)
+
+    def _pos(self, key: str, scale: int, value: float) -> int:
+        return min(self._top[key], int(round(value * scale)))
+
+    def _on_change(self, key: str, scale: int, pos: int) -> None:
+        if self._pos(key, scale, self.service.current.params[key]) == pos:
+            return   # eco do sync() (arredondamento ou valor além do fim do slider)
+        self.service.update({key: clamp(key, pos / scale)}, "trackbars")
+
+    def sync(self) -> None:
+        cur = self.service.current
+        if cur.version == self._shown:
+            return
+        self._shown = cur.version
+        for name, key, scale, _ in TRACKBARS:
+            pos = self._pos(key, scale, cur.params[key])
+            if cv2.getTrackbarPos(name, self.win) != pos:
+                cv2.setTrackbarPos(name, self.win, pos)
@@ -0,0 +1,238 @@
+# event_store.py
+# Persistência dos eventos em SQLite (src/data/events.db, tabela 'events').
+# Escrita "write-behind": log_event só enfileira; uma thread em segundo plano
+# grava em lotes (modo WAL), então o loop de frames nunca espera o disco.
+# A mesma fila/thread grava os buckets fechados do histórico de métricas
+# (timeseries.py) na tabela 'series'.
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from metrics import METRICS
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "events.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    type TEXT NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+CREATE TABLE IF NOT EXISTS series (
+    metric TEXT NOT NULL,
+    res TEXT NOT NULL,
+    ts REAL NOT NULL,
+    min REAL, max REAL, mean REAL, n INTEGER,
+    PRIMARY KEY (metric, res, ts)
+);
+"""
+
+Row = Tuple[int, float, str, str]   # (id, ts, type, details)
+
+# itens da fila: (tipo, linha)
+_EVENT, _SERIES = 0, 1
+
+
+class EventStore:
+    """
+    Fila + thread escritora. put() nunca bloqueia; query() abre uma conexão
+    de leitura própria (WAL permite ler enquanto a thread escreve).
+    """
+    def __init__(self, path: str = DEFAULT_DB_PATH,
+                 batch_size: int = 200, flush_s: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_s = flush_s
+
+        self._q: "queue.SimpleQueue[Optional[Tuple[int, tuple]]]" = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self.written: int = 0
+        self.series_written: int = 0
+        self.last_write_ms: float = 0.0
+        self._write_hist = METRICS.histogram(
+            "alertabet_event_write_seconds", "Gravação de um lote de eventos no SQLite")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_SCHEMA)
+
+        self._th = threading.Thread(target=self._writer, name="event-store", daemon=True)
+        self._th.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=5.0)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    # -------- escrita --------
+    def put(self, ts: float, event_type: str, details: str = "") -> None:
+        """Enfileira um evento (ts em epoch s). Não faz I/O."""
+        self._q.put((_EVENT, (float(ts), str(event_type), str(details))))
+
+    def put_series(self, metric: str, res: str, row) -> None:
+        """Enfileira um bucket fechado (ts, min, máx, média, n) do histórico. Não faz I/O."""
+        ts, mn, mx, mean, n = row
+        self._q.put((_SERIES, (metric, res, float(ts), float(mn), float(mx), float(mean), int(n))))
+
+    def _writer(self) -> None:
+        con = self._connect()
+        try:
+            while True:
+                batch: List[Tuple[int, tuple]] = []
+                try:
+                    item = self._q.get(timeout=self.flush_s)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                stop = item is None
+                if not stop:
+                    batch.append(item)
+                # drena o que já estiver na fila, até batch_size
+                while not stop and len(batch) < self.batch_size:
+                    try:
+                        item = self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                    else:
+                        batch.append(item)
+                if batch:
+                    self._write(con, batch)
+                if stop:
+                    break
+        finally:
+            con.close()
+
+    def _write(self, con: sqlite3.Connection, batch) -> None:
+        t0 = time.perf_counter()
+        events = [row for kind, row in batch if kind == _EVENT]
+        series = [row for kind, row in batch if kind == _SERIES]
+        try:
+            with con:
+                if events:
+                    con.executemany("INSERT INTO events (ts, type, details) VALUES (?, ?, ?)", events)
+                if series:
+                    # mesmo bucket de novo (ex.: app reiniciado na mesma hora): o último vale
+                    con.executemany("INSERT OR REPLACE INTO series (metric, res, ts, min, max, mean, n) "
+                                    "VALUES (?, ?, ?, ?, ?, ?, ?)", series)
+            self.written += len(events)
+            self.series_written += len(series)
+        except sqlite3.Error as e:
+            print("[ERRO] Falha ao gravar eventos:", e)
+        dt = time.perf_counter() - t0
+        self.last_write_ms = dt * 1000.0
+        self._write_hist.observe(dt)
+
+    def pending(self) -> int:
+        """Eventos na fila aguardando gravação (aproximado)."""
+        return self._q.qsize()
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Grava o que falta na fila e encerra a thread escritora."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._q.put(None)
+        self._th.join(timeout)
+
+    # -------- leitura --------
+    def query(self, since: float | None = None, limit: int = 500,
+              event_type: str | None = None) -> List[Row]:
+        """Eventos mais recentes (ordem cronológica), filtrados por ts/tipo."""
+        sql = "SELECT id, ts, type, details FROM events"
+        where, args = [], []
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(float(since))
+        if event_type:
+            where.append("type = ?")
+            args.append(event_type)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        args.append(max(0, int(limit)))
+
+        con = self._connect()
+        try:
+            rows = con.execute(sql, args).fetchall()
+        finally:
+            con.close()
+        rows.reverse()
+        return rows
+
+    def query_series(self, metric: str, res: str, since: float | None = None,
+                     until: float | None = None) -> List[Tuple[float, float, float, float, int]]:
+        """Buckets gravados (ts, min, máx, média, n), em ordem cronológica, em [since, until)."""
+        sql = "SELECT ts, min, max, mean, n FROM series WHERE metric = ? AND res = ?"
+        args: list = [metric, res]
+        if since is not None:
+            sql += " AND ts >= ?"
+            args.append(float(since))
+        if until is not None:
+            sql += " AND ts < ?"
+            args.append(float(until))
+        con = self._connect()
+        try:
+            return con.execute(sql + " ORDER BY ts", args).fetchall()
+        finally:
+            con.close()
+
+    def hourly_counts(self, since: float) -> List[Tuple[str, int, int]]:
+        """Contagens agrupadas por (tipo, hora UTC) desde 'since' — p/ HourlyHistogram.seed."""
+        con = self._connect()
+        try:
+            return con.execute(
+                "SELECT type, CAST(ts / 3600 AS INTEGER) AS h, COUNT(*) FROM events "
+                "WHERE ts >= ? GROUP BY type, h", (float(since),)).fetchall()
+        finally:
+            con.close()
+
+
+class HourlyHistogram:
+    """
+    Contadores de eventos por hora (UTC), mantidos incrementalmente a cada
+    log_event. Consultar a série das últimas N horas é O(N), sem varrer eventos.
+    """
+    def __init__(self, keep_hours: int = 168):
+        self.keep_hours = keep_hours
+        self._counts: Dict[str, Dict[int, int]] = {}   # tipo -> {hora: n}
+        self._latest: int = 0                           # hora mais recente vista
+        self._lock = threading.Lock()
+
+    def add(self, ts: float, event_type: str, n: int = 1) -> None:
+        hour = int(ts // 3600)
+        with self._lock:
+            if hour > self._latest:
+                # hora nova: descarta horas antigas (memória limitada)
+                self._latest = hour
+                for per in self._counts.values():
+                    for h in [h for h in per if h <= hour - self.keep_hours]:
+                        del per[h]
+            if hour <= self._latest - self.keep_hours:
+                return
+            per = self._counts.setdefault(event_type, {})
+            per[hour] = per.get(hour, 0) + n
+
+    def seed(self, rows) -> None:
+        """Carrega contagens já agregadas: [(tipo, hora, n), ...]."""
+        for event_type, hour, n in rows:
+            self.add(hour * 3600.0, event_type, int(n))
+
+    def series(self, event_type: str, hours: int = 24, now: float | None = None) -> List[int]:
+        """Contagens das últimas 'hours' horas (mais antiga primeiro, hora atual por último)."""
+        cur = int((time.time() if now is None else now) // 3600)
+        with self._lock:
+            per = self._counts.get(event_type, {})
+            return [per.get(h, 0) for h in range(cur - hours + 1, cur + 1)]
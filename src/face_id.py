@@ -4,9 +4,13 @@
 # src/data/faces/
 #   ├── PessoaA/  img1.jpg, img2.jpg, ...
 #   └── PessoaB/  img1.png, img2.png, ...
+# O modelo treinado é guardado em src/data/lbph_cache/ (ver load_lbph_model).
 
+import hashlib
+import json
 import os
-from typing import List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional
 
 import cv2
 import numpy as np
@@ -30,18 +34,160 @@ def _preprocess(gray: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
     return gray
 
 
+# ---------------- cache do modelo ----------------
+# O modelo treinado fica em <cache_dir>/lbph.yml.gz (recognizer.write) com um
+# manifest.json: parâmetros, nomes (label = índice) e, por imagem usada no
+# treino, caminho relativo, mtime, tamanho e sha1. Na inicialização:
+#   - nada mudou          -> só lê o modelo;
+#   - só imagens novas    -> recognizer.update() com o delta;
+#   - imagem removida/alterada ou parâmetros diferentes -> retreino completo.
+LBPH_PARAMS = dict(radius=1, neighbors=8, grid_x=8, grid_y=8, threshold=123.0)
+VALID_EXT = {".jpg", ".jpeg", ".png", ".bmp", ".pgm"}
+MANIFEST_VERSION = 1
+_MODEL_FILE = "lbph.yml.gz"
+_MANIFEST_FILE = "manifest.json"
+
+
+def default_cache_dir(data_dir: str) -> str:
+    """<pai de data_dir>/lbph_cache (ex.: src/data/lbph_cache)."""
+    return os.path.join(os.path.dirname(os.path.normpath(data_dir)), "lbph_cache")
+
+
+def _create_recognizer():
+    return cv2.face.LBPHFaceRecognizer_create(**LBPH_PARAMS)
+
+
+def _sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _scan(data_dir: str) -> Dict[str, List[str]]:
+    """{pessoa: [caminhos relativos]} em ordem alfabética (pastas ocultas ignoradas)."""
+    people: Dict[str, List[str]] = {}
+    for name in sorted(os.listdir(data_dir)):
+        person_dir = os.path.join(data_dir, name)
+        if name.startswith(".") or not os.path.isdir(person_dir):
+            continue
+        files = [f"{name}/{f}" for f in sorted(os.listdir(person_dir))
+                 if os.path.splitext(f)[1].lower() in VALID_EXT]
+        if files:
+            people[name] = files
+    return people
+
+
+def _file_entry(data_dir: str, rel: str, old: Optional[dict] = None) -> dict:
+    """mtime/tamanho/sha1; reaproveita o hash se mtime e tamanho não mudaram."""
+    st = os.stat(os.path.join(data_dir, rel))
+    if old and old.get("mtime") == st.st_mtime and old.get("size") == st.st_size:
+        return dict(old)
+    return {"mtime": st.st_mtime, "size": st.st_size, "sha1": _sha1(os.path.join(data_dir, rel))}
+
+
+def _load_images(data_dir: str, rels: List[str], face_size: Tuple[int, int],
+                 workers: Optional[int] = None) -> List[Optional[np.ndarray]]:
+    """Decodifica + pré-processa em paralelo (imread/equalizeHist liberam o GIL)."""
+    def load(rel):
+        img = cv2.imread(os.path.join(data_dir, rel), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            return None
+        try:
+            return _preprocess(img, face_size)
+        except Exception:
+            return None
+
+    if len(rels) < 8:
+        return [load(r) for r in rels]
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        return list(pool.map(load, rels))
+
+
+def _params_key(face_size, min_images_per_person) -> dict:
+    return {"face_size": list(face_size), "min_images_per_person": min_images_per_person,
+            "lbph": LBPH_PARAMS}
+
+
+def _read_cache(cache_dir: str, params: dict):
+    """(recognizer, manifest) do cache, ou (None, None) se ausente/incompatível."""
+    try:
+        with open(os.path.join(cache_dir, _MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("params") != params:
+            return None, None
+        rec = _create_recognizer()
+        rec.read(os.path.join(cache_dir, _MODEL_FILE))
+        if len(rec.getLabels()) != manifest.get("samples"):
+            return None, None   # modelo e manifest de gravações diferentes
+        return rec, manifest
+    except (OSError, ValueError, KeyError, cv2.error):
+        return None, None
+
+
+def _write_cache(cache_dir: str, rec, manifest: dict) -> None:
+    """Grava modelo e manifest (troca atômica de cada arquivo; manifest por último)."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_model = os.path.join(cache_dir, "tmp_" + _MODEL_FILE)
+        rec.write(tmp_model)
+        os.replace(tmp_model, os.path.join(cache_dir, _MODEL_FILE))
+        tmp_man = os.path.join(cache_dir, _MANIFEST_FILE + ".tmp")
+        with open(tmp_man, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_man, os.path.join(cache_dir, _MANIFEST_FILE))
+    except (OSError, cv2.error) as e:
+        print("[WARN] Não consegui gravar o cache do LBPH:", e)
+
+
+def _train_full(data_dir, people, face_size, min_images_per_person, old_files, workers):
+    """Treino do zero (mesma regra de antes: pessoas com poucas imagens ficam de fora)."""
+    rels = [r for files in people.values() for r in files]
+    imgs_by_rel = dict(zip(rels, _load_images(data_dir, rels, face_size, workers)))
+
+    imgs: List[np.ndarray] = []
+    labels: List[int] = []
+    names: List[str] = []
+    files: Dict[str, dict] = {}
+    for name, person_files in people.items():
+        ok = [r for r in person_files if imgs_by_rel[r] is not None]
+        if len(ok) < min_images_per_person:
+            continue
+        label = len(names)
+        names.append(name)
+        for r in person_files:
+            # ilegíveis ficam no manifest com label -1 (não são relidas a cada início)
+            files[r] = {**_file_entry(data_dir, r, old_files.get(r)),
+                        "label": label if imgs_by_rel[r] is not None else -1}
+        for r in ok:
+            imgs.append(imgs_by_rel[r])
+            labels.append(label)
+
+    if not imgs:
+        return None, names, files
+    rec = _create_recognizer()
+    rec.train(imgs, np.array(labels, dtype=np.int32))
+    return rec, names, files
+
+
 # ---------------- API pública ----------------
 def load_lbph_model(
     data_dir: str = "src/data/faces",
     face_size: Tuple[int, int] = (120, 120),
     min_images_per_person: int = 2,
+    cache_dir: Optional[str] = "",
+    workers: Optional[int] = None,
 ) -> Tuple[Optional[cv2.face_LBPHFaceRecognizer], List[str]]:
     """
-    Cria e treina um reconhecedor LBPH com as imagens do diretório.
+    Cria/carrega um reconhecedor LBPH com as imagens do diretório.
     Retorna (recognizer or None, lista_de_nomes).
 
     - face_size: todas as imagens são normalizadas para este tamanho
     - min_images_per_person: pastas com menos imagens são ignoradas
+    - cache_dir: onde guardar o modelo treinado ("" = default_cache_dir(data_dir),
+      None = sem cache, sempre treina do zero)
+    - workers: threads para decodificar/pré-processar as imagens
     """
     if not _has_cv2_face():
         # OpenCV-contrib não instalado
@@ -50,56 +196,73 @@ def load_lbph_model(
     if not os.path.isdir(data_dir):
         return None, []
 
-    imgs: List[np.ndarray] = []
-    labels: List[int] = []
-    names: List[str] = []
-    label_id = 0
-
-    # somente extensões comuns
-    valid_ext = {".jpg", ".jpeg", ".png", ".bmp", ".pgm"}
-
-    for name in sorted(os.listdir(data_dir)):
-        person_dir = os.path.join(data_dir, name)
-        if not os.path.isdir(person_dir):
-            continue
+    if cache_dir == "":
+        cache_dir = default_cache_dir(data_dir)
+    params = _params_key(face_size, min_images_per_person)
+    people = _scan(data_dir)
 
-        # coleta imagens da pessoa
-        person_imgs = []
-        for f in sorted(os.listdir(person_dir)):
-            ext = os.path.splitext(f)[1].lower()
-            if ext not in valid_ext:
-                continue
-            p = os.path.join(person_dir, f)
-            img = cv2.imread(p, cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                continue
-            try:
-                img = _preprocess(img, face_size)
-            except Exception:
-                continue
-            person_imgs.append(img)
-
-        if len(person_imgs) < min_images_per_person:
-            # ignora classes com poucas amostras
-            continue
+    rec, manifest = _read_cache(cache_dir, params) if cache_dir else (None, None)
+    old_files: Dict[str, dict] = manifest["files"] if manifest else {}
 
-        # adiciona ao dataset
-        for im in person_imgs:
-            imgs.append(im)
-            labels.append(label_id)
+    if rec is not None:
+        names: List[str] = list(manifest["names"])
+        current = {r for fl in people.values() for r in fl}
+        entries = {r: _file_entry(data_dir, r, e) for r, e in old_files.items() if r in current}
+        # imagem do modelo que sumiu ou mudou de conteúdo -> LBPH não "desaprende"
+        stale = any(e["label"] >= 0 and (r not in entries or entries[r]["sha1"] != e["sha1"])
+                    for r, e in old_files.items())
+        if not stale:
+            # imagens ilegíveis (label -1) só voltam a ser lidas se mudarem
+            files = {r: {**entries[r], "label": e["label"]} for r, e in old_files.items()
+                     if r in entries and entries[r]["sha1"] == e["sha1"]}
+            new = {name: [r for r in fl if r not in files] for name, fl in people.items()}
+            new = {name: fl for name, fl in new.items() if fl}
+            if not new:
+                if files != old_files:   # só mtimes (ex.: arquivo tocado)
+                    _write_cache(cache_dir, rec, {**manifest, "files": files})
+                return rec, names
 
-        names.append(name)
-        label_id += 1
+            rels = [r for fl in new.values() for r in fl]
+            imgs_by_rel = dict(zip(rels, _load_images(data_dir, rels, face_size, workers)))
+            imgs: List[np.ndarray] = []
+            labels: List[int] = []
+            for name, fl in new.items():
+                ok = [r for r in fl if imgs_by_rel[r] is not None]
+                if name in names:
+                    label = names.index(name)
+                elif len(ok) >= min_images_per_person:
+                    label = len(names)
+                    names.append(name)
+                else:
+                    continue   # pessoa nova com poucas imagens: fica de fora
+                for r in fl:
+                    files[r] = {**_file_entry(data_dir, r),
+                                "label": label if imgs_by_rel[r] is not None else -1}
+                for r in ok:
+                    imgs.append(imgs_by_rel[r])
+                    labels.append(label)
+            if imgs:
+                rec.update(imgs, np.array(labels, dtype=np.int32))
+                print(f"[OK] LBPH: +{len(imgs)} imagens (update incremental)")
+            _write_cache(cache_dir, rec, {**manifest, "names": names, "files": files,
+                                          "samples": manifest["samples"] + len(imgs)})
+            return rec, names
 
-    if not imgs or not names:
+    rec, names, files = _train_full(data_dir, people, face_size, min_images_per_person,
+                                    old_files, workers)
+    if rec is None or not names:
         return None, []
+    if cache_dir:
+        samples = sum(1 for e in files.values() if e["label"] >= 0)
+        _write_cache(cache_dir, rec, {"version": MANIFEST_VERSION, "params": params,
+                                      "names": names, "files": files, "samples": samples})
+    return rec, names
+
 
-    # treina LBPH
-    recognizer = cv2.face.LBPHFaceRecognizer_create(
-        radius=1, neighbors=8, grid_x=8, grid_y=8, threshold=123.0
-    )
-    recognizer.train(imgs, np.array(labels, dtype=np.int32))
-    return recognizer, names
+def _is_index(rec) -> bool:
+    """rec veio de face_index.load_face_index (busca vetorizada) e não do LBPH?"""
+    from face_index import FaceIndex   # import tardio: face_index depende deste módulo
+    return isinstance(rec, FaceIndex)
 
 
 def predict(
@@ -114,6 +277,8 @@ def predict(
     """
     if rec is None or not names:
         return "desconhecido", 999.0
+    if _is_index(rec):
+        return rec.predict(gray_face)
 
     try:
         roi = _preprocess(gray_face, face_size)
@@ -124,3 +289,35 @@ def predict(
     if 0 <= label < len(names):
         return names[label], float(conf)
     return "desconhecido", float(conf)
+
+
+def predict_batch(
+    rec: Optional[cv2.face_LBPHFaceRecognizer],
+    names: List[str],
+    gray_faces: List[np.ndarray],
+    face_size: Tuple[int, int] = (120, 120),
+) -> List[Tuple[str, float]]:
+    """
+    predict() para várias ROIs numa só chamada (mesmo contrato por item).
+    O buffer do redimensionamento é reaproveitado entre as ROIs.
+    """
+    unknown = ("desconhecido", 999.0)
+    if rec is None or not names:
+        return [unknown] * len(gray_faces)
+    if _is_index(rec):
+        return rec.predict_batch(gray_faces)
+
+    out: List[Tuple[str, float]] = []
+    buf = np.empty((face_size[1], face_size[0]), dtype=np.uint8)
+    for gray in gray_faces:
+        if gray is None or gray.size == 0:
+            out.append(unknown)
+            continue
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        # mesma ordem do _preprocess (equaliza e depois redimensiona)
+        cv2.resize(cv2.equalizeHist(gray), face_size, dst=buf, interpolation=cv2.INTER_AREA)
+        label, conf = rec.predict(buf)
+        out.append((names[label], float(conf)) if 0 <= label < len(names)
+                   else ("desconhecido", float(conf)))
+    return out
@@ -0,0 +1,284 @@
+# face_index.py
+# Backend alternativo de identificação para muitos cadastrados.
+# O LBPH compara o rosto com TODAS as amostras, uma a uma (custo linear no
+# nº de imagens, em C++ mas sem vetorizar). Aqui cada imagem cadastrada vira
+# um descritor de tamanho fixo (histogramas LBP uniformes por célula, mesma
+# ideia do LBPH) numa matriz float32 contígua, e a busca é um produto de
+# matrizes + top-k. Com muitos cadastros, um índice grosso (k-means) limita
+# a busca aos 'nprobe' grupos mais próximos.
+#
+# Mesmo contrato do face_id.predict: (nome, confiança), confiança MENOR = melhor.
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from face_id import _preprocess, _scan, _file_entry, _load_images, default_cache_dir
+
+GRID = (8, 8)              # células (x, y), como o LBPH (grid_x=8, grid_y=8)
+MAX_DISTANCE = 0.75        # acima disso: "desconhecido" (distância de Hellinger, 0..1.41)
+INDEX_FILE = "index.npz"
+INDEX_VERSION = 1
+
+# 8 vizinhos (raio 1), no sentido horário a partir do canto superior esquerdo
+_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+
+def _uniform_table() -> np.ndarray:
+    """Código LBP (0..255) -> bin uniforme (0..57) ou 58 (não uniforme)."""
+    table = np.full(256, 58, dtype=np.int32)
+    nxt = 0
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        if sum(bits[i] != bits[(i + 1) % 8] for i in range(8)) <= 2:
+            table[code] = nxt
+            nxt += 1
+    return table
+
+
+_UNIFORM = _uniform_table()
+N_BINS = 59
+
+
+def descriptor_size(grid: Tuple[int, int] = GRID) -> int:
+    return grid[0] * grid[1] * N_BINS
+
+
+def lbp_descriptor(face: np.ndarray, grid: Tuple[int, int] = GRID) -> np.ndarray:
+    """
+    Descritor (D,) float32 de um rosto já pré-processado (cinza, equalizado,
+    tamanho fixo): histograma LBP uniforme por célula, normalizado e em raiz
+    quadrada (Hellinger), com norma L2 = 1. Produto escalar = similaridade.
+    """
+    g = face.astype(np.int16)
+    c = g[1:-1, 1:-1]
+    h, w = c.shape
+    codes = np.zeros((h, w), dtype=np.int32)
+    for bit, (dy, dx) in enumerate(_OFFSETS):
+        codes |= (g[1 + dy:1 + dy + h, 1 + dx:1 + dx + w] >= c).astype(np.int32) << bit
+
+    gx, gy = grid
+    cy = (np.arange(h) * gy // h)[:, None]
+    cx = (np.arange(w) * gx // w)[None, :]
+    cell = cy * gx + cx
+    hist = np.bincount((cell * N_BINS + _UNIFORM[codes]).ravel(),
+                       minlength=gx * gy * N_BINS).astype(np.float32)
+    hist = hist.reshape(gx * gy, N_BINS)
+    hist /= np.maximum(hist.sum(axis=1, keepdims=True), 1.0)
+    np.sqrt(hist, out=hist)
+    hist /= np.sqrt(gx * gy)
+    return hist.ravel()
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int = 8, sample: int = 5000, seed: int = 0) -> np.ndarray:
+    """Centros (k, D) por k-means esférico (vetores unitários, similaridade = dot)."""
+    rng = np.random.default_rng(seed)
+    if len(x) > sample:
+        x = x[rng.choice(len(x), sample, replace=False)]
+    cent = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ cent.T, axis=1)
+        for j in range(k):
+            members = x[assign == j]
+            if len(members):
+                v = members.sum(axis=0)
+                cent[j] = v / max(np.linalg.norm(v), 1e-9)
+    return cent
+
+
+class FaceIndex:
+    """
+    Matriz de descritores (N, D) float32 + rótulos. search() devolve os k
+    vizinhos mais próximos; predict()/predict_batch() seguem o contrato do
+    face_id (nome, confiança menor = melhor).
+    """
+    def __init__(self, desc: np.ndarray, labels: np.ndarray, names: List[str],
+                 face_size: Tuple[int, int] = (120, 120), n_clusters: int = 0,
+                 nprobe: int = 4, max_distance: float = MAX_DISTANCE,
+                 centroids: Optional[np.ndarray] = None):
+        self.desc = np.ascontiguousarray(desc, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.names = list(names)
+        self.face_size = face_size
+        self.nprobe = nprobe
+        self.max_distance = max_distance
+        self.centroids = None
+        self._buckets: List[np.ndarray] = []
+        if centroids is not None or (n_clusters and len(self.desc) > 4 * n_clusters):
+            self.build_coarse(n_clusters, centroids)
+
+    def __len__(self) -> int:
+        return len(self.desc)
+
+    # -------- índice grosso --------
+    def build_coarse(self, n_clusters: int = 0, centroids: Optional[np.ndarray] = None) -> None:
+        """Agrupa as amostras (k-means); a busca só olha os 'nprobe' grupos mais próximos."""
+        self.centroids = centroids if centroids is not None else _kmeans(self.desc, n_clusters)
+        assign = np.argmax(self.desc @ self.centroids.T, axis=1)
+        self._buckets = [np.flatnonzero(assign == j) for j in range(len(self.centroids))]
+
+    # -------- busca --------
+    def search(self, q: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        q: (M, D) descritores. Retorna (índices (M, k), distâncias (M, k)),
+        do mais próximo ao mais distante; -1 / inf quando há menos de k.
+        """
+        q = np.atleast_2d(np.asarray(q, dtype=np.float32))
+        M = len(q)
+        idx = np.full((M, k), -1, dtype=np.int64)
+        dist = np.full((M, k), np.inf, dtype=np.float32)
+        if not len(self.desc):
+            return idx, dist
+
+        if self.centroids is None:
+            sims = q @ self.desc.T                      # (M, N): um único GEMM
+            cand = [None] * M
+        else:
+            probe = np.argsort(-(q @ self.centroids.T), axis=1)[:, :self.nprobe]
+            cand = [np.concatenate([self._buckets[j] for j in row]) for row in probe]
+
+        for i in range(M):
+            if cand[i] is None:
+                s, ids = sims[i], None
+            else:
+                ids = cand[i]
+                s = self.desc[ids] @ q[i]
+            kk = min(k, len(s))
+            if kk == 0:
+                continue
+            top = np.argpartition(-s, kk - 1)[:kk]
+            top = top[np.argsort(-s[top])]
+            d = np.sqrt(np.maximum(0.0, 2.0 - 2.0 * s[top]))
+            idx[i, :kk] = top if ids is None else ids[top]
+            dist[i, :kk] = d
+        return idx, dist
+
+    def describe(self, gray_faces: List[np.ndarray]) -> np.ndarray:
+        """ROIs cinza (qualquer tamanho) -> (M, D), com o mesmo pré-processamento do LBPH."""
+        out = np.zeros((len(gray_faces), self.desc.shape[1]), dtype=np.float32)
+        for i, g in enumerate(gray_faces):
+            if g is not None and g.size:
+                out[i] = lbp_descriptor(_preprocess(g, self.face_size))
+        return out
+
+    def predict_batch(self, gray_faces: List[np.ndarray]) -> List[Tuple[str, float]]:
+        if not gray_faces:
+            return []
+        idx, dist = self.search(self.describe(gray_faces), k=1)
+        out = []
+        for i, g in enumerate(gray_faces):
+            j, d = int(idx[i, 0]), float(dist[i, 0])
+            if g is None or not g.size or j < 0:
+                out.append(("desconhecido", 999.0))
+                continue
+            conf = round(d * 100.0, 2)   # escala ~0..141, menor = melhor (como o LBPH)
+            name = self.names[self.labels[j]] if d <= self.max_distance else "desconhecido"
+            out.append((name, conf))
+        return out
+
+    def predict(self, gray_face: np.ndarray) -> Tuple[str, float]:
+        return self.predict_batch([gray_face])[0]
+
+    # -------- persistência --------
+    def save(self, path: str, files: Dict[str, dict]) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        rels = sorted(files)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, version=INDEX_VERSION, desc=self.desc, labels=self.labels,
+                 names=np.array(self.names, dtype=object), face_size=np.array(self.face_size),
+                 centroids=self.centroids if self.centroids is not None else np.zeros((0, 0)),
+                 rels=np.array(rels, dtype=object),
+                 row=np.array([files[r]["row"] for r in rels], dtype=np.int64),
+                 sha1=np.array([files[r]["sha1"] for r in rels], dtype=object),
+                 mtime=np.array([files[r]["mtime"] for r in rels], dtype=np.float64),
+                 size=np.array([files[r]["size"] for r in rels], dtype=np.int64))
+        os.replace(tmp, path)
+
+
+def _read_index(path: str, face_size):
+    """(desc, centroids, files {rel: entry+row}) do cache, ou None."""
+    try:
+        z = np.load(path, allow_pickle=True)
+        if int(z["version"]) != INDEX_VERSION or tuple(z["face_size"]) != tuple(face_size):
+            return None
+        files = {str(r): {"row": int(i), "sha1": str(h), "mtime": float(m), "size": int(sz)}
+                 for r, i, h, m, sz in zip(z["rels"], z["row"], z["sha1"], z["mtime"], z["size"])}
+        cent = z["centroids"] if z["centroids"].size else None
+        return z["desc"], cent, files
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_face_index(
+    data_dir: str = "src/data/faces",
+    face_size: Tuple[int, int] = (120, 120),
+    min_images_per_person: int = 2,
+    cache_dir: Optional[str] = "",
+    n_clusters: int = 0,
+    workers: Optional[int] = None,
+) -> Tuple[Optional[FaceIndex], List[str]]:
+    """
+    Como face_id.load_lbph_model, mas devolve um FaceIndex. O cache
+    (<cache_dir>/index.npz) guarda um descritor por imagem; imagens
+    novas/alteradas são descritas e as removidas saem da matriz (sem retreino).
+    n_clusters > 0 liga o índice grosso (ex.: ~sqrt(nº de imagens)).
+    """
+    if not os.path.isdir(data_dir):
+        return None, []
+    if cache_dir == "":
+        cache_dir = default_cache_dir(data_dir)
+    path = os.path.join(cache_dir, INDEX_FILE) if cache_dir else None
+
+    t0 = time.perf_counter()
+    people = _scan(data_dir)
+    cached = _read_index(path, face_size) if path else None
+    old_desc, old_cent, old_files = cached if cached else (None, None, {})
+
+    # reaproveita descritores de arquivos inalterados (mesmo sha1)
+    entries: Dict[str, dict] = {}
+    keep: Dict[str, int] = {}      # rel -> linha em old_desc
+    todo: List[str] = []
+    for fl in people.values():
+        for r in fl:
+            e = entries[r] = _file_entry(data_dir, r, old_files.get(r))
+            if r in old_files and e["sha1"] == old_files[r]["sha1"]:
+                keep[r] = old_files[r]["row"]
+            else:
+                todo.append(r)
+    faces = dict(zip(todo, _load_images(data_dir, todo, face_size, workers)))
+
+    names: List[str] = []
+    rows: List[np.ndarray] = []
+    labels: List[int] = []
+    files: Dict[str, dict] = {}
+    for name, fl in people.items():
+        usable = [r for r in fl if r in keep or faces.get(r) is not None]
+        if len(usable) < min_images_per_person:
+            continue
+        label = len(names)
+        names.append(name)
+        for r in usable:
+            d = old_desc[keep[r]] if r in keep else lbp_descriptor(faces[r])
+            files[r] = {**entries[r], "row": len(rows)}
+            rows.append(d)
+            labels.append(label)
+
+    if not rows:
+        return None, []
+    desc = np.stack(rows).astype(np.float32)
+    unchanged = cached is not None and not todo and len(files) == len(old_files)
+    # centros do k-means só valem para a mesma matriz e o mesmo nº de grupos
+    reuse = unchanged and old_cent is not None and len(old_cent) == n_clusters
+    index = FaceIndex(desc, labels, names, face_size, n_clusters=n_clusters,
+                      centroids=old_cent if reuse else None)
+    if path and (not unchanged or index.centroids is not old_cent):
+        try:
+            index.save(path, files)
+        except OSError as e:
+            print("[WARN] Não consegui gravar o índice de rostos:", e)
+    print(f"[OK] Índice de rostos: {len(desc)} amostras, {len(names)} pessoas, "
+          f"{len(todo)} descritas agora ({time.perf_counter() - t0:.1f}s)")
+    return index, names
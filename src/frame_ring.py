@@ -0,0 +1,114 @@
+# frame_ring.py
+# Anel de buffers de frames em shared memory (multiprocessing.shared_memory).
+# A captura grava direto num slot livre (cap.read(image=slot)) e só o índice
+# do slot circula: entre threads (modo pipeline) ou para o worker (multicam),
+# que lê da memória compartilhada. Em regime nenhum frame é alocado/copiado.
+from __future__ import annotations
+
+import threading
+from multiprocessing import shared_memory
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+RingSpec = Tuple[str, Tuple[int, ...], int]   # (nome do shm, shape do frame, nº de slots)
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    """
+    Abre um bloco existente. Os workers são filhos do multiprocessing e
+    compartilham o resource_tracker do processo principal, que é quem
+    faz o unlink; no 3.13+ o filho nem se registra (track=False).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing:
+    """
+    'slots' frames de mesmo shape (uint8) num único bloco de shared memory.
+    Lado dono (create=True): acquire()/release() controlam os slots livres.
+    Lado worker: SharedFrameRing.attach(spec) só lê self.frames[slot].
+    """
+    def __init__(self, shape: Tuple[int, ...], slots: int = 4,
+                 name: Optional[str] = None, create: bool = True):
+        self.shape = tuple(int(v) for v in shape)
+        self.slots = int(slots)
+        nbytes = self.slots * int(np.prod(self.shape))
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes, name=name)
+        else:
+            self.shm = _attach_shm(name)
+        self._owner = create
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+        self._free: List[int] = list(range(self.slots))
+        self._lock = threading.Lock()
+        self._spare: Optional[np.ndarray] = None   # destino de leituras descartadas
+        self.dropped: int = 0
+
+    @classmethod
+    def attach(cls, spec: RingSpec) -> "SharedFrameRing":
+        name, shape, slots = spec
+        return cls(shape, slots, name=name, create=False)
+
+    @property
+    def spec(self) -> RingSpec:
+        return (self.shm.name, self.shape, self.slots)
+
+    # -------- controle de slots (lado dono) --------
+    def acquire(self) -> Optional[int]:
+        """Índice de um slot livre, ou None se todos estão em uso."""
+        with self._lock:
+            return self._free.pop(0) if self._free else None
+
+    def release(self, slot: Optional[int]) -> None:
+        if slot is None:
+            return
+        with self._lock:
+            if slot not in self._free:
+                self._free.append(slot)
+
+    def read(self, cap: Any) -> Tuple[bool, Optional[int]]:
+        """
+        cap.read() direto num slot livre, sem alocar: (ok, slot). Com o anel
+        cheio o frame é lido num buffer reserva e descartado (slot None), para
+        a câmera não acumular frames velhos.
+        """
+        slot = self.acquire()
+        if slot is None:
+            if self._spare is None:
+                self._spare = np.empty(self.shape, dtype=np.uint8)
+            buf = self._spare
+        else:
+            buf = self.frames[slot]
+        ok, img = cap.read(image=buf)
+        if ok and img is not buf:
+            # o OpenCV realocou (resolução mudou): não cabe no anel
+            ok = img is not None and img.shape == self.shape
+            if ok:
+                np.copyto(buf, img)
+        if slot is not None and not ok:
+            self.release(slot)
+            slot = None
+        if ok and slot is None:
+            self.dropped += 1
+        return ok, slot
+
+    def in_use(self) -> int:
+        with self._lock:
+            return self.slots - len(self._free)
+
+    def close(self) -> None:
+        self.frames = None   # solta a view antes de fechar o mmap
+        try:
+            self.shm.close()
+        except BufferError:
+            pass             # ainda há frames em uso (filas); o SO libera na saída
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
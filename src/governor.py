@@ -0,0 +1,80 @@
+# governor.py
+# Taxa de análise adaptativa: sem rosto, o loop analisa poucos frames por
+# segundo (IDLE_FPS); com rosto, sobe para o que a detecção de piscos exige
+# (BLINK_SAMPLES amostras dentro de CLOSED_MIN_S). Frames fora da cadência
+# só passam por cap.grab(): a câmera continua sendo drenada (o próximo frame
+# analisado é atual), mas sem decodificar, inferir nem desenhar.
+#
+# O período é tratado como o MAIOR intervalo permitido entre dois frames
+# analisados (não como média), o que garante:
+#  - com rosto: intervalo <= CLOSED_MIN_S / BLINK_SAMPLES (resolução do piscar);
+#  - sem rosto: intervalo <= max_dt_s do RiskConfig, então o dt do primeiro
+#    frame com rosto nunca é cortado pelo anti-picos do RiskModel/SessionEngine
+#    e o tempo ativo continua exato.
+from __future__ import annotations
+
+from analyzer import CLOSED_MIN_S
+from risk_model import RiskConfig
+
+IDLE_FPS      = 5.0     # análises/s sem rosto
+BLINK_SAMPLES = 3       # frames mínimos dentro de um olho fechado de CLOSED_MIN_S
+FACE_HOLD_S   = 2.0     # segue na taxa ativa por N s depois de perder o rosto
+
+
+def blink_fps(closed_min_s: float = CLOSED_MIN_S, samples: int = BLINK_SAMPLES) -> float:
+    """Taxa mínima para ver 'samples' frames num piscar de 'closed_min_s' (0,12 s -> 25 fps)."""
+    return samples / closed_min_s
+
+
+class FrameGovernor:
+    """
+    due(t) decide, a cada frame capturado, se ele deve ser analisado;
+    observe(t, have_face) informa o resultado e troca entre ocioso/ativo.
+    Sem lock: due() roda na captura e observe() na inferência; numa troca
+    de modo, no pior caso um frame a mais (ou a menos) é analisado.
+    """
+    def __init__(self, idle_fps: float = IDLE_FPS, active_fps: float = 0.0,
+                 hold_s: float = FACE_HOLD_S, max_dt_s: float = RiskConfig.max_dt_s):
+        need = blink_fps()
+        if active_fps and active_fps < need:
+            print(f"[WARN] active_fps={active_fps:g} abaixo do necessário p/ piscos; usando {need:g}")
+        active_fps = max(active_fps or need, need)
+        self.active_period = 1.0 / active_fps
+        # idle_fps <= 0: sem redução quando ocioso (só o teto do max_dt_s)
+        self.idle_period = min(1.0 / idle_fps if idle_fps > 0 else self.active_period, max_dt_s)
+        self.hold_s = hold_s
+
+        self.active = False
+        self.skipped = 0
+        self._face_t = float("-inf")
+        self._last = float("-inf")     # último frame analisado
+        self._prev = None              # último frame visto (analisado ou não)
+        self._frame_dt = 0.0           # intervalo entre frames da câmera (média móvel)
+
+    @property
+    def period(self) -> float:
+        return self.active_period if self.active else self.idle_period
+
+    def due(self, t: float) -> bool:
+        """O frame de 't' deve ser analisado? (pular o deixaria o próximo além do período)"""
+        if self._prev is not None and t > self._prev:
+            d = t - self._prev
+            self._frame_dt = d if not self._frame_dt else self._frame_dt + 0.1 * (d - self._frame_dt)
+        self._prev = t
+        if t - self._last + self._frame_dt <= self.period:
+            self.skipped += 1
+            return False
+        self._last = t
+        return True
+
+    def observe(self, t: float, have_face: bool) -> None:
+        if have_face:
+            self._face_t = t
+            self.active = True
+        elif self.active and t - self._face_t > self.hold_s:
+            self.active = False
+
+    @property
+    def fps(self) -> float:
+        """Taxa alvo atual (análises/s)."""
+        return 1.0 / self.period
@@ -0,0 +1,121 @@
+# identity.py
+# Identificação (LBPH de face_id.py ou índice de face_index.py) ligada ao rastreio de rostos, sem rodar
+# em todo frame: cada track ("cam0:f1") é identificado quando aparece e
+# reverificado a cada reverify_s; um track perdido ganha id novo no
+# FaceTracker e, portanto, uma nova identificação. As ROIs pendentes de
+# todos os rostos/câmeras vão juntas para uma única chamada do worker.
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from face_id import load_lbph_model, predict_batch
+
+REVERIFY_S = 30.0     # reconfirma a identidade de um track a cada N s
+TRACK_TTL_S = 10.0    # esquece tracks não vistos há N s
+
+
+class IdentityService:
+    """
+    observe() roda no loop de inferência (só recorta ROIs quando preciso);
+    uma thread própria carrega o modelo e processa os pedidos em lote.
+    """
+    def __init__(self, loader: Callable[[], Tuple[object, List[str]]] = load_lbph_model,
+                 reverify_s: float = REVERIFY_S, ttl_s: float = TRACK_TTL_S,
+                 face_size: Tuple[int, int] = (120, 120)):
+        self.loader = loader
+        self.reverify_s = reverify_s
+        self.ttl_s = ttl_s
+        self.face_size = face_size
+
+        self._pending: Dict[str, Tuple[np.ndarray, float]] = {}   # key -> (roi cinza, ts)
+        self._inflight: set = set()
+        self._known: Dict[str, Tuple[str, float, float]] = {}     # key -> (nome, conf, ts)
+        self._seen: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._stop = False
+        self.batches = 0
+        self.predicted = 0
+
+        self._th = threading.Thread(target=self._run, name="identity", daemon=True)
+        self._th.start()
+
+    # -------- loop de inferência --------
+    def observe(self, cam: str, res, frame: np.ndarray) -> None:
+        """Agenda a identificação dos tracks novos/vencidos deste frame."""
+        if res.face_boxes is None:
+            return
+        t = res.ts
+        with self._cond:
+            for fid, (x, y, w, h) in zip(res.face_ids, res.face_boxes):
+                key = f"{cam}:{fid}"
+                self._seen[key] = t
+                if key in self._pending or key in self._inflight or w < 8 or h < 8:
+                    continue
+                k = self._known.get(key)
+                if k is not None and t - k[2] < self.reverify_s:
+                    continue
+                # recorte em cinza = cópia: o frame (slot do anel) é reaproveitado
+                roi = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+                self._pending[key] = (roi, t)
+            if self._pending:
+                self._cond.notify()
+
+            # tracks que sumiram
+            for key in [k for k, ts in self._seen.items() if t - ts > self.ttl_s]:
+                self._seen.pop(key, None)
+                self._known.pop(key, None)
+
+    def identities(self) -> Dict[str, dict]:
+        """{track: {"name", "conf"}} dos tracks já identificados."""
+        with self._cond:
+            return {k: {"name": n, "conf": round(c, 1)} for k, (n, c, _) in self._known.items()}
+
+    def annotate(self, sessions: Dict[str, dict]) -> Dict[str, dict]:
+        """
+        Cópia do snapshot de sessões com 'name'/'name_conf' (ids iguais aos
+        tracks). Não altera os dicts recebidos: eles podem já estar publicados
+        num status que a API está serializando em outra thread.
+        """
+        ids = self.identities()
+        out = {}
+        for sid, info in sessions.items():
+            ident = ids.get(sid)
+            out[sid] = info if ident is None else {**info, "name": ident["name"],
+                                                   "name_conf": ident["conf"]}
+        return out
+
+    def close(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+
+    # -------- worker --------
+    def _run(self) -> None:
+        rec, names = self.loader()
+        if rec is None:
+            print("[WARN] Identificação ativa, mas sem modelo (veja data/faces/)")
+        else:
+            print(f"[OK] Identificação: {len(names)} pessoas")
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                batch, self._pending = self._pending, {}
+                self._inflight = set(batch)
+
+            keys = list(batch)
+            results = predict_batch(rec, names, [batch[k][0] for k in keys], self.face_size)
+
+            with self._cond:
+                for key, (name, conf) in zip(keys, results):
+                    if key in self._seen:   # track ainda vivo
+                        self._known[key] = (name, conf, batch[key][1])
+                self._inflight = set()
+                self.batches += 1
+                self.predicted += len(keys)
@@ -1,10 +1,24 @@
 # src/integration.py
+import gzip
+import json
+import os
 import threading
-from fastapi import FastAPI
+import time
+import zlib
+from typing import Optional
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from datetime import datetime, timezone
 import uvicorn
 
+from event_store import EventStore, HourlyHistogram, DEFAULT_DB_PATH
+from stream import StreamHub, stream_status
+from state import EventRing, SnapshotCell
+from timeseries import TimeSeriesStore
+import wire
+from metrics import METRICS
+
 # --- API Fast ---
 app = FastAPI(title="Alerta Bet BR API", version="1.0")
 
@@ -15,10 +29,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # --- Estado global (atualizado pelo main.py) ---
-_state = {
+# Snapshot imutável trocado atomicamente a cada update_status: a API sempre
+# serializa um estado consistente, sem lock do lado de quem lê.
+_status = SnapshotCell({
     "have_face": False,
     "faces": 0,
     "ear": 0.0,
@@ -26,34 +43,131 @@ _state = {
     "blink_count": 0,
     "minutes_on": 0.0,
     "risky": False,
-}
+    "sessions": {},   # por id de sessão ("cam0:f1"): ear, blink_rate, risky...
+    "cameras": {},    # modo multi-câmera: status por câmera ("cam0", "cam1", ...)
+})
+
+# --- Streaming (SSE): taxa máxima de envio do status por cliente ---
+# ex: set ALERTABET_STREAM_HZ=2
+STREAM_MAX_HZ = float(os.getenv("ALERTABET_STREAM_HZ", "5"))
+_hub = StreamHub()
+
+# --- Eventos recentes (buffer circular, 500 itens) ---
+_events = EventRing(500)  # cada item: {"type": "risk", "timestamp": "...", "msg": "...", "ts": epoch}
+
+# --- Persistência (SQLite, write-behind) ---
+# ex: set ALERTABET_EVENTS_DB=C:\dados\events.db   (vazio = só memória)
+_DB_PATH = os.getenv("ALERTABET_EVENTS_DB", DEFAULT_DB_PATH)
+_store = None
+_store_lock = threading.Lock()
+
+# --- Contadores por hora (gráfico 24h), atualizados em log_event ---
+_hist = HourlyHistogram()
+
+# --- Histórico das métricas do status (/series), alimentado em update_status ---
+# buckets de 1 min/1 h fechados vão para a tabela 'series' do banco
+SERIES_METRICS = ("ear", "blink_rate", "faces")
+
+
+def _flush_series(metric, res, row):
+    store = _store or None   # nunca abre o banco aqui (thread do frame loop)
+    if store is not None:
+        store.put_series(metric, res, row)
+
 
-# --- Lista de eventos recentes ---
-_events = []  # cada item: {"type": "risk", "timestamp": "...", "msg": "..."}
+_series = TimeSeriesStore(SERIES_METRICS, sink=_flush_series)
+
+# --- Métricas (/metrics): valores lidos na hora do scrape ---
+def _text_cache(cache: str, key: str) -> float:
+    from utils import text_cache_stats   # utils puxa OpenCV/Pillow: só quando pedido
+    return text_cache_stats()[cache][key]
+
+
+METRICS.gauge("alertabet_series_bytes", _series.nbytes, "Memória do histórico de métricas (fixa)")
+METRICS.gauge("alertabet_series_flushed_total", lambda: _series.flushed,
+              "Buckets do histórico enviados ao banco", kind="counter")
+METRICS.gauge("alertabet_stream_clients", lambda: _hub.clients, "Clientes conectados no /stream")
+METRICS.gauge("alertabet_events_written_total", lambda: _get_store().written,
+              "Eventos gravados no SQLite", kind="counter")
+METRICS.gauge("alertabet_events_pending", lambda: _get_store().pending(),
+              "Eventos na fila de gravação")
+for _cache, _keys in (("fonts", ("hits", "misses")),):
+    for _key in _keys:
+        METRICS.gauge(f"alertabet_text_cache_{_key}_total",
+                      lambda c=_cache, k=_key: _text_cache(c, k),
+                      f"Cache de texto: {_key}", kind="counter", cache=_cache)
+    METRICS.gauge("alertabet_text_cache_size", lambda c=_cache: _text_cache(c, "size"),
+                  "Itens no cache de texto", cache=_cache)
 
 # --- Callback remoto de reset (registrado pelo main.py) ---
 _reset_callback = None
 
+# --- Config em tempo real (config.ConfigService, registrado pelo main.py) ---
+_config = None
+
 
 # ============================================================
 # Funções utilitárias para o main.py chamar
 # ============================================================
 
 def update_status(**kwargs):
-    """Atualiza o estado global (chamado pelo main.py a cada frame)."""
-    _state.update({k: v for k, v in kwargs.items() if k in _state})
+    """Publica um novo snapshot do estado (chamado pelo main.py a cada frame)."""
+    _status.update(**kwargs)
+    # EAR sem rosto é 0 e só puxaria a média para baixo
+    samples = {k: kwargs[k] for k in SERIES_METRICS
+               if k in kwargs and (k != "ear" or kwargs.get("have_face", True))}
+    if samples:
+        _series.add(time.time(), **samples)
+
+
+def _get_state():
+    """(versão, estado somente leitura) — usado pelo streaming."""
+    snap = _status.get()
+    return snap.version, snap.data
+
+
+def _iso(ts: float) -> str:
+    """Epoch -> ISO 8601 em UTC (mesmo formato de datetime.utcnow().isoformat())."""
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _get_store():
+    """
+    Abre o EventStore na primeira utilização (None se desativado/falhar).
+    run_in_thread já o abre na partida, fora do frame loop; log_event e
+    _flush_series só usam o que estiver aberto (nada de disco no loop).
+    """
+    global _store
+    if _store is None and _DB_PATH:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = EventStore(_DB_PATH)
+                    # histórico já gravado entra nos contadores por hora
+                    since = time.time() - _hist.keep_hours * 3600
+                    _hist.seed(_store.hourly_counts(since))
+                except Exception as e:
+                    print("[ERRO] Banco de eventos indisponível, usando só memória:", e)
+                    _store = False
+    return _store or None
 
 
 def log_event(event_type: str, msg: str = ""):
-    """Adiciona um evento à lista (visível em /events)."""
-    _events.append({
+    """Adiciona um evento à lista (visível em /events) e agenda a gravação."""
+    ts = time.time()
+    ev = {
         "type": event_type,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _iso(ts),
         "msg": msg,
-    })
-    # mantém até 500 eventos recentes
-    if len(_events) > 500:
-        del _events[:-500]
+        "ts": ts,
+    }
+    _events.append(ev)   # O(1); o buffer descarta o mais antigo
+
+    store = _store or None   # aberto na partida (run_in_thread): aqui só enfileira
+    _hist.add(ts, event_type)
+    if store is not None:
+        store.put(ts, event_type, msg)   # só enfileira: nada de I/O aqui
+    _hub.publish_event(ev)               # push imediato p/ clientes do /stream
 
 
 def set_reset_callback(fn):
@@ -62,8 +176,15 @@ def set_reset_callback(fn):
     _reset_callback = fn
 
 
+def set_config_service(svc):
+    """Permite que o main.py exponha a config em GET/PATCH /config."""
+    global _config
+    _config = svc
+
+
 def run_in_thread(host="127.0.0.1", port=8000):
     """Inicia o servidor FastAPI em thread paralela (não bloqueante)."""
+    _get_store()   # banco aberto (e contadores carregados) antes do 1º log_event
     def _run():
         uvicorn.run(app, host=host, port=port, log_level="error")
     th = threading.Thread(target=_run, daemon=True)
@@ -75,16 +196,116 @@ def run_in_thread(host="127.0.0.1", port=8000):
 # Rotas HTTP
 # ============================================================
 
+def _respond(request: Request, data, encode_bin, compress: bool = False) -> Response:
+    """
+    JSON (padrão) ou o formato binário de wire.py, se o Accept pedir. Com
+    'compress', corpos grandes vão em gzip para quem aceita (Accept-Encoding).
+    """
+    if wire.wants_binary(request.headers.get("accept", "")):
+        body, media = encode_bin(data), wire.MEDIA_BIN
+    else:
+        body, media = json.dumps(data, separators=(",", ":")).encode("utf-8"), wire.MEDIA_JSON
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if (compress and len(body) >= wire.GZIP_MIN_BYTES
+            and wire.accepts_gzip(request.headers.get("accept-encoding", ""))):
+        body = gzip.compress(body, compresslevel=wire.GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type=media, headers=headers)
+
+
 @app.get("/status")
-def get_status():
+def get_status(request: Request):
     """Retorna o estado atual do sistema (para o dashboard)."""
-    return _state
+    snap = _status.get()
+    return _respond(request, snap.as_dict(),
+                    lambda d: wire.encode_status(d, snap.version, time.time()))
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Histogramas por estágio, filas, descartes e gravação de eventos (Prometheus)."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stream")
+async def stream(request: Request, hz: float = Query(STREAM_MAX_HZ, gt=0)):
+    """
+    Server-Sent Events: 'status' (snapshot inicial e depois só deltas, até
+    'hz' por segundo, limitado por ALERTABET_STREAM_HZ) e 'event' (na hora).
+    """
+    gen = stream_status(_hub, _get_state, request.is_disconnected, min(hz, STREAM_MAX_HZ))
+    return StreamingResponse(gen, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.get("/events")
-def get_events():
-    """Retorna a lista de eventos recentes."""
-    return _events
+def get_events(
+    request: Request,
+    since: Optional[float] = None,
+    limit: int = Query(500, ge=0, le=10000),
+    event_type: Optional[str] = Query(None, alias="type"),
+):
+    """
+    Retorna eventos em ordem cronológica (os 'limit' mais recentes).
+    Filtros: since (epoch s), type (ex.: risk). Lê do SQLite quando disponível.
+    """
+    store = _get_store()
+    if store is None:
+        evs = [e for e in _events.snapshot()
+               if (since is None or e["ts"] >= since)
+               and (not event_type or e["type"] == event_type)]
+        evs = evs[-limit:] if limit else []
+    else:
+        evs = [
+            {"id": i, "type": typ, "timestamp": _iso(ts), "msg": details or "", "ts": ts}
+            for (i, ts, typ, details) in store.query(since, limit, event_type)
+        ]
+    return _respond(request, evs, wire.encode_events, compress=True)
+
+
+@app.get("/series")
+def get_series(request: Request, metric: str = "ear", res: str = "1m",
+               since: Optional[float] = None):
+    """
+    Histórico de uma métrica do status em colunas (t = início do bucket, epoch s;
+    min/max/mean/n por bucket). since: epoch s, ou negativo = segundos atrás.
+    Antes do que ainda está em memória, completa com os buckets gravados no banco.
+    """
+    if metric not in _series.metrics or res not in _series.resolutions:
+        return JSONResponse({"detail": f"metric em {list(_series.metrics)}, "
+                                       f"res em {list(_series.resolutions)}"}, status_code=422)
+    if since is not None and since < 0:
+        since = time.time() + since
+    data = _series.query(metric, res, since)
+    oldest = _series.oldest(metric, res)
+    store = _get_store() if res in _series.persist else None
+    if store is not None and since is not None and (oldest is None or since < oldest):
+        rows = store.query_series(metric, res, since, until=oldest)
+        if rows:
+            for key, col in zip(("t", "min", "max", "mean", "n"), zip(*rows)):
+                data[key] = list(col) + data[key]
+    data.update(metric=metric, res=res, step=_series.resolutions[res][0])
+    return _respond(request, data, wire.encode_series, compress=True)
+
+
+@app.get("/events/histogram")
+def get_events_histogram(
+    request: Request,
+    hours: int = Query(24, ge=1, le=168),
+    event_type: str = Query("risk", alias="type"),
+):
+    """
+    Contagem de eventos por hora (UTC), da mais antiga para a atual.
+    Responde 304 se o ETag (If-None-Match) não mudou.
+    """
+    _get_store()  # garante o histórico do banco nos contadores
+    counts = _hist.series(event_type, hours)
+    cur_hour = int(time.time() // 3600)
+    etag = '"%d-%08x"' % (cur_hour, zlib.crc32(repr((event_type, counts)).encode()))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(counts, headers=headers)
 
 
 @app.post("/reset")
@@ -96,16 +317,34 @@ def reset():
         except Exception as e:
             print("[ERRO] Callback de reset falhou:", e)
     log_event("reset", "via API")
-    _state["blink_rate"] = 0.0
-    _state["blink_count"] = 0
+    update_status(blink_rate=0.0, blink_count=0)
     return {"ok": True, "msg": "Reset executado"}
 
 
+@app.get("/config")
+def get_config():
+    """Versão atual da config (parâmetros, origem e horário da mudança)."""
+    if _config is None:
+        return JSONResponse({"detail": "config indisponível"}, status_code=503)
+    return _config.current.as_dict()
+
+
+@app.patch("/config")
+async def patch_config(request: Request):
+    """Mudança parcial ({chave: valor}); vale a partir do próximo frame, sem reiniciar."""
+    if _config is None:
+        return JSONResponse({"detail": "config indisponível"}, status_code=503)
+    try:
+        ver = _config.update(await request.json(), "api")
+    except ValueError as e:   # JSON inválido também é ValueError
+        return JSONResponse({"detail": str(e)}, status_code=422)
+    return ver.as_dict()
+
+
 # ============================================================
 # Execução direta (opcional para testes)
 # ============================================================
 if __name__ == "__main__":
     run_in_thread()
-    import time
     while True:
         time.sleep(1)
@@ -1,45 +1,86 @@
 import os
-# Silenciar logs chatos do TF/MediaPipe
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
-os.environ["GLOG_minloglevel"] = "2"
-
 import sys
 import math
 import time
 import ctypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-import mediapipe as mp
 
+# Só módulos leves no import: MediaPipe (analyzer.open_face_mesh), FastAPI/
+# uvicorn (integration) e a identificação carregam em main(), em paralelo
+# com a câmera. Os processos do multicam (spawn) reimportam este arquivo.
 from utils import (
-    create_trackbars, get_params, draw_rect,
-    panel, text, label_value, badge, eye_aspect_ratio,
-    render_controls_legend, COL_ACC, COL_OK, COL_BAD,
-    big_alert,
+    draw_rect,
+    panel, text, label_value, badge,
+    render_controls_legend, COL_ACC, COL_OK, COL_BAD, COL_DIM,
+    big_alert, DEFAULT_PARAMS,
 )
 from risk_model import RiskModel
-
-# >>> Integração (API local + eventos)
-from integration import (
-    run_in_thread as start_api,
-    update_status,
-    log_event,
-    set_reset_callback,
-)
+from analyzer import FrameAnalyzer, load_face_cascade, open_face_mesh
+from sessions import FaceTracker, SessionEngine
+from pipeline import DropOldestQueue, StageStats, CaptureThread, InferenceThread
+from multicam import MultiCamRunner, parse_cam_indices
+from frame_ring import SharedFrameRing
+from metrics import METRICS
+from camera import open_camera
+from governor import FrameGovernor
+from config import ConfigService, FileWatcher, TrackbarSource
 
 APP_WIN  = "Alerta Bet BR"
 CTRL_WIN = "Controles"
 
-# ---- Parâmetros de anti-ruído e alerta ----
-EAR_SMOOTH_N     = 5       # média móvel do EAR (frames)
-CLOSED_MIN_S     = 0.12    # duração mínima "fechado" para contar piscar
-REFRACTORY_S     = 0.80    # intervalo mínimo entre piscos
+# ---- Parâmetros de alerta (anti-ruído do EAR/piscos fica em analyzer.py) ----
 BEEP_INTERVAL_S  = 2.0     # intervalo entre beeps enquanto em risco (Windows)
 BEEP_FREQ_HZ     = 880
 BEEP_DUR_MS      = 150
 LEGEND_REFRESH_N = 60      # redesenhar legenda dos controles a cada N frames
 
-# ---- contadores em ESCOPO DE MÓDULO (para usar global no callback/tecla) ----
-blink_counter = 0
+# ---- Modo pipeline: captura / inferência / render em threads separadas ----
+# ex: set ALERTABET_PIPELINE=1
+PIPELINE_MODE    = os.getenv("ALERTABET_PIPELINE", "0") == "1"
+PIPELINE_QSIZE   = 2       # tamanho das filas (descarta o frame mais antigo)
+PIPELINE_SLOTS   = 2 * PIPELINE_QSIZE + 3  # frames em voo: filas + captura/inferência/render
+
+# ---- Resolução de inferência (largura em px; 0 = resolução da câmera) ----
+# ex: set ALERTABET_INFER_WIDTH=480
+INFER_WIDTH      = int(os.getenv("ALERTABET_INFER_WIDTH", "0"))
+
+# ---- Sessões: uma por rosto rastreado (ex: set ALERTABET_MAX_FACES=4) ----
+MAX_FACES        = max(1, int(os.getenv("ALERTABET_MAX_FACES", "1")))
+CAM_ID           = "cam0"  # prefixo dos ids de sessão ("cam0:f1", ...)
+
+# ---- Agendamento do Haar (ver analyzer.HAAR_MODES) ----
+# ex: set ALERTABET_HAAR_MODE=full   (roda o Haar em todo frame, como antes)
+HAAR_MODE        = os.getenv("ALERTABET_HAAR_MODE", "roi")
+HAAR_EVERY_N     = int(os.getenv("ALERTABET_HAAR_EVERY_N", "5"))
+
+# ---- Identificação (LBPH, data/faces/) por track, reverificada a cada N s ----
+# ex: set ALERTABET_FACE_ID=1  e  set ALERTABET_FACE_ID_REVERIFY_S=60
+FACE_ID          = os.getenv("ALERTABET_FACE_ID", "0") == "1"
+FACE_ID_REVERIFY_S = float(os.getenv("ALERTABET_FACE_ID_REVERIFY_S", "30"))
+# muitos cadastrados: set ALERTABET_FACE_ID_BACKEND=index (busca vetorizada, face_index.py)
+# e, acima de alguns milhares de fotos, set ALERTABET_FACE_ID_CLUSTERS=64 (índice grosso)
+FACE_ID_BACKEND  = os.getenv("ALERTABET_FACE_ID_BACKEND", "lbph")
+FACE_ID_CLUSTERS = int(os.getenv("ALERTABET_FACE_ID_CLUSTERS", "0"))
+
+# ---- Taxa adaptativa (governor.py): poucos fps sem rosto, o necessário p/ piscos com rosto ----
+# ex: set ALERTABET_IDLE_FPS=2   (ALERTABET_GOVERNOR=0 analisa todo frame, como antes)
+GOVERNOR_ON      = os.getenv("ALERTABET_GOVERNOR", "1") == "1"
+IDLE_FPS         = float(os.getenv("ALERTABET_IDLE_FPS", "5"))
+ACTIVE_FPS       = float(os.getenv("ALERTABET_ACTIVE_FPS", "0"))   # 0 = mínimo p/ piscos (25)
+
+# ---- Config: arquivo JSON vigiado (parcial, chaves de config.SCHEMA), além dos sliders e do PATCH /config ----
+# ex: set ALERTABET_CONFIG=\\servidor\alertabet\config.json
+CONFIG_PATH      = os.getenv("ALERTABET_CONFIG", "")
+
+# ---- Câmera: prazo de cada teste (abrir + 1º frame) na busca, ver camera.py ----
+# ex: set ALERTABET_CAM_PROBE_TIMEOUT_S=5
+CAM_PROBE_TIMEOUT_S = float(os.getenv("ALERTABET_CAM_PROBE_TIMEOUT_S", "3"))
+
+# ---- Multi-câmera: processos de inferência (0 = automático, ver multicam.py) ----
+# ex: set ALERTABET_CAM_INDEX=0,1,2,3  e  set ALERTABET_WORKERS=4
+WORKERS          = int(os.getenv("ALERTABET_WORKERS", "0"))
 
 # ---------- util: fixar janela como always-on-top (Windows) ----------
 def pin_window_top(window_title: str) -> None:
@@ -52,207 +93,123 @@ def pin_window_top(window_title: str) -> None:
     except Exception:
         pass
 
-# ---------- webcam com fallback de APIs/índices ----------
-def open_camera() -> cv2.VideoCapture:
-    """Tenta abrir a webcam priorizando DirectShow (Windows) e aceita override via env."""
-    preferred = os.getenv("ALERTABET_CAM_INDEX")   # ex: set ALERTABET_CAM_INDEX=0
-    try_indices = [int(preferred)] if preferred is not None else [0, 1, 2, 3]
-
-    candidates = []
-    # 1) DirectShow primeiro (costuma evitar o bug do MSMF)
-    for idx in try_indices:
-        candidates.append((idx, cv2.CAP_DSHOW))
-    # 2) Sem backend explícito
-    for idx in try_indices:
-        candidates.append((idx, 0))
-    # 3) Qualquer backend
-    for idx in try_indices:
-        candidates.append((idx, cv2.CAP_ANY))
-
-    for idx, api in candidates:
-        cap = cv2.VideoCapture(idx, api) if api != 0 else cv2.VideoCapture(idx)
-        if cap.isOpened():
-            # testa leitura real (alguns “abrem” mas não entregam frames)
-            ok, _ = cap.read()
-            if ok:
-                print(f"[OK] Camera aberta: index={idx}, api={api}")
-                return cap
-            cap.release()
-        print(f"[FAIL] index={idx}, api={api}")
-    raise RuntimeError(
-        "Nenhuma câmera pôde ser aberta. "
-        "Feche apps que usam a webcam e verifique as permissões de câmera do Windows."
-    )
-
-# ---------- janelas e controles ----------
-cv2.namedWindow(APP_WIN)
-cv2.namedWindow(CTRL_WIN)
-create_trackbars(CTRL_WIN)
-pin_window_top(CTRL_WIN)
-
-controls_canvas = render_controls_legend()
-cv2.imshow(CTRL_WIN, controls_canvas)
-
-# ---------- Haar Cascade ----------
-cascade_path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
-print("Usando Haar Cascade em:", cascade_path)
-face_cascade = cv2.CascadeClassifier(cascade_path)
-if face_cascade.empty():
-    raise FileNotFoundError(f"Não consegui carregar o Haar Cascade em {cascade_path}")
-
-# ---------- MediaPipe ----------
-mp_face = mp.solutions.face_mesh
-LEFT  = [33,160,158,133,153,144]
-RIGHT = [263,387,385,362,380,373]
-
-cap   = open_camera()
-model = RiskModel()  # defina warmup_s=5 no risk_model.py para testes mais rápidos
-
-# ---- Inicia API de integração (thread) ----
-start_api()  # http://127.0.0.1:8000
+# ---------- estado do app (inicializado em main()) ----------
+# Nada de janelas/câmera no import: no modo multi-câmera os processos de
+# inferência (spawn) reimportam este módulo como __mp_main__.
+controls_canvas = None
+face_cascade   = None
+cap            = None
+model          = None
+sessions       = None
+analyzer       = None
+identity       = None   # IdentityService (ALERTABET_FACE_ID=1)
+api            = None   # módulo integration (importado em 2º plano por load_api)
+governor       = None   # FrameGovernor (ALERTABET_GOVERNOR=1)
 
 help_on        = False
 last_beep_time = 0.0
+prev_risky     = False  # para logar evento só na transição
+frame_count    = 0
+config         = None   # ConfigService (sliders, arquivo, API)
+trackbars      = None   # TrackbarSource da janela de controles
+params         = DEFAULT_PARAMS  # versão aplicada (config.current.params), trocada na inferência
+params_version = 0
+
+# ---- contadores por estágio (substituem o antigo fps_hist) ----
+stats = {
+    "cap": StageStats("cap"),
+    "inf": StageStats("inf"),
+    "ui":  StageStats("ui"),
+}
+
+# ---- spans do loop para /metrics (no-ops com ALERTABET_METRICS=0) ----
+SP_CAPTURE  = METRICS.span("capture")
+SP_INFER    = METRICS.span("infer")
+SP_PUBLISH  = METRICS.span("publish")
+SP_RENDER   = METRICS.span("render")
+SP_ALERT    = METRICS.span("big_alert")
+SP_IMSHOW   = METRICS.span("imshow")
+SP_PIN      = METRICS.span("pin_window_top")
+SP_WAITKEY  = METRICS.span("waitkey")
+
+
+def infer(frame, ts, seq):
+    """Inferência de um frame + sessões + publicação (thread de inferência)."""
+    global params, params_version
+    cfg = config.current
+    if cfg.version != params_version:   # só quando alguma fonte mudou a config
+        params, params_version = cfg.params, cfg.version
+        sessions.configure(params)
+    with SP_INFER:
+        res = analyzer.process(frame, ts, params, seq)
+    if identity is not None:
+        identity.observe(CAM_ID, res, frame)   # só recorta tracks novos/vencidos
+    if governor is not None:
+        governor.observe(ts, res.have_face)
+    with SP_PUBLISH:
+        sessions.update(ts, [f"{CAM_ID}:{fid}" for fid in res.face_ids],
+                        res.face_ears if res.face_ears is not None else (), params["EAR_thr"])
+        publish(res)
+    return res
+
+
+def publish(res) -> None:
+    """Envia o resultado do frame para a API (/status e evento de risco)."""
+    global prev_risky
+    api.update_status(
+        have_face=bool(res.have_face),
+        faces=int(len(res.faces)),
+        ear=float(res.ear),
+        blink_rate=float(res.blink_rate),
+        blink_count=int(res.blink_count),
+        minutes_on=float(res.minutes_on),
+        risky=bool(res.risky),
+        sessions=identity.annotate(sessions.snapshot()) if identity else sessions.snapshot(),
+    )
 
-with mp_face.FaceMesh(static_image_mode=False, refine_landmarks=True, max_num_faces=1,
-                      min_detection_confidence=0.5, min_tracking_confidence=0.5) as mesh:
-
-    # NÃO recrie blink_counter aqui!
-    closed_start_t = None
-    last_blink_t   = 0.0
-    is_closed      = False
-    fps_hist, ear_hist = [], []
-    frame_count    = 0
-    prev_risky     = False  # para logar evento só na transição
-
-    # callback remoto (POST /reset) — usa 'global' em vez de nonlocal
-    def _reset_callback():
-        global blink_counter
-        blink_counter = 0
-        model.reset_counters()
-        log_event("reset", "api")
-    set_reset_callback(_reset_callback)
-
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-        t0 = time.perf_counter()
-        frame_count += 1
-
-        # --- parâmetros atuais dos sliders ---
-        params = get_params(CTRL_WIN)
-        model.set_risk_minutes(params["risk_minutes"])  # usar setter do modelo novo
-        EAR_low  = params["EAR_thr"]
-        EAR_high = EAR_low + 0.03  # histerese
-
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # ---- Haar (retângulos de rosto) ----
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=params["scaleFactor"],
-            minNeighbors=params["minNeighbors"],
-            minSize=(params["minSize"], params["minSize"]),
-        )
-
-        # ---- MediaPipe (landmarks) ----
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        res = mesh.process(rgb)
-
-        # considera rosto presente se HAAR OU MediaPipe detectarem
-        have_face = bool(res.multi_face_landmarks) or (len(faces) > 0)
-
-        ear = 0.0
-        valid_faces = []
-
-        if res.multi_face_landmarks:
-            lm = res.multi_face_landmarks[0].landmark
-            H, W = frame.shape[:2]
-
-            def pts(idx):
-                return [(int(lm[i].x * W), int(lm[i].y * H)) for i in idx]
-
-            L, R = pts(LEFT), pts(RIGHT)
-
-            # landmarks dos olhos
-            for p in L + R:
-                cv2.circle(frame, p, 1, (255, 0, 0), -1)
-
-            # EAR suavizado
-            ear_inst = (eye_aspect_ratio(L) + eye_aspect_ratio(R)) / 2.0
-            ear_hist = (ear_hist + [ear_inst])[-EAR_SMOOTH_N:]
-            ear = sum(ear_hist) / len(ear_hist)
-
-            # piscos robustos
-        # --- piscos robustos (dentro do if res.multi_face_landmarks) ---
-        tnow = time.perf_counter()
-
-        # entrou no estado "olho fechado"
-        if not is_closed and ear < EAR_low:
-            is_closed = True
-            closed_start_t = tnow
-
-        # saiu do estado "fechado" e voltou a abrir
-        elif is_closed and ear > EAR_high:
-            closed_dur = (tnow - (closed_start_t or tnow))
-            enough_duration = closed_dur >= CLOSED_MIN_S   # 0.12s ~ 3-4 frames
-            enough_gap      = (tnow - last_blink_t) >= REFRACTORY_S  # 0.8s
-
-            if enough_duration and enough_gap:
-                blink_counter += 1
-                last_blink_t = tnow
-                model.note_blink(tnow)   # <<< MUITO IMPORTANTE
-
-            is_closed = False
-            closed_start_t = None
-
-
-        # Desenha retângulo se Haar detectou (ajuda a estabilidade visual)
-        if len(faces) > 0:
-            x, y, w, h = max(faces, key=lambda f: f[2]*f[3])
-            valid_faces.append((x, y, w, h))
-            draw_rect(frame, x, y, w, h)
-
-        # ---- risco (passa se há rosto) ----
-        risky, rate, mins = model.update(face_present=have_face)
-
-        # >>> Atualiza API /status
-        update_status(
-            have_face=bool(have_face),
-            faces=int(len(faces)),
-            ear=float(ear),
-            blink_rate=float(rate),
-            minutes_on=float(mins),
-            risky=bool(risky),
-        )
-
-        # >>> Evento quando entra em risco
-        if risky and not prev_risky:
-            log_event("risk", f"minutes_on={mins:.2f}; blink_rate={rate:.1f}")
-        prev_risky = risky
-
-        # FPS
-        fps = 1.0 / max(1e-6, time.perf_counter() - t0)
-        fps_hist = (fps_hist + [fps])[-30:]
-        fps_avg  = sum(fps_hist) / len(fps_hist)
-
-        # ---- UI principal ----
-        H, W = frame.shape[:2]
-        panel(frame, 0, 0, W, 40, 0.55)
-        text(frame, "Alerta Bet BR", (14, 26), 0.8, COL_ACC, 2)
-
-        px, py, pw, ph = 10, 50, 240, 220
-        panel(frame, px, py, pw, ph, 0.55)
-        label_value(frame, "FPS",        f"{fps_avg:.1f}",  px+14, py+20)
-        label_value(frame, "Faces",      f"{len(valid_faces)}", px+14, py+60)
-        label_value(frame, "EAR",        f"{ear:.3f}",      px+14, py+100)
-        label_value(frame, "Blinks/min", f"{rate:.1f}",     px+14, py+140)
-        label_value(frame, "Tempo (min)",f"{mins:.1f}",     px+14, py+180)
-
-        if risky:
-            badge(frame, "RISCO", px+14, py+ph-36, COL_BAD)
-            pulse = abs(math.sin(time.perf_counter() * 2.2))
+    # >>> Evento quando entra em risco
+    if res.risky and not prev_risky:
+        api.log_event("risk", f"minutes_on={res.minutes_on:.2f}; blink_rate={res.blink_rate:.1f}")
+    prev_risky = res.risky
+
+
+def render(frame, res) -> None:
+    """Desenha overlays a partir do resultado (roda na thread da UI)."""
+    global last_beep_time
+
+    # landmarks dos olhos
+    if res.eye_pts is not None:
+        for x, y in res.eye_pts:
+            cv2.circle(frame, (int(x), int(y)), 1, (255, 0, 0), -1)
+
+    # Desenha retângulo se Haar detectou (ajuda a estabilidade visual)
+    valid_faces = []
+    if res.faces:
+        x, y, w, h = max(res.faces, key=lambda f: f[2]*f[3])
+        valid_faces.append((x, y, w, h))
+        draw_rect(frame, x, y, w, h)
+
+    # ---- UI principal ----
+    H, W = frame.shape[:2]
+    panel(frame, 0, 0, W, 40, 0.55)
+    text(frame, "Alerta Bet BR", (14, 26), 0.8, COL_ACC, 2)
+
+    px, py, pw, ph = 10, 50, 240, 220
+    panel(frame, px, py, pw, ph, 0.55)
+    label_value(frame, "FPS",        f"{stats['inf'].rate:.1f}", px+14, py+20)
+    label_value(frame, "Faces",      f"{len(valid_faces)}", px+14, py+60)
+    label_value(frame, "EAR",        f"{res.ear:.3f}",      px+14, py+100)
+    label_value(frame, "Blinks/min", f"{res.blink_rate:.1f}", px+14, py+140)
+    label_value(frame, "Tempo (min)",f"{res.minutes_on:.1f}", px+14, py+180)
+
+    # latência/vazão por estágio (rodapé)
+    line = " | ".join(s.short() for s in stats.values())
+    text(frame, line, (14, H - 10), 0.45, COL_DIM, 1)
+
+    if res.risky:
+        badge(frame, "RISCO", px+14, py+ph-36, COL_BAD)
+        pulse = abs(math.sin(time.perf_counter() * 2.2))
+        with SP_ALERT:
             big_alert(
                 frame,
                 title="RISCO - PAUSA AGORA",
@@ -260,53 +217,290 @@ with mp_face.FaceMesh(static_image_mode=False, refine_landmarks=True, max_num_fa
                 hint="Pressione R para resetar contadores",
                 pulse=pulse
             )
-            if sys.platform.startswith("win") and (time.perf_counter() - last_beep_time > BEEP_INTERVAL_S):
-                try:
-                    import winsound
-                    winsound.Beep(BEEP_FREQ_HZ, BEEP_DUR_MS)
-                except Exception:
-                    pass
-                last_beep_time = time.perf_counter()
-        else:
-            badge(frame, "OK", px+14, py+ph-36, COL_OK)
-
-        # Overlay de ajuda (H)
-        if help_on:
-            w_help, h_help = 420, 180
-            panel(frame, W - w_help - 10, 50, w_help, h_help, 0.75)
-            text(frame, "Ajuda / Atalhos", (W - w_help + 14, 72), 0.75, COL_ACC, 2)
-            lines = [
-                "H : Mostrar/ocultar esta ajuda",
-                "R : Resetar tempo e contadores",
-                "S : Salvar frame (./frame_YYYYMMDD_HHMMSS.png)",
-                "Q/ESC : Sair",
-                "Dica: aumente 'neighbors' e 'minSize' para reduzir falsos positivos.",
-            ]
-            y = 96
-            for ln in lines:
-                text(frame, ln, (W - w_help + 14, y), 0.6)
-                y += 24
-
+        if sys.platform.startswith("win") and (time.perf_counter() - last_beep_time > BEEP_INTERVAL_S):
+            try:
+                import winsound
+                winsound.Beep(BEEP_FREQ_HZ, BEEP_DUR_MS)
+            except Exception:
+                pass
+            last_beep_time = time.perf_counter()
+    else:
+        badge(frame, "OK", px+14, py+ph-36, COL_OK)
+
+    # Overlay de ajuda (H)
+    if help_on:
+        w_help, h_help = 420, 180
+        panel(frame, W - w_help - 10, 50, w_help, h_help, 0.75)
+        text(frame, "Ajuda / Atalhos", (W - w_help + 14, 72), 0.75, COL_ACC, 2)
+        lines = [
+            "H : Mostrar/ocultar esta ajuda",
+            "R : Resetar tempo e contadores",
+            "S : Salvar frame (./frame_YYYYMMDD_HHMMSS.png)",
+            "Q/ESC : Sair",
+            "Dica: aumente 'neighbors' e 'minSize' para reduzir falsos positivos.",
+        ]
+        y = 96
+        for ln in lines:
+            text(frame, ln, (W - w_help + 14, y), 0.6)
+            y += 24
+
+
+def show(frame) -> bool:
+    """imshow + teclado. Retorna False quando o usuário pede para sair."""
+    global frame_count
+    frame_count += 1
+
+    with SP_IMSHOW:
         cv2.imshow(APP_WIN, frame)
+    with SP_PIN:
         pin_window_top(CTRL_WIN)
 
-        if frame_count % LEGEND_REFRESH_N == 0:
-            cv2.imshow(CTRL_WIN, controls_canvas)
+    if frame_count % LEGEND_REFRESH_N == 0:
+        cv2.imshow(CTRL_WIN, controls_canvas)
 
+    with SP_WAITKEY:
         k = cv2.waitKey(1) & 0xFF
-        if k in (27, ord('q')):  # ESC/Q
+    return handle_key(k, frame)
+
+
+def handle_key(k, frame=None) -> bool:
+    global help_on
+    if k in (27, ord('q')):  # ESC/Q
+        return False
+    elif k in (ord('h'), ord('H')):
+        help_on = not help_on
+    elif k in (ord('r'), ord('R')):
+        analyzer.request_reset()
+        sessions.request_reset()
+        api.log_event("reset", "keyboard")
+    elif k in (ord('s'), ord('S')) and frame is not None:
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        fn = f"frame_{ts}.png"
+        cv2.imwrite(fn, frame)
+        print("Frame salvo:", fn)
+    return True
+
+
+def run_sequential() -> None:
+    """Loop clássico: captura, inferência e render na mesma thread."""
+    seq = 0
+    frame = None   # buffer reaproveitado: cap.read() grava no mesmo array
+    while True:
+        t0 = time.perf_counter()
+        if governor is not None and not governor.due(t0):
+            # fora da cadência: só drena a câmera (sem decodificar/inferir/desenhar)
+            if not cap.grab():
+                break
+            continue
+        with SP_CAPTURE:
+            ok, frame = cap.read(image=frame)
+        if not ok:
             break
-        elif k in (ord('h'), ord('H')):
-            help_on = not help_on
-        elif k in (ord('r'), ord('R')):
-            blink_counter = 0
-            model.reset_counters()
-            log_event("reset", "keyboard")
-        elif k in (ord('s'), ord('S')):
-            ts = time.strftime("%Y%m%d_%H%M%S")
-            fn = f"frame_{ts}.png"
-            cv2.imwrite(fn, frame)
-            print("Frame salvo:", fn)
-
-cap.release()
-cv2.destroyAllWindows()
+        ts = time.perf_counter()
+        stats["cap"].record(ts - t0)
+        seq += 1
+
+        trackbars.sync()   # sliders acompanham mudanças vindas do arquivo/API
+
+        t1 = time.perf_counter()
+        res = infer(frame, ts, seq)
+        t2 = time.perf_counter()
+        stats["inf"].record(t2 - t1)
+
+        with SP_RENDER:
+            render(frame, res)
+        keep = show(frame)
+        stats["ui"].record(time.perf_counter() - t2)
+        if not keep:
+            break
+
+
+def run_pipelined() -> None:
+    """
+    Captura e inferência em threads próprias; render/UI fica na thread
+    principal (exigência do HighGUI). Filas limitadas descartam o mais antigo.
+    """
+    ok, first = cap.read()
+    if not ok:
+        return
+    # frames vivem num anel pré-alocado; descartes devolvem o slot na hora
+    ring  = SharedFrameRing(first.shape, PIPELINE_SLOTS)
+    stop  = threading.Event()
+    cap_q = DropOldestQueue(PIPELINE_QSIZE, on_drop=lambda it: ring.release(it[-1]))
+    out_q = DropOldestQueue(PIPELINE_QSIZE, on_drop=lambda it: ring.release(it[-1]))
+
+    for name, q in (("cap", cap_q), ("out", out_q)):
+        METRICS.gauge("alertabet_queue_depth", q.qsize, "Itens na fila do pipeline", queue=name)
+        METRICS.gauge("alertabet_frames_dropped_total", lambda q=q: q.dropped,
+                      "Frames descartados", kind="counter", where=name)
+    METRICS.gauge("alertabet_frames_dropped_total", lambda: ring.dropped,
+                  "Frames descartados", kind="counter", where="ring")
+    METRICS.gauge("alertabet_ring_in_use", ring.in_use, "Slots do anel de frames em uso")
+
+    workers = [
+        CaptureThread(cap, cap_q, stats["cap"], stop, ring=ring, governor=governor),
+        InferenceThread(cap_q, out_q, infer, stats["inf"], stop),
+    ]
+    for th in workers:
+        th.start()
+
+    try:
+        while not stop.is_set():
+            trackbars.sync()
+            item = out_q.get(timeout=0.1)
+            if item is None:
+                # mantém a janela responsiva enquanto não chega frame
+                if not handle_key(cv2.waitKey(1) & 0xFF):
+                    break
+                continue
+            t0 = time.perf_counter()
+            frame, res, slot = item
+            with SP_RENDER:
+                render(frame, res)
+            keep = show(frame)
+            ring.release(slot)
+            stats["ui"].record(time.perf_counter() - t0)
+            if not keep:
+                break
+    finally:
+        stop.set()
+        for th in workers:
+            th.join(timeout=1.0)
+        ring.close()
+        print(f"[INFO] frames descartados: cap={cap_q.dropped} inf={out_q.dropped} anel={ring.dropped}")
+
+
+def load_api(host="127.0.0.1", port=8000):
+    """Importa a integração (FastAPI/uvicorn) e sobe a API numa thread própria."""
+    import integration
+    integration.run_in_thread(host, port)  # http://127.0.0.1:8000
+    return integration
+
+
+def make_governor():
+    """FrameGovernor com os limites do app, ou None (ALERTABET_GOVERNOR=0)."""
+    if not GOVERNOR_ON:
+        return None
+    gov = FrameGovernor(idle_fps=IDLE_FPS, active_fps=ACTIVE_FPS)
+    print(f"[OK] Taxa adaptativa: {1 / gov.idle_period:.0f} fps sem rosto, "
+          f"{1 / gov.active_period:.0f} fps com rosto")
+    return gov
+
+
+def make_identity():
+    """IdentityService com o backend escolhido (o modelo carrega em 2º plano)."""
+    from identity import IdentityService
+    if FACE_ID_BACKEND == "index":
+        from face_index import load_face_index
+        return IdentityService(loader=lambda: load_face_index(n_clusters=FACE_ID_CLUSTERS),
+                               reverify_s=FACE_ID_REVERIFY_S)
+    return IdentityService(reverify_s=FACE_ID_REVERIFY_S)
+
+
+def make_config() -> ConfigService:
+    """Config central: padrões + arquivo vigiado (ALERTABET_CONFIG), se houver."""
+    svc = ConfigService()
+    if CONFIG_PATH:
+        FileWatcher(svc, CONFIG_PATH).start()
+    return svc
+
+
+def attach_config_api(svc: ConfigService) -> None:
+    """GET/PATCH /config; mudanças vindas de fora dos sliders ficam no log de eventos."""
+    api.set_config_service(svc)
+    svc.subscribe(lambda v: v.source != "trackbars"
+                  and api.log_event("config", f"v{v.version} ({v.source})"))
+
+
+def run_multicam(indices) -> None:
+    """Várias câmeras, sem janelas: status por câmera na API (Ctrl+C encerra)."""
+    global api, config
+    config = make_config()
+    with ThreadPoolExecutor(max_workers=len(indices) + 1) as boot:
+        api_f = boot.submit(load_api)
+        caps  = list(boot.map(lambda i: open_camera([i], CAM_PROBE_TIMEOUT_S), indices))
+        api   = api_f.result()
+    cams   = {f"cam{idx}": cap for idx, cap in zip(indices, caps)}
+    attach_config_api(config)
+    ident  = make_identity() if FACE_ID else None
+    runner = MultiCamRunner(cams, config, workers=WORKERS,
+                            haar_mode=HAAR_MODE, haar_every_n=HAAR_EVERY_N,
+                            infer_width=INFER_WIDTH, max_faces=MAX_FACES, identity=ident,
+                            governor=make_governor if GOVERNOR_ON else None)
+    runner.run()
+
+
+def main() -> None:
+    global controls_canvas, face_cascade, cap, model, sessions, analyzer, identity, api
+    global governor, config, trackbars
+    t0 = time.perf_counter()
+
+    indices = parse_cam_indices(os.getenv("ALERTABET_CAM_INDEX"))  # ex: set ALERTABET_CAM_INDEX=0,1,2
+    if len(indices) > 1:
+        run_multicam(indices)
+        return
+
+    # ---- em 2º plano: API primeiro, depois o FaceMesh (import do MediaPipe) ----
+    boot   = ThreadPoolExecutor(max_workers=2, thread_name_prefix="boot")
+    api_f  = boot.submit(load_api)
+    mesh_f = boot.submit(open_face_mesh, max_num_faces=MAX_FACES)
+    boot.shutdown(wait=False)
+    if FACE_ID:
+        identity = make_identity()   # o modelo também carrega na thread do serviço
+
+    # ---------- janelas e controles (HighGUI: thread principal) ----------
+    cv2.namedWindow(APP_WIN)
+    cv2.namedWindow(CTRL_WIN)
+    config    = make_config()
+    trackbars = TrackbarSource(config, CTRL_WIN)
+    pin_window_top(CTRL_WIN)
+
+    controls_canvas = render_controls_legend()
+    cv2.imshow(CTRL_WIN, controls_canvas)
+
+    # ---------- Haar Cascade ----------
+    face_cascade = load_face_cascade()
+
+    cap   = open_camera(indices or None, CAM_PROBE_TIMEOUT_S)
+    t_cam = time.perf_counter() - t0
+    model = RiskModel()  # defina warmup_s=5 no risk_model.py para testes mais rápidos
+    sessions = SessionEngine(cfg=model.cfg)  # mesma config (risk_min dos sliders)
+    governor = make_governor()
+
+    for name, st in stats.items():
+        METRICS.gauge("alertabet_stage_rate", lambda st=st: st.rate,
+                      "Itens por segundo em cada estágio", stage=name)
+    if governor is not None:
+        METRICS.gauge("alertabet_governor_fps", lambda: governor.fps,
+                      "Taxa alvo de análise (fps)", camera=CAM_ID)
+        METRICS.gauge("alertabet_frames_skipped_total", lambda: governor.skipped,
+                      "Frames só drenados (fora da cadência)", kind="counter", camera=CAM_ID)
+
+    api = api_f.result()
+    attach_config_api(config)
+    with mesh_f.result() as mesh:
+        print(f"[INFO] Partida em {time.perf_counter() - t0:.1f}s (câmera em {t_cam:.1f}s)")
+
+        analyzer = FrameAnalyzer(face_cascade, mesh, model,
+                                 haar_mode=HAAR_MODE, haar_every_n=HAAR_EVERY_N,
+                                 infer_width=INFER_WIDTH, tracker=FaceTracker())
+
+        # callback remoto (POST /reset) — o reset é aplicado no próximo frame
+        def _reset_callback():
+            analyzer.request_reset()
+            sessions.request_reset()
+            api.log_event("reset", "api")
+        api.set_reset_callback(_reset_callback)
+
+        if PIPELINE_MODE:
+            print("[OK] Modo pipeline (captura / inferência / render em threads)")
+            run_pipelined()
+        else:
+            run_sequential()
+
+    cap.release()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# metrics.py
+# Instrumentação leve do hot path, exposta em /metrics (formato Prometheus).
+#  - Histogram: buckets fixos (contagens pré-alocadas), observe() não aloca;
+#  - METRICS.span("mesh"): mede um trecho com 'with' (objeto reaproveitado);
+#  - METRICS.gauge(...): valores lidos só na hora do scrape (filas, descartes...).
+# Com ALERTABET_METRICS=0 os spans viram no-ops e nada é medido.
+# Concorrência: o mesmo span pode ser usado por várias threads (o início fica
+# num threading.local) e observe() é serializado por um lock por histograma.
+# Limite: o registro é por processo. No modo multi-câmera os estágios do
+# analyzer rodam nos processos worker e não aparecem no /metrics; ali saem só
+# os estágios do processo principal e os gauges por câmera (fila, anel, taxa).
+from __future__ import annotations
+
+from bisect import bisect_left
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+_now = time.perf_counter
+
+# segundos; cobre de 0,5 ms (EAR, badges) a 1 s (Haar em 1080p, travadas)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STAGE_METRIC = "alertabet_stage_seconds"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Contagens por bucket (le = limite superior), soma e total."""
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()   # sem disputa no caso comum (uma thread por estágio)
+
+    def observe(self, v: float) -> None:
+        i = bisect_left(self.buckets, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """(contagens, soma, total) coerentes entre si, para o scrape."""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Span:
+    """
+    Mede o tempo de um bloco 'with' no histograma. O início fica por thread,
+    então threads diferentes podem usar o mesmo span ao mesmo tempo; dentro
+    de uma thread ele não é reentrante (não aninhe o mesmo estágio).
+    """
+    __slots__ = ("hist", "_tl")
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+        self._tl = threading.local()
+
+    def __enter__(self):
+        self._tl.t0 = _now()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(_now() - self._tl.t0)
+        return False
+
+
+class _NullSpan:
+    """Span desligado: custo de uma chamada vazia."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _fmt_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_num(v: float) -> str:
+    return repr(float(v)) if v != float("inf") else "+Inf"
+
+
+class Metrics:
+    """Registro de histogramas e gauges; render() gera o texto do /metrics."""
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._hists: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, Callable[[], float]]] = {}
+        self._meta: Dict[str, Tuple[str, str]] = {}     # nome -> (tipo, help)
+        self._spans: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    # -------- registro --------
+    def histogram(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            fam = self._hists.setdefault(name, {})
+            h = fam.get(key)
+            if h is None:
+                h = fam[key] = Histogram(buckets)
+                self._meta.setdefault(name, ("histogram", help))
+            return h
+
+    def span(self, stage: str):
+        """Span do estágio 'stage' (reaproveitado; pegue uma vez e guarde)."""
+        if not self.enabled:
+            return NULL_SPAN
+        sp = self._spans.get(stage)
+        if sp is None:
+            sp = self._spans[stage] = Span(self.histogram(
+                STAGE_METRIC, "Duração de cada estágio do loop de vídeo", stage=stage))
+        return sp
+
+    def gauge(self, name: str, fn: Callable[[], float], help: str = "",
+              kind: str = "gauge", **labels) -> None:
+        """Registra (ou troca) um valor lido na hora do scrape. kind: gauge | counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = fn
+            self._meta.setdefault(name, (kind, help))
+
+    # -------- exposição --------
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            hists = {n: dict(f) for n, f in self._hists.items()}
+            gauges = {n: dict(f) for n, f in self._gauges.items()}
+            meta = dict(self._meta)
+
+        for name in sorted(hists):
+            kind, help_ = meta[name]
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, h in sorted(hists[name].items()):
+                counts, total, n = h.snapshot()
+                acc = 0
+                for le, c in zip(h.buckets + (float("inf"),), counts):
+                    acc += c
+                    le_label = 'le="%s"' % _fmt_num(le)
+                    lines.append(f"{name}_bucket{_fmt_labels(key, le_label)} {acc}")
+                lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_num(total)}")
+                lines.append(f"{name}_count{_fmt_labels(key)} {n}")
+
+        for name in sorted(gauges):
+            kind, help_ = meta[name]
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, fn in sorted(gauges[name].items()):
+                try:
+                    v = float(fn())
+                except Exception:
+                    continue   # fonte ainda não existe (ex.: fila do modo pipeline)
+                lines.append(f"{name}{_fmt_labels(key)} {_fmt_num(v)}")
+        return "\n".join(lines) + "\n"
+
+
+# ex: set ALERTABET_METRICS=0   (desliga a instrumentação)
+METRICS = Metrics(enabled=os.getenv("ALERTABET_METRICS", "1") == "1")
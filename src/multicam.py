@@ -0,0 +1,317 @@
+# multicam.py
+# Modo multi-câmera: uma thread de captura por câmera e um pool fixo de
+# processos para a inferência (FaceMesh + Haar + EAR), fora do GIL do
+# processo principal. Os frames vão por shared memory (frame_ring.py); pelas
+# filas passam só (câmera, slot, seq, ts, params) e o FrameResult de volta.
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from analyzer import FrameAnalyzer, load_face_cascade, open_face_mesh
+from frame_ring import SharedFrameRing
+from pipeline import StageStats
+from risk_model import RiskConfig, RiskModel
+from sessions import FaceTracker, SessionEngine
+from metrics import METRICS
+
+RING_SLOTS   = 3      # frames em voo por câmera (captura descarta se lotar)
+STATS_EVERY_S = 5.0   # linha de estatísticas no console
+
+
+def parse_cam_indices(value: Optional[str]) -> List[int]:
+    """'0' -> [0]; '0,1, 3' -> [0, 1, 3]; vazio/None -> []."""
+    if not value:
+        return []
+    return [int(v) for v in value.replace(";", ",").split(",") if v.strip()]
+
+
+def default_workers(n_cams: int) -> int:
+    """Processos de inferência: um por câmera, deixando 2 núcleos livres."""
+    return max(1, min(n_cams, (os.cpu_count() or 2) - 2))
+
+
+# ============================================================
+# Processo worker
+# ============================================================
+
+def worker_main(in_q, out_q, haar_mode: str, haar_every_n: int,
+                infer_width: int, max_faces: int) -> None:
+    """
+    Loop do processo de inferência. Cada câmera atribuída a este worker tem
+    seu próprio FrameAnalyzer (FaceMesh em modo vídeo + RiskModel), então a
+    afinidade câmera -> worker é fixa. Mensagens:
+      ("ring",  cam, spec)                     anexa o anel de frames da câmera
+      ("frame", cam, slot, seq, ts, params)    processa e devolve (cam, slot, res)
+      ("reset", cam)                           zera contadores da câmera
+      None                                     encerra
+    """
+    cascade = load_face_cascade()
+    rings: Dict[str, SharedFrameRing] = {}
+    analyzers: Dict[str, FrameAnalyzer] = {}
+    meshes = []
+    try:
+        while True:
+            msg = in_q.get()
+            if msg is None:
+                break
+            kind, cam = msg[0], msg[1]
+            if kind == "ring":
+                rings[cam] = SharedFrameRing.attach(msg[2])
+                continue
+
+            an = analyzers.get(cam)
+            if an is None:
+                mesh = open_face_mesh(max_num_faces=max_faces)
+                meshes.append(mesh)
+                an = analyzers[cam] = FrameAnalyzer(
+                    cascade, mesh, RiskModel(),
+                    haar_mode=haar_mode, haar_every_n=haar_every_n,
+                    infer_width=infer_width, tracker=FaceTracker())
+
+            if kind == "reset":
+                an.request_reset()
+                continue
+
+            _, _, slot, seq, ts, params = msg
+            res = None
+            try:
+                # lê direto do slot compartilhado (o analyzer não escreve no frame)
+                res = an.process(rings[cam].frames[slot], ts, params, seq)
+            except Exception as e:
+                print(f"[ERRO] worker {os.getpid()} {cam}:", e)
+            out_q.put((cam, slot, res))   # devolve o slot mesmo em erro
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for m in meshes:
+            m.close()
+        for r in rings.values():
+            r.close()
+
+
+# ============================================================
+# Processo principal
+# ============================================================
+
+class CameraFeed(threading.Thread):
+    """Captura de uma câmera para o anel de shared memory do worker dela."""
+    def __init__(self, cam: str, cap, ring: SharedFrameRing, worker_q,
+                 get_params: Callable[[], dict], stats: StageStats, stop: threading.Event,
+                 governor=None):
+        super().__init__(name=f"capture-{cam}", daemon=True)
+        self.cam, self.cap, self.ring, self.worker_q = cam, cap, ring, worker_q
+        self.get_params, self.stats, self.stop = get_params, stats, stop
+        self.governor = governor
+
+    def run(self) -> None:
+        seq = 0
+        while not self.stop.is_set():
+            t0 = time.perf_counter()
+            if self.governor is not None and not self.governor.due(t0):
+                if not self.cap.grab():            # fora da cadência: só drena a câmera
+                    print(f"[WARN] {self.cam}: câmera parou de entregar frames")
+                    break
+                continue
+            ok, slot = self.ring.read(self.cap)   # grava direto no slot compartilhado
+            if not ok:
+                print(f"[WARN] {self.cam}: câmera parou de entregar frames")
+                break
+            ts = time.perf_counter()
+            self.stats.record(ts - t0)
+            seq += 1
+            if slot is None:
+                continue               # worker atrasado: anel cheio, frame descartado
+            self.worker_q.put(("frame", self.cam, slot, seq, ts, self.get_params()))
+
+
+class MultiCamRunner:
+    """
+    Liga N câmeras a um pool de processos e junta os resultados no status
+    da integração: /status['cameras'][cam] por câmera, /status['sessions']
+    com ids "camX:fY" e os campos de topo resumindo todas as câmeras.
+    """
+    def __init__(self, cams: Dict[str, object], config, workers: int = 0,
+                 haar_mode: str = "roi", haar_every_n: int = 5,
+                 infer_width: int = 0, max_faces: int = 1, identity=None,
+                 governor: Optional[Callable[[], object]] = None):
+        import integration   # FastAPI/uvicorn só no processo principal (os workers importam este módulo)
+        self.api = integration
+        self.caps = cams                       # {"cam0": VideoCapture, ...}
+        self.identity = identity               # identity.IdentityService (opcional)
+        # governor: fábrica de governor.FrameGovernor (um por câmera) ou None
+        self.governors = {cam: governor() for cam in cams} if governor else {}
+        # config: config.ConfigService; self.params é a cópia (dict, vai por pickle
+        # aos workers) da versão aplicada, trocada inteira em on_result
+        self.config = config
+        self._cfg_version = config.version
+        self.params = dict(config.current.params)
+        self.n_workers = workers or default_workers(len(cams))
+        self.cfg = (haar_mode, haar_every_n, infer_width, max_faces)
+
+        self.stop = threading.Event()
+        self.rings: Dict[str, SharedFrameRing] = {}
+        self.worker_of: Dict[str, int] = {}
+        self.in_qs: List = []
+        self.procs: List = []
+        self.feeds: List[CameraFeed] = []
+
+        self.stats = {cam: {"cap": StageStats(f"{cam}.cap"), "inf": StageStats(f"{cam}.inf")}
+                      for cam in cams}
+        self.sessions = {cam: SessionEngine(cfg=RiskConfig()) for cam in cams}
+        for eng in self.sessions.values():
+            eng.configure(self.params)   # versão da partida (arquivo/API já aplicados)
+        self.cam_status: Dict[str, dict] = {}
+        self.cam_sessions: Dict[str, dict] = {}
+        self.prev_risky: Dict[str, bool] = {cam: False for cam in cams}
+
+    # -------- ciclo de vida --------
+    def start(self) -> None:
+        ctx = mp.get_context("spawn")     # mesmo comportamento em Windows e Linux
+        self.out_q = ctx.Queue()
+        for w in range(self.n_workers):
+            q = ctx.Queue()
+            p = ctx.Process(target=worker_main, args=(q, self.out_q) + self.cfg,
+                            name=f"alertabet-inf-{w}", daemon=True)
+            p.start()
+            self.in_qs.append(q)
+            self.procs.append(p)
+
+        for i, (cam, cap) in enumerate(self.caps.items()):
+            ok, frame = cap.read()
+            if not ok:
+                raise RuntimeError(f"{cam}: sem frames")
+            ring = SharedFrameRing(frame.shape, RING_SLOTS)
+            self.rings[cam] = ring
+            self.worker_of[cam] = i % self.n_workers
+            q = self.in_qs[self.worker_of[cam]]
+            q.put(("ring", cam, ring.spec))
+            gov = self.governors.get(cam)
+            self.feeds.append(CameraFeed(cam, cap, ring, q, lambda: self.params,
+                                         self.stats[cam]["cap"], self.stop, governor=gov))
+            if gov is not None:
+                METRICS.gauge("alertabet_governor_fps", lambda g=gov: g.fps,
+                              "Taxa alvo de análise (fps)", camera=cam)
+                METRICS.gauge("alertabet_frames_skipped_total", lambda g=gov: g.skipped,
+                              "Frames só drenados (fora da cadência)", kind="counter", camera=cam)
+            METRICS.gauge("alertabet_frames_dropped_total", lambda r=ring: r.dropped,
+                          "Frames descartados", kind="counter", where=cam)
+            METRICS.gauge("alertabet_ring_in_use", ring.in_use,
+                          "Slots do anel de frames em uso", camera=cam)
+            METRICS.gauge("alertabet_stage_rate", lambda st=self.stats[cam]["inf"]: st.rate,
+                          "Itens por segundo em cada estágio", stage=f"{cam}.inf")
+        for f in self.feeds:
+            f.start()
+        self.api.set_reset_callback(self._reset_callback)
+        print(f"[OK] Multi-câmera: {len(self.caps)} câmeras, {self.n_workers} processos de inferência")
+
+    def close(self) -> None:
+        self.stop.set()
+        for f in self.feeds:
+            f.join(timeout=1.0)
+        for q in self.in_qs:
+            q.put(None)
+        for p in self.procs:
+            p.join(timeout=3.0)
+            if p.is_alive():
+                p.terminate()
+        for r in self.rings.values():
+            r.close()
+        for cap in self.caps.values():
+            cap.release()
+        if self.identity is not None:
+            self.identity.close()
+        print("[INFO] frames descartados: " +
+              " ".join(f"{cam}={r.dropped}" for cam, r in self.rings.items()))
+
+    # -------- reset --------
+    def request_reset(self) -> None:
+        for cam, w in self.worker_of.items():
+            self.in_qs[w].put(("reset", cam))
+        for eng in self.sessions.values():
+            eng.request_reset()
+
+    def _reset_callback(self) -> None:
+        self.request_reset()
+        self.api.log_event("reset", "api")
+
+    # -------- coleta --------
+    def run(self) -> None:
+        """Loop do processo principal: recebe resultados e publica (até Ctrl+C)."""
+        self.start()
+        next_print = time.monotonic() + STATS_EVERY_S
+        try:
+            while not self.stop.is_set():
+                try:
+                    cam, slot, res = self.out_q.get(timeout=0.2)
+                except queue.Empty:
+                    cam, slot, res = None, None, None
+                if res is not None:
+                    self.stats[cam]["inf"].record(time.perf_counter() - res.ts)
+                    if self.identity is not None:
+                        # o slot ainda é nosso: recorta as ROIs antes de liberar;
+                        # pedidos de todas as câmeras saem num só lote
+                        self.identity.observe(cam, res, self.rings[cam].frames[slot])
+                    self.on_result(cam, res)
+                if cam is not None:
+                    self.rings[cam].release(slot)
+                if time.monotonic() >= next_print:
+                    next_print += STATS_EVERY_S
+                    print(" | ".join(s.short() for st in self.stats.values() for s in st.values()))
+                if not any(f.is_alive() for f in self.feeds):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def _sessions(self) -> Dict[str, dict]:
+        merged = {k: v for s in self.cam_sessions.values() for k, v in s.items()}
+        return self.identity.annotate(merged) if self.identity is not None else merged
+
+    def on_result(self, cam: str, res) -> None:
+        gov = self.governors.get(cam)
+        if gov is not None:
+            gov.observe(res.ts, res.have_face)
+        cfg = self.config.current
+        if cfg.version != self._cfg_version:   # só quando alguma fonte mudou a config
+            self._cfg_version, self.params = cfg.version, dict(cfg.params)
+            for e in self.sessions.values():
+                e.configure(self.params)
+        eng = self.sessions[cam]
+        eng.update(res.ts, [f"{cam}:{fid}" for fid in res.face_ids],
+                   res.face_ears if res.face_ears is not None else (), self.params["EAR_thr"])
+        self.cam_sessions[cam] = eng.snapshot()
+        self.cam_status[cam] = {
+            "have_face": bool(res.have_face),
+            "faces": int(len(res.faces)),
+            "ear": round(float(res.ear), 4),
+            "blink_rate": round(float(res.blink_rate), 2),
+            "blink_count": int(res.blink_count),
+            "minutes_on": round(float(res.minutes_on), 3),
+            "risky": bool(res.risky),
+            "fps": round(self.stats[cam]["inf"].rate, 1),
+        }
+
+        # campos de topo: câmera mais crítica (em risco / mais tempo de tela)
+        cams = self.cam_status
+        lead = max(cams.values(), key=lambda c: (c["risky"], c["minutes_on"]))
+        self.api.update_status(
+            have_face=any(c["have_face"] for c in cams.values()),
+            faces=sum(c["faces"] for c in cams.values()),
+            ear=lead["ear"],
+            blink_rate=lead["blink_rate"],
+            blink_count=lead["blink_count"],
+            minutes_on=lead["minutes_on"],
+            risky=any(c["risky"] for c in cams.values()),
+            cameras=dict(cams),
+            sessions=self._sessions(),
+        )
+
+        if res.risky and not self.prev_risky[cam]:
+            self.api.log_event("risk", f"{cam}: minutes_on={res.minutes_on:.2f}; blink_rate={res.blink_rate:.1f}")
+        self.prev_risky[cam] = bool(res.risky)
@@ -0,0 +1,171 @@
+# pipeline.py
+# Modo em pipeline: captura / inferência / render em estágios separados,
+# ligados por filas limitadas que descartam o item MAIS ANTIGO quando cheias
+# (sempre preferimos o frame mais recente a acumular atraso).
+from __future__ import annotations
+
+from collections import deque
+import threading
+import time
+from typing import Any, Callable, Deque, Optional
+
+from metrics import METRICS
+
+_now = time.perf_counter
+
+
+class DropOldestQueue:
+    """
+    Fila FIFO limitada; put() nunca bloqueia e descarta o item mais antigo.
+    'on_drop(item)' é chamado para o item descartado (ex.: devolver o slot
+    do frame ao anel).
+    """
+    def __init__(self, maxsize: int = 2, on_drop: Optional[Callable[[Any], None]] = None):
+        self._items: Deque[Any] = deque()
+        self._maxsize = max(1, int(maxsize))
+        self._cond = threading.Condition()
+        self._on_drop = on_drop
+        self.dropped: int = 0
+
+    def put(self, item: Any) -> None:
+        old = None
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                old = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if old is not None and self._on_drop is not None:
+            self._on_drop(old)
+
+    def get(self, timeout: float | None = None) -> Optional[Any]:
+        """Retorna o próximo item (ordem de chegada) ou None no timeout."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    """
+    Contadores por estágio: latência (média móvel exponencial e máximo)
+    e vazão (itens/s, recalculada a cada ~1 s).
+    """
+    def __init__(self, name: str, alpha: float = 0.1, window_s: float = 1.0):
+        self.name = name
+        self.alpha = alpha
+        self.window_s = window_s
+
+        self.count: int = 0
+        self.latency_ms: float = 0.0
+        self.max_ms: float = 0.0
+        self.rate: float = 0.0
+
+        self._lock = threading.Lock()
+        self._win_t0: float = _now()
+        self._win_n: int = 0
+
+    def record(self, dt_s: float) -> None:
+        """Registra um item processado em dt_s segundos."""
+        ms = dt_s * 1000.0
+        with self._lock:
+            self.count += 1
+            self.latency_ms = ms if self.count == 1 else (
+                self.latency_ms + self.alpha * (ms - self.latency_ms))
+            self.max_ms = max(self.max_ms, ms)
+
+            self._win_n += 1
+            t = _now()
+            span = t - self._win_t0
+            if span >= self.window_s:
+                self.rate = self._win_n / span
+                self._win_t0, self._win_n = t, 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "latency_ms": round(self.latency_ms, 2),
+                "max_ms": round(self.max_ms, 2),
+                "rate": round(self.rate, 2),
+            }
+
+    def short(self) -> str:
+        """Resumo curto para o overlay (ex.: 'inf 24.8/s 35.1ms')."""
+        return f"{self.name} {self.rate:.1f}/s {self.latency_ms:.1f}ms"
+
+
+class CaptureThread(threading.Thread):
+    """
+    Lê frames da câmera e publica (seq, ts_captura, frame, slot) na fila.
+    Com 'ring' (frame_ring.SharedFrameRing) o frame é lido direto num slot
+    do anel, que volta a ficar livre quando o consumidor chama ring.release(slot);
+    sem anel, slot é None e cada leitura aloca um frame novo.
+    Com 'governor' (governor.FrameGovernor) os frames fora da cadência só
+    passam por cap.grab() e não entram na fila.
+    """
+    def __init__(self, cap, out_q: DropOldestQueue, stats: StageStats,
+                 stop: threading.Event, ring=None, governor=None):
+        super().__init__(name="capture", daemon=True)
+        self.cap, self.out_q, self.stats, self.stop = cap, out_q, stats, stop
+        self.ring = ring
+        self.governor = governor
+
+    def run(self) -> None:
+        seq = 0
+        span = METRICS.span("capture")
+        while not self.stop.is_set():
+            t0 = _now()
+            if self.governor is not None and not self.governor.due(t0):
+                if not self.cap.grab():
+                    break
+                continue
+            with span:
+                if self.ring is not None:
+                    ok, slot = self.ring.read(self.cap)
+                    frame = self.ring.frames[slot] if slot is not None else None
+                else:
+                    (ok, frame), slot = self.cap.read(), None
+            if not ok:
+                break
+            ts = _now()
+            seq += 1
+            if frame is not None:           # None = anel cheio, frame descartado
+                self.out_q.put((seq, ts, frame, slot))
+            self.stats.record(ts - t0)
+        self.stop.set()
+
+
+class InferenceThread(threading.Thread):
+    """
+    Único worker de inferência: consome os frames EM ORDEM e entrega
+    (frame, resultado, slot) ao render. Como há um só consumidor, a lógica de risco
+    vê os frames na ordem de captura (descartes nunca reordenam).
+    """
+    def __init__(self, in_q: DropOldestQueue, out_q: DropOldestQueue,
+                 process: Callable[[Any, float, int], Any], stats: StageStats,
+                 stop: threading.Event):
+        super().__init__(name="inference", daemon=True)
+        self.in_q, self.out_q, self.process = in_q, out_q, process
+        self.stats, self.stop = stats, stop
+
+    def run(self) -> None:
+        try:
+            while not self.stop.is_set():
+                item = self.in_q.get(timeout=0.25)
+                if item is None:
+                    continue
+                seq, ts, frame, slot = item
+                t0 = _now()
+                result = self.process(frame, ts, seq)
+                self.stats.record(_now() - t0)
+                self.out_q.put((frame, result, slot))
+        finally:
+            # erro na inferência derruba o pipeline inteiro (não trava o render)
+            self.stop.set()
@@ -1,10 +1,11 @@
 # risk_model.py
 from __future__ import annotations
 
-from collections import deque
+from array import array
 from dataclasses import dataclass
+import math
 import time
-from typing import Deque, Tuple
+from typing import Callable, Optional, Tuple
 
 _now = time.perf_counter  # relógio monotônico (estável)
 
@@ -17,6 +18,71 @@ class RiskConfig:
     warmup_s: float       = 5.0    # tempo antes de avaliar risco
     max_dt_s: float       = 0.6    # limite para picos de dt (anti saltos)
 
+class BlinkWindow:
+    """
+    Janela deslizante de timestamps de piscos em buffer circular pré-alocado.
+
+    - count: piscos dentro da janela (contador mantido a cada add/trim)
+    - trim(t): remove os antigos; O(1) amortizado (cada piscar sai uma vez)
+    - rate: estimativa com decaimento exponencial (constante tau_s), em
+      piscos/s: r(t) = r(t0)*exp(-(t - t0)/tau) e cada piscar soma 1/tau.
+      Não depende de quantos piscos há na janela, então não oscila com 2-3.
+    Nenhuma chamada aloca listas/deques; pode rodar na taxa de frames (o
+    buffer só cresce, dobrando, se lotar: a contagem nunca perde piscos).
+    """
+    __slots__ = ("_ts", "_cap", "_tail", "count", "tau_s", "_r", "_r_t")
+
+    def __init__(self, capacity: int = 256, tau_s: float = 15.0):
+        self._cap = int(capacity)
+        self._ts = array("d", bytes(8 * self._cap))   # zeros, tamanho fixo
+        self._tail = 0          # índice do piscar mais antigo
+        self.count = 0
+        self.tau_s = float(tau_s)
+        self._r = 0.0           # taxa (piscos/s) no instante _r_t
+        self._r_t = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self) -> None:
+        self._tail = 0
+        self.count = 0
+        self._r = 0.0
+        self._r_t = 0.0
+
+    def add(self, t: float) -> None:
+        if self.count == self._cap:
+            self._grow()   # lotado (não deve ocorrer com refratário)
+        self._ts[(self._tail + self.count) % self._cap] = t
+        self.count += 1
+        self._r = self.rate(t) + 1.0 / self.tau_s
+        self._r_t = t
+
+    def _grow(self) -> None:
+        """Dobra a capacidade, reordenando do mais antigo ao mais novo."""
+        ts, cap = self._ts, self._cap
+        new = array("d", bytes(16 * cap))
+        for k in range(self.count):
+            new[k] = ts[(self._tail + k) % cap]
+        self._ts, self._cap, self._tail = new, 2 * cap, 0
+
+    def trim(self, t: float, window_s: float) -> None:
+        """Remove piscos com (t - ts) > window_s."""
+        ts, cap = self._ts, self._cap
+        while self.count and (t - ts[self._tail]) > window_s:
+            self._tail = (self._tail + 1) % cap
+            self.count -= 1
+
+    def rate(self, t: float) -> float:
+        """Taxa com decaimento exponencial (piscos/s) no instante t."""
+        if self._r == 0.0:
+            return 0.0
+        return self._r * math.exp(-max(0.0, t - self._r_t) / self.tau_s)
+
+    def oldest(self) -> Optional[float]:
+        return self._ts[self._tail] if self.count else None
+
+
 class RiskModel:
     """
     Regras de risco:
@@ -26,7 +92,8 @@ class RiskModel:
 
     API:
       - note_blink(t=None): registra um piscar (timestamp opcional)
-      - update(face_present: bool) -> (risky, blink_rate_per_min, minutes_on)
+      - blink_rate_per_min(t=None): taxa suavizada (decaimento exponencial)
+      - update(face_present: bool, t=None) -> (risky, blink_rate_per_min, minutes_on)
       - reset_counters(): zera contadores (piscos/tempo)
     """
     def __init__(self,
@@ -34,7 +101,10 @@ class RiskModel:
                  risk_minutes: float   = 15.0,
                  blink_rate_hi: float  = 60.0,
                  warmup_s: float       = 5.0,
-                 max_dt_s: float       = 0.6):
+                 max_dt_s: float       = 0.6,
+                 clock: Callable[[], float] | None = None):
+        # relógio injetável (testes); None = _now do módulo
+        self._clock = clock
         self.cfg = RiskConfig(
             blink_window_s=blink_window_s,
             risk_minutes=risk_minutes,
@@ -43,39 +113,42 @@ class RiskModel:
             max_dt_s=max_dt_s,
         )
 
-        self.blinks: Deque[float] = deque()   # timestamps de piscos
+        self.blinks = BlinkWindow(tau_s=blink_window_s)  # timestamps de piscos
         self.active_seconds: float = 0.0      # acumula só com face_present=True
 
-        now = _now()
+        now = self._time()
         self._last_t: float = now            # p/ calcular dt entre frames
         self._session_start: float = now
 
         self.block_mode: bool = False        # estado de risco atual
 
+    def _time(self) -> float:
+        return self._clock() if self._clock is not None else _now()
+
     # -------- piscos --------
     def note_blink(self, t: float | None = None) -> None:
         """Registra um piscar e mantém a janela deslizante."""
-        t = _now() if t is None else t
-        self.blinks.append(t)
+        t = self._time() if t is None else t
+        self.blinks.tau_s = self.cfg.blink_window_s
+        self.blinks.add(t)
         self._trim_blinks(t)
 
     def _trim_blinks(self, t: float) -> None:
         """Remove piscos fora da janela deslizante."""
-        win = self.cfg.blink_window_s
-        while self.blinks and (t - self.blinks[0]) > win:
-            self.blinks.popleft()
+        self.blinks.trim(t, self.cfg.blink_window_s)
 
-    def blink_rate_per_min(self, t=None):
-        t = _now() if t is None else t
-        # mantém a janela deslizante
-        while self.blinks and t - self.blinks[0] > self.window_s:
-            self.blinks.popleft()
-
-        if len(self.blinks) < 2:
-            return 0.0
+    def blinks_in_window(self, t: float | None = None) -> int:
+        """Quantidade de piscos na janela (contador corrente)."""
+        t = self._time() if t is None else t
+        self._trim_blinks(t)
+        return self.blinks.count
 
-        span = max(1e-3, self.blinks[-1] - self.blinks[0])  # segundos
-        return len(self.blinks) / span * 60.0
+    def blink_rate_per_min(self, t: float | None = None) -> float:
+        """Taxa de piscos/min (estimativa com decaimento exponencial, tau = janela)."""
+        t = self._time() if t is None else t
+        # mantém a janela deslizante
+        self._trim_blinks(t)
+        return self.blinks.rate(t) * 60.0
 
     # -------- tempo --------
     def minutes_on(self) -> float:
@@ -89,7 +162,7 @@ class RiskModel:
         """Zera o tempo ativo e a janela de piscos."""
         self.blinks.clear()
         self.active_seconds = 0.0
-        now = _now()
+        now = self._time()
         self._last_t = now
         self._session_start = now
         self.block_mode = False
@@ -98,14 +171,15 @@ class RiskModel:
         self.cfg.risk_minutes = max(0.0, float(mins))
 
     # -------- passo de atualização --------
-    def update(self, face_present: bool) -> Tuple[bool, float, float]:
+    def update(self, face_present: bool, t: float | None = None) -> Tuple[bool, float, float]:
         """
         Deve ser chamada a cada frame.
         Se face_present=True, acumula dt em active_seconds.
+        t: timestamp do frame (ex.: instante de captura); padrão = _now().
         Retorna: (risky, blink_rate_per_min, minutes_on)
         """
-        t = _now()
-        raw_dt = t - (self._last_t or t)
+        t = self._time() if t is None else t
+        raw_dt = t - self._last_t   # _last_t sempre definido (__init__/reset); 0.0 é válido (mídia)
         # anti picos (ex.: pausa de SO, arrasto de janela etc.)
         dt = max(0.0, min(raw_dt, self.cfg.max_dt_s))
         self._last_t = t
@@ -0,0 +1,212 @@
+# sessions.py
+# Várias sessões (rostos/câmeras) no mesmo processo.
+# O estado de todas as sessões fica em arrays NumPy (struct-of-arrays), e o
+# passo de cada frame — tempo ativo, máquina de piscos, taxa e risco — é uma
+# única operação vetorizada, em vez de um RiskModel por objeto.
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from analyzer import EAR_SMOOTH_N, CLOSED_MIN_S, REFRACTORY_S, EAR_HYST
+from risk_model import RiskConfig
+
+
+class FaceTracker:
+    """
+    Associa rostos entre frames pelo centro mais próximo (coords normalizadas),
+    gerando ids estáveis ('f1', 'f2', ...). Guloso, suficiente p/ poucos rostos.
+    """
+    def __init__(self, max_dist: float = 0.15):
+        self.max_dist = max_dist
+        self._ids: List[str] = []
+        self._centers = np.zeros((0, 2), dtype=np.float32)
+        self._next = 1
+
+    def assign(self, centers: np.ndarray) -> List[str]:
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 2)
+        ids: List[Optional[str]] = [None] * len(centers)
+        if len(centers) and len(self._centers):
+            d = np.linalg.norm(centers[:, None, :] - self._centers[None, :, :], axis=-1)
+            used = set()
+            for flat in np.argsort(d, axis=None):
+                i, j = divmod(int(flat), d.shape[1])
+                if d[i, j] > self.max_dist:
+                    break
+                if ids[i] is None and j not in used:
+                    ids[i] = self._ids[j]
+                    used.add(j)
+        for i in range(len(ids)):
+            if ids[i] is None:
+                ids[i] = f"f{self._next}"
+                self._next += 1
+        self._ids, self._centers = list(ids), centers.copy()
+        return ids
+
+
+class SessionEngine:
+    """
+    Equivalente vetorizado de RiskModel + máquina de piscos do analyzer,
+    para N sessões. Cada sessão ocupa um slot nos arrays; sessões sem
+    observação por mais de ttl_s são liberadas.
+    """
+    def __init__(self, cfg: RiskConfig | None = None, capacity: int = 64, ttl_s: float = 10.0):
+        self.cfg = cfg or RiskConfig()
+        self.ttl_s = ttl_s
+        self.ear_smooth_n = EAR_SMOOTH_N    # ajustáveis pela config (configure)
+        self.refractory_s = REFRACTORY_S
+        self._slot: Dict[str, int] = {}
+        self._reset_req = threading.Event()
+        self._alloc(capacity)
+
+    # -------- armazenamento --------
+    def _alloc(self, n: int) -> None:
+        self.ids: List[Optional[str]] = [None] * n
+        self.alive      = np.zeros(n, dtype=bool)
+        self.present    = np.zeros(n, dtype=bool)
+        self.last_seen  = np.zeros(n)
+        self.last_t     = np.zeros(n)
+        self.active_s   = np.zeros(n)
+        self.ear_hist   = np.zeros((n, self.ear_smooth_n), dtype=np.float32)
+        self.ear_pos    = np.zeros(n, dtype=np.int32)
+        self.ear_n      = np.zeros(n, dtype=np.int32)
+        self.ear        = np.zeros(n, dtype=np.float32)
+        self.closed     = np.zeros(n, dtype=bool)
+        self.closed_t   = np.zeros(n)
+        self.last_blink = np.full(n, -np.inf)
+        self.blinks     = np.zeros(n, dtype=np.int64)
+        self.r          = np.zeros(n)          # taxa decaída (piscos/s) em r_t
+        self.r_t        = np.zeros(n)
+        self.rate       = np.zeros(n)          # piscos/min no último passo
+        self.risky      = np.zeros(n, dtype=bool)
+
+    def _grow(self) -> None:
+        old = {k: v for k, v in vars(self).items() if isinstance(v, np.ndarray)}
+        old_ids, n = self.ids, len(self.ids)
+        self._alloc(n * 2)
+        for k, v in old.items():
+            getattr(self, k)[:n] = v
+        self.ids[:n] = old_ids
+
+    def _clear_slots(self, idx) -> None:
+        for name in ("present", "active_s", "ear_pos", "ear_n", "ear", "closed",
+                     "closed_t", "blinks", "r", "r_t", "rate", "risky"):
+            getattr(self, name)[idx] = 0
+        self.ear_hist[idx] = 0.0
+        self.last_blink[idx] = -np.inf
+
+    def slot(self, sid: str, t: float) -> int:
+        i = self._slot.get(sid)
+        if i is not None:
+            return i
+        free = np.flatnonzero(~self.alive)
+        if not len(free):
+            self._grow()
+            free = np.flatnonzero(~self.alive)
+        i = int(free[0])
+        self._clear_slots(i)
+        self.ids[i] = sid
+        self.alive[i] = True
+        self.last_t[i] = self.last_seen[i] = t
+        self._slot[sid] = i
+        return i
+
+    def _expire(self, t: float) -> None:
+        dead = np.flatnonzero(self.alive & ((t - self.last_seen) > self.ttl_s))
+        for i in dead:
+            self._slot.pop(self.ids[i], None)
+            self.ids[i] = None
+        self.alive[dead] = False
+
+    # -------- controle --------
+    def request_reset(self) -> None:
+        """Zera contadores de todas as sessões no próximo update (seguro entre threads)."""
+        self._reset_req.set()
+
+    def configure(self, params) -> None:
+        """Parâmetros da config (config.py); chamar só quando a versão muda."""
+        cfg = self.cfg
+        cfg.risk_minutes = max(0.0, float(params.get("risk_minutes", cfg.risk_minutes)))
+        cfg.blink_rate_hi = float(params.get("blink_rate_hi", cfg.blink_rate_hi))
+        self.refractory_s = float(params.get("refractory_s", self.refractory_s))
+        n = int(params.get("EAR_smooth_n", self.ear_smooth_n))
+        if n != self.ear_smooth_n:
+            # nova janela de suavização: o histórico recomeça
+            self.ear_smooth_n = n
+            self.ear_hist = np.zeros((len(self.ids), n), dtype=np.float32)
+            self.ear_pos[:] = 0
+            self.ear_n[:] = 0
+
+    # -------- passo vetorizado --------
+    def update(self, t: float, sids: Sequence[str], ears, ear_thr: float) -> None:
+        """
+        Um passo para todas as sessões vivas. 'sids'/'ears' são as sessões
+        observadas neste frame (ids únicos) e seu EAR instantâneo.
+        """
+        cfg = self.cfg
+        if self._reset_req.is_set():
+            self._reset_req.clear()
+            self._clear_slots(self.alive)
+
+        idx = np.fromiter((self.slot(s, t) for s in sids), dtype=np.intp, count=len(sids))
+        self.last_seen[idx] = t
+        self._expire(t)
+        al = self.alive
+
+        self.present[:] = False
+        self.present[idx] = True
+
+        # tempo ativo (dt com o mesmo anti-pico do RiskModel)
+        dt = np.clip(t - self.last_t, 0.0, cfg.max_dt_s)
+        self.active_s += np.where(self.present, dt, 0.0)
+        self.last_t[al] = t
+
+        if len(idx):
+            # EAR suavizado (média das últimas ear_smooth_n amostras)
+            pos = self.ear_pos[idx]
+            self.ear_hist[idx, pos] = np.asarray(ears, dtype=np.float32)
+            self.ear_pos[idx] = (pos + 1) % self.ear_smooth_n
+            self.ear_n[idx] = np.minimum(self.ear_n[idx] + 1, self.ear_smooth_n)
+            e = self.ear_hist[idx].sum(axis=1) / self.ear_n[idx]
+            self.ear[idx] = e
+
+            # máquina de piscos (mesmas regras do FrameAnalyzer)
+            low, high = ear_thr, ear_thr + EAR_HYST
+            closed = self.closed[idx]
+            start = ~closed & (e < low)
+            stop = closed & (e > high)
+            blink = (stop & ((t - self.closed_t[idx]) >= CLOSED_MIN_S)
+                     & ((t - self.last_blink[idx]) >= self.refractory_s))
+            self.closed_t[idx] = np.where(start, t, self.closed_t[idx])
+            self.closed[idx] = (closed | start) & ~stop
+
+            b = idx[blink]
+            if len(b):
+                tau = cfg.blink_window_s
+                self.r[b] = self.r[b] * np.exp(-(t - self.r_t[b]) / tau) + 1.0 / tau
+                self.r_t[b] = t
+                self.blinks[b] += 1
+                self.last_blink[b] = t
+
+        # taxa e risco de todas as sessões
+        self.rate = self.r * np.exp(-np.maximum(0.0, t - self.r_t) / cfg.blink_window_s) * 60.0
+        mins = self.active_s / 60.0
+        self.risky = al & (self.active_s >= cfg.warmup_s) & (
+            (self.rate > cfg.blink_rate_hi) | (mins >= cfg.risk_minutes))
+
+    # -------- leitura --------
+    def snapshot(self) -> Dict[str, dict]:
+        """Estado por sessão, no formato de /status['sessions']."""
+        out = {}
+        for i in np.flatnonzero(self.alive):
+            out[self.ids[i]] = {
+                "present": bool(self.present[i]),
+                "ear": round(float(self.ear[i]), 4),
+                "blink_rate": round(float(self.rate[i]), 2),
+                "blink_count": int(self.blinks[i]),
+                "minutes_on": round(float(self.active_s[i]) / 60.0, 3),
+                "risky": bool(self.risky[i]),
+            }
+        return out
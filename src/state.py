@@ -0,0 +1,73 @@
+# state.py
+# Troca de estado entre o frame loop (thread do OpenCV) e a API (uvicorn).
+#  - SnapshotCell: snapshot imutável do status, trocado por atribuição atômica;
+#    leitores nunca veem um dict "pela metade".
+#  - EventRing: buffer circular de capacidade fixa para eventos, append O(1).
+from __future__ import annotations
+
+from dataclasses import dataclass
+import threading
+from types import MappingProxyType
+from typing import Any, List, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Status num instante; 'data' é somente leitura."""
+    version: int
+    data: Mapping[str, Any]
+
+    def as_dict(self) -> dict:
+        return dict(self.data)
+
+
+class SnapshotCell:
+    """
+    Referência para o snapshot atual. Escritores montam um snapshot novo e
+    trocam a referência (serializados por um lock); leitores só leem a
+    referência, sem lock, e recebem sempre um estado consistente.
+    """
+    def __init__(self, initial: Mapping[str, Any]):
+        self._snap = StatusSnapshot(0, MappingProxyType(dict(initial)))
+        self._wlock = threading.Lock()
+
+    def get(self) -> StatusSnapshot:
+        return self._snap
+
+    def update(self, **changes) -> StatusSnapshot:
+        """Aplica 'changes' (só chaves já existentes) e publica um snapshot novo."""
+        with self._wlock:
+            cur = self._snap
+            data = dict(cur.data)
+            data.update({k: v for k, v in changes.items() if k in data})
+            snap = StatusSnapshot(cur.version + 1, MappingProxyType(data))
+            self._snap = snap
+            return snap
+
+
+class EventRing:
+    """Buffer circular de capacidade fixa: append O(1), sobrescreve o mais antigo."""
+    def __init__(self, capacity: int = 500):
+        self.capacity = int(capacity)
+        self._buf: List[Optional[Any]] = [None] * self.capacity
+        self._head = 0      # próxima posição de escrita
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, item: Any) -> None:
+        with self._lock:
+            self._buf[self._head] = item
+            self._head = (self._head + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def snapshot(self) -> List[Any]:
+        """Cópia em ordem cronológica (mais antigo primeiro)."""
+        with self._lock:
+            start = (self._head - self._count) % self.capacity
+            if start + self._count <= self.capacity:
+                return self._buf[start:start + self._count]
+            return self._buf[start:] + self._buf[:self._head]
@@ -0,0 +1,108 @@
+# stream.py
+# Streaming de status/eventos para o dashboard via SSE (Server-Sent Events).
+# O frame loop continua só atualizando o estado; cada cliente recebe deltas
+# coalescidos a no máximo 'hz' por segundo e os eventos assim que acontecem.
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+HEARTBEAT_S = 15.0     # comentário ": ping" para manter proxies/conexão vivos
+EVENT_QSIZE = 256      # eventos pendentes por cliente (descarta se lotar)
+
+
+def sse(event: str, data) -> str:
+    """Formata uma mensagem SSE."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class StreamHub:
+    """
+    Liga o thread do OpenCV (publish_event) aos geradores SSE do uvicorn.
+    Cada assinante tem uma asyncio.Queue no loop em que foi criado; a
+    entrega entre threads usa call_soon_threadsafe.
+    """
+    def __init__(self):
+        self._subs: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def clients(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QSIZE)
+        with self._lock:
+            self._subs.append((asyncio.get_running_loop(), q))
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        with self._lock:
+            self._subs = [(lp, sq) for (lp, sq) in self._subs if sq is not q]
+
+    def publish_event(self, ev: dict) -> None:
+        """Chamado de qualquer thread; não bloqueia."""
+        with self._lock:
+            subs = list(self._subs)
+        for loop, q in subs:
+            try:
+                loop.call_soon_threadsafe(_put_drop, q, ev)
+            except RuntimeError:
+                pass  # loop já encerrado
+
+
+def _put_drop(q: asyncio.Queue, item) -> None:
+    try:
+        q.put_nowait(item)
+    except asyncio.QueueFull:
+        pass
+
+
+async def stream_status(hub: StreamHub, get_state: Callable[[], Tuple[int, Dict]],
+                        is_disconnected, hz: float):
+    """
+    Gerador SSE: snapshot inicial ('status'), depois deltas só com as chaves
+    que mudaram, no máximo 'hz' por segundo; eventos ('event') saem na hora.
+    get_state() -> (versão, dict do estado).
+    """
+    period = 1.0 / max(0.1, hz)
+    q = hub.subscribe()
+    try:
+        ver, state = get_state()
+        last = dict(state)
+        yield sse("status", last)
+        next_status = time.monotonic() + period
+        last_beat = time.monotonic()
+
+        while True:
+            timeout = next_status - time.monotonic()
+            if timeout > 0:
+                try:
+                    ev = await asyncio.wait_for(q.get(), timeout=timeout)
+                    yield sse("event", ev)
+                    last_beat = time.monotonic()
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            if await is_disconnected():
+                break
+            next_status = time.monotonic() + period
+
+            cur_ver, state = get_state()
+            if cur_ver != ver:
+                ver = cur_ver
+                delta = {k: v for k, v in state.items() if last.get(k) != v}
+                if delta:
+                    last.update(delta)
+                    yield sse("status", delta)
+                    last_beat = time.monotonic()
+            if time.monotonic() - last_beat >= HEARTBEAT_S:
+                yield ": ping\n\n"
+                last_beat = time.monotonic()
+    finally:
+        hub.unsubscribe(q)
@@ -0,0 +1,152 @@
+# timeseries.py
+# Histórico em memória das métricas do status (EAR, piscos/min...), em várias
+# resoluções. Cada série tem um anel de arrays NumPy por resolução (1 s, 1 min,
+# 1 h), com min/máx/soma/n por intervalo ("bucket"):
+#  - add() atualiza o bucket corrente de cada resolução em O(1): ele fica em
+#    escalares Python e só é copiado para os arrays quando fecha (ou numa consulta);
+#  - a capacidade de cada anel é fixa: a memória não cresce com o tempo de
+#    quiosque (o mais antigo é sobrescrito);
+#  - quando um bucket fecha numa resolução persistida, ele vai para o 'sink'
+#    (EventStore.put_series, tabela 'series' do events.db).
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# nome -> (passo em s, buckets guardados)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "1s": (1, 3600),           # última hora
+    "1m": (60, 1440),          # últimas 24 h
+    "1h": (3600, 24 * 90),     # últimos 90 dias
+}
+PERSIST = ("1m", "1h")         # resoluções gravadas no banco ao fechar
+
+Row = Tuple[float, float, float, float, int]          # (ts do início, min, máx, média, n)
+Sink = Callable[[str, str, Row], None]                # (métrica, resolução, row)
+
+
+class SeriesRing:
+    """Buckets de 'step' segundos num anel de 'capacity' posições."""
+    def __init__(self, step: int, capacity: int):
+        self.step, self.capacity = int(step), int(capacity)
+        self.bucket = np.full(self.capacity, -1, dtype=np.int64)   # índice do bucket em cada slot
+        self.mn  = np.zeros(self.capacity)
+        self.mx  = np.zeros(self.capacity)
+        self.sum = np.zeros(self.capacity)
+        self.n   = np.zeros(self.capacity, dtype=np.int64)
+        self.cur = -1                                              # bucket mais recente
+        # acumuladores do bucket corrente (mais barato que escrever no array a cada frame)
+        self._mn = self._mx = self._sum = 0.0
+        self._n = 0
+
+    def add(self, t: float, v: float) -> Optional[Row]:
+        """Soma 'v' no bucket de 't'; devolve o bucket anterior se ele acabou de fechar."""
+        b = int(t // self.step)
+        if b == self.cur:
+            if v < self._mn:
+                self._mn = v
+            if v > self._mx:
+                self._mx = v
+            self._sum += v
+            self._n += 1
+            return None
+        if b < self.cur:
+            return None   # relógio voltou: amostra descartada
+        closed = None
+        if self.cur >= 0:
+            self._commit()
+            closed = (float(self.cur * self.step), self._mn, self._mx, self._sum / self._n, self._n)
+        self.cur = b
+        self._mn = self._mx = self._sum = v
+        self._n = 1
+        return closed
+
+    def _commit(self) -> None:
+        """Copia o bucket corrente para o seu slot nos arrays."""
+        if self.cur < 0:
+            return
+        i = self.cur % self.capacity
+        self.bucket[i] = self.cur
+        self.mn[i], self.mx[i], self.sum[i], self.n[i] = self._mn, self._mx, self._sum, self._n
+
+    def oldest(self) -> Optional[float]:
+        """Início (epoch s) do bucket mais antigo ainda no anel."""
+        if self.cur < 0:
+            return None
+        self._commit()
+        valid = self.bucket[self.bucket > self.cur - self.capacity]
+        return float(valid.min() * self.step) if valid.size else None
+
+    def query(self, since: Optional[float] = None) -> Dict[str, list]:
+        """Buckets desde 'since' (epoch s), em colunas e em ordem cronológica."""
+        self._commit()
+        lo = max(self.cur - self.capacity + 1, 0)
+        if since is not None:
+            lo = max(lo, int(since // self.step))
+        idx = np.nonzero(self.bucket >= lo)[0]
+        idx = idx[np.argsort(self.bucket[idx], kind="stable")]
+        n = self.n[idx]
+        return {
+            "t":    (self.bucket[idx] * self.step).tolist(),
+            "min":  self.mn[idx].tolist(),
+            "max":  self.mx[idx].tolist(),
+            "mean": (self.sum[idx] / np.maximum(n, 1)).tolist(),
+            "n":    n.tolist(),
+        }
+
+
+class TimeSeriesStore:
+    """
+    Uma série por métrica, cada uma com um SeriesRing por resolução. add()
+    vem do update_status (thread do frame loop); query() vem da API: um lock
+    curto serializa os dois.
+    """
+    def __init__(self, metrics: Iterable[str], resolutions: Dict[str, Tuple[int, int]] = RESOLUTIONS,
+                 persist: Iterable[str] = PERSIST, sink: Optional[Sink] = None):
+        self.resolutions = dict(resolutions)
+        self.rings: Dict[str, Dict[str, SeriesRing]] = {
+            m: {r: SeriesRing(step, cap) for r, (step, cap) in self.resolutions.items()}
+            for m in metrics
+        }
+        self.persist = tuple(r for r in persist if r in self.resolutions)
+        self.sink = sink
+        self.flushed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self.rings)
+
+    def nbytes(self) -> int:
+        """Memória ocupada pelos anéis (fixa desde a criação)."""
+        return sum(a.nbytes for per in self.rings.values() for ring in per.values()
+                   for a in (ring.bucket, ring.mn, ring.mx, ring.sum, ring.n))
+
+    def add(self, t: float, **values: float) -> None:
+        """Uma amostra por métrica (chaves desconhecidas são ignoradas)."""
+        closed: List[Tuple[str, str, Row]] = []
+        with self._lock:
+            for m, v in values.items():
+                per = self.rings.get(m)
+                if per is None:
+                    continue
+                for r, ring in per.items():
+                    row = ring.add(t, float(v))
+                    if row is not None and r in self.persist:
+                        closed.append((m, r, row))
+        if closed and self.sink is not None:
+            for m, r, row in closed:
+                self.sink(m, r, row)
+            self.flushed += len(closed)
+
+    def oldest(self, metric: str, res: str) -> Optional[float]:
+        with self._lock:
+            return self.rings[metric][res].oldest()
+
+    def query(self, metric: str, res: str, since: Optional[float] = None) -> Dict[str, list]:
+        """KeyError se a métrica ou a resolução não existir."""
+        ring = self.rings[metric][res]
+        with self._lock:
+            return ring.query(since)
@@ -1,7 +1,14 @@
 # utils.py
+from functools import lru_cache
+import threading
+from typing import TYPE_CHECKING
+
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+# Pillow é importado dentro das funções (fontes, legenda, alerta): só quem
+# desenha texto paga o import (os workers do multicam não desenham).
+if TYPE_CHECKING:
+    from PIL import ImageDraw, ImageFont
 
 # ==== Paleta de cores ====
 COL_BG   = (16, 16, 16)
@@ -33,72 +40,153 @@ def panel(frame, x, y, w, h, alpha=0.65):
 def text(frame, txt, org, scale=0.7, color=COL_TXT, thick=2):
     cv2.putText(frame, txt, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thick, cv2.LINE_AA)
 
+# Textos Hershey (inclusive os que mudam a cada frame) vão direto no putText:
+# ~10 µs por chamada, menos que copiar um sprite pré-renderizado.
 def label_value(frame, label, value, x, y, w=250, line=26):
     text(frame, label, (x, y), 0.65, COL_DIM, 1)
     text(frame, value, (x, y + line), 0.8, COL_TXT, 2)
 
+@lru_cache(maxsize=64)
+def _text_wh(txt, scale, thick):
+    return cv2.getTextSize(txt, cv2.FONT_HERSHEY_SIMPLEX, scale, thick)[0]
+
 def badge(frame, text_str, x, y, color=COL_OK):
     padx, pady = 10, 8
-    (tw, th), _ = cv2.getTextSize(text_str, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+    tw, th = _text_wh(text_str, 0.7, 2)
     bw, bh = tw + padx * 2, th + pady * 2
     box = np.full((bh, bw, 3), color, dtype=np.uint8)
     _overlay_alpha(frame, box, x, y, 0.9)
     text(frame, text_str, (x + padx, y + bh - pady - 2), 0.7, (0, 0, 0), 2)
 
 # ---------------- Trackbars ----------------
-def create_trackbars(win):
-    # Haar
-    cv2.createTrackbar("scaleFactor x100", win, 120, 200, lambda x: None)  # 1.20
-    cv2.createTrackbar("minNeighbors",     win,   6,  15, lambda x: None)
-    cv2.createTrackbar("minSize(px)",      win, 100, 200, lambda x: None)
-    # Risco/olhos
-    cv2.createTrackbar("EAR_thr x1000",    win,  21, 100, lambda x: None)  # 0.21
-    cv2.createTrackbar("risk_min",         win,   1,  60, lambda x: None)  # 1 min (teste fluido)
-
-def get_params(win):
-    sf  = max(1.01, cv2.getTrackbarPos("scaleFactor x100", win) / 100.0)
-    mn  = cv2.getTrackbarPos("minNeighbors", win)
-    ms  = cv2.getTrackbarPos("minSize(px)", win)
-    ear = cv2.getTrackbarPos("EAR_thr x1000", win) / 1000.0
-    rkm = max(1, cv2.getTrackbarPos("risk_min", win))
-    return dict(scaleFactor=sf, minNeighbors=mn, minSize=ms,
-                EAR_thr=ear, risk_minutes=rkm)
+# Valores padrão dos parâmetros (formato que o FrameAnalyzer.process recebe).
+# A config (config.py) parte deles; benchmarks e batch usam direto.
+# EAR_smooth_n/refractory_s/blink_rate_hi: mesmos padrões de analyzer
+# (EAR_SMOOTH_N, REFRACTORY_S) e de risk_model.RiskConfig.
+DEFAULT_PARAMS = dict(scaleFactor=1.20, minNeighbors=6, minSize=100,
+                      EAR_thr=0.21, risk_minutes=15,
+                      EAR_smooth_n=5, refractory_s=0.80, blink_rate_hi=60.0)
+
+# Sliders da janela de controles: (nome, chave em params, escala, máximo);
+# posição = valor * escala.
+TRACKBARS = (
+    ("scaleFactor x100", "scaleFactor",  100, 200),
+    ("minNeighbors",     "minNeighbors",   1,  15),
+    ("minSize(px)",      "minSize",        1, 200),
+    ("EAR_thr x1000",    "EAR_thr",     1000, 100),
+    ("risk_min",         "risk_minutes",   1,  60),
+)
+
+def create_trackbars(win, params=None, on_change=None):
+    """
+    Cria os sliders posicionados em 'params' (padrão: DEFAULT_PARAMS).
+    on_change(chave, escala, posição) é chamado pelo HighGUI, dentro do waitKey.
+    """
+    params = params or DEFAULT_PARAMS
+    for name, key, scale, top in TRACKBARS:
+        cb = (lambda pos, key=key, scale=scale: on_change(key, scale, pos)) if on_change else (lambda pos: None)
+        cv2.createTrackbar(name, win, min(top, int(round(params[key] * scale))), top, cb)
 
 # ---------------- Visuais diversos ----------------
 def draw_rect(frame, x, y, w, h, color=(120, 255, 120)):
     cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
 
-def euclidean(p1, p2):
-    return np.linalg.norm(np.array(p1) - np.array(p2))
+# pares (p2,p6), (p3,p5), (p1,p4) do olho esquerdo (0..5) e do direito (6..11)
+_EAR_A = np.array([1, 2, 0, 7, 8, 6])
+_EAR_B = np.array([5, 4, 3, 11, 10, 9])
 
-def eye_aspect_ratio(eye_pts):
-    p1, p2, p3, p4, p5, p6 = eye_pts
-    A = euclidean(p2, p6)
-    B = euclidean(p3, p5)
-    C = euclidean(p1, p4)
-    return (A + B) / (2.0 * C + 1e-6)
+def ear_batch(eyes):
+    """
+    EAR vetorizado. 'eyes' tem forma (..., 12, 2): 6 pontos do olho esquerdo
+    seguidos de 6 do direito, cada olho na ordem p1..p6. Por olho,
+    EAR = (|p2-p6| + |p3-p5|) / (2 |p1-p4|). Aceita um frame (12, 2) ou um
+    lote (N, 12, 2); retorna a média dos dois olhos (escalar ou array (N,)).
+    """
+    e = np.asarray(eyes, dtype=np.float32)
+    d = e[..., _EAR_A, :] - e[..., _EAR_B, :]
+    n = np.sqrt(np.einsum("...i,...i->...", d, d))          # (..., 6) distâncias
+    return ((n[..., 0] + n[..., 1]) / (4.0 * n[..., 2] + 2e-6) +
+            (n[..., 3] + n[..., 4]) / (4.0 * n[..., 5] + 2e-6))
 
 # ---------------- Render (Pillow) ----------------
+# Caminhos candidatos por família: (regular, negrito), na ordem de preferência.
+_FONT_PATHS = {
+    "sans": [
+        (r"C:\Windows\Fonts\segoeui.ttf", r"C:\Windows\Fonts\segoeuib.ttf"),
+        (r"C:\Windows\Fonts\arial.ttf",   r"C:\Windows\Fonts\arialbd.ttf"),
+        ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+         "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+        ("/System/Library/Fonts/Supplemental/Arial.ttf",
+         "/System/Library/Fonts/Supplemental/Arial Bold.ttf"),
+    ],
+}
+
+class FontRegistry:
+    """
+    Registro de fontes do processo: cada (família, tamanho, negrito) é
+    resolvido uma única vez; o caminho que funcionou é lembrado por família,
+    então tamanhos novos não voltam a testar caminhos inexistentes.
+    """
+    _NOT_RESOLVED = object()
+
+    def __init__(self):
+        self._fonts = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _resolve_path(self, family, bold, size):
+        from PIL import ImageFont
+        for pair in _FONT_PATHS.get(family, _FONT_PATHS["sans"]):
+            p = pair[1] if bold else pair[0]
+            try:
+                return p, ImageFont.truetype(p, size)
+            except Exception:
+                continue
+        return None, ImageFont.load_default()
+
+    def get(self, size, bold=False, family="sans"):
+        key = (family, int(size), bool(bold))
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self.hits += 1
+                return font
+            self.misses += 1
+            from PIL import ImageFont
+            path = self._paths.get((family, bool(bold)), self._NOT_RESOLVED)
+            if path is self._NOT_RESOLVED:
+                path, font = self._resolve_path(family, bold, int(size))
+                self._paths[(family, bool(bold))] = path
+            elif path is None:
+                font = ImageFont.load_default()
+            else:
+                font = ImageFont.truetype(path, int(size))
+            self._fonts[key] = font
+            return font
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._fonts)}
+
+
+FONTS = FontRegistry()
+
 def _pick_font(size, bold=False):
-    """Escolhe uma fonte TrueType disponível (com acentos)."""
-    prefs = [
-        (r"C:\Windows\Fonts\segoeuib.ttf" if bold else r"C:\Windows\Fonts\segoeui.ttf"),
-        (r"C:\Windows\Fonts\arialbd.ttf"  if bold else r"C:\Windows\Fonts\arial.ttf"),
-        ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf" if bold else "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
-        ("/System/Library/Fonts/Supplemental/Arial Bold.ttf" if bold else "/System/Library/Fonts/Supplemental/Arial.ttf"),
-    ]
-    for p in prefs:
-        try:
-            return ImageFont.truetype(p, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+    """Escolhe uma fonte TrueType disponível (com acentos), via FONTS."""
+    return FONTS.get(size, bold)
+
+def text_cache_stats():
+    """Hit/miss do registro de fontes (para instrumentação)."""
+    return {"fonts": FONTS.stats()}
 
 def render_controls_legend(w=520, h=240):
     """
     Painel compacto e amigável com explicações dos controles (com acentos).
     Retorna imagem BGR (numpy) para cv2.imshow.
     """
+    from PIL import Image, ImageDraw
+
     def bgr_to_rgb(c): return (c[2], c[1], c[0])
 
     bg_rgb  = (30, 30, 30)
@@ -133,7 +221,7 @@ def render_controls_legend(w=520, h=240):
     return arr
 
 # -------- Helpers compatíveis com Pillow 10+ --------
-def _text_size(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont):
+def _text_size(draw: "ImageDraw.ImageDraw", text: str, font: "ImageFont.ImageFont"):
     """
     Retorna (w, h) do texto usando textbbox quando disponível (Pillow >=10),
     caindo para textsize em versões antigas.
@@ -160,38 +248,31 @@ def _wrap_text(draw, text, font, max_w):
     return lines
 
 # ---- Alerta grande (Pillow, com acentos e dica no canto inferior direito) ----
-def big_alert(frame,
-              title="RISCO - PAUSA AGORA",
-              subtitle="Você está há muito tempo focado. Faça uma pausa e retome com clareza.",
-              hint="Pressione R para resetar contadores",
-              pulse=0.0):
+def _alert_geometry(W, H):
+    """Retângulo do banner: (x0, y0, x1, y1), inclusivo como no Pillow."""
+    box_h = int(H * 0.36)
+    box_h = max(160, min(box_h, int(H * 0.6)))
+    box_y = max(40, H - box_h - 20)  # 20 px acima da borda inferior
+    return 20, box_y, W - 20, box_y + box_h
+
+
+def _render_alert_overlay(W, H, title, subtitle, hint, rect_rgb):
     """
-    Desenha alerta grande, translúcido e centralizado com acentos corretos (Pillow).
-    A dica fica no canto inferior direito do banner.
-    Modifica 'frame' in-place.
+    Desenha o overlay RGBA (W x H) do alerta com o banner na cor 'rect_rgb'.
+    Só é chamado ao (re)construir o cache em _alert_layers.
     """
-    H, W = frame.shape[:2]
-
-    # BGR->RGB para trabalhar com Pillow
-    base_rgb = frame[:, :, ::-1]
-    base_img = Image.fromarray(base_rgb)
+    from PIL import Image, ImageDraw
     overlay  = Image.new("RGBA", (W, H), (0, 0, 0, 0))
     draw     = ImageDraw.Draw(overlay)
 
     # Área do banner
-    box_h = int(H * 0.36)
-    box_h = max(160, min(box_h, int(H * 0.6)))
-    box_y = max(40, H - box_h - 20)  # 20 px acima da borda inferior
-
-    # Cor pulsante (vermelho)
-    c1 = np.array([255, 64, 64], dtype=np.float32)
-    c0 = np.array([220, 40, 40], dtype=np.float32)
-    c  = (c0 * (1.0 - pulse) + c1 * pulse).astype(int)
-    rect_color = (int(c[0]), int(c[1]), int(c[2]), 225)
+    bx0, box_y, bx1, by1 = _alert_geometry(W, H)
+    box_h = by1 - box_y
+    rect_color = (int(rect_rgb[0]), int(rect_rgb[1]), int(rect_rgb[2]), 225)
 
     # Banner arredondado
     radius = 18
-    draw.rounded_rectangle([20, box_y, W - 20, box_y + box_h], radius, fill=rect_color)
+    draw.rounded_rectangle([bx0, box_y, bx1, by1], radius, fill=rect_color)
 
     pad_x   = 36
     inner_w = W - 2 * (pad_x + 20)
@@ -225,7 +306,78 @@ def big_alert(frame,
     hy = box_y + box_h - hh - 18
     draw.rounded_rectangle([hx - 10, hy - 6, hx + hw + 10, hy + hh + 6], 10, fill=(30, 30, 30, 200))
     draw.text((hx, hy), hint, fill=(255, 255, 255, 255), font=font_hint)
+    return overlay
+
+
+class _AlertLayers:
+    """
+    Camadas pré-calculadas do alerta, restritas à ROI que o overlay pinta.
+
+    O overlay do Pillow é linear na cor do banner: rgb(c) = c*K + C, com
+    alpha A fixo. Compondo sobre o frame (opaco):
+        out = base*(1 - A) + c*(K*A) + C*A
+    Então renderizamos duas vezes (banner preto e branco), guardamos
+    B = 1 - A, P = K*A e Q = C*A, e por frame só resta uma mistura na ROI.
+    """
+    def __init__(self, W, H, title, subtitle, hint):
+        o0 = np.asarray(_render_alert_overlay(W, H, title, subtitle, hint, (0, 0, 0)))
+        o1 = np.asarray(_render_alert_overlay(W, H, title, subtitle, hint, (255, 255, 255)))
+
+        # ROI = caixa de tudo que o overlay pinta (alpha > 0). Em frames
+        # pequenos/estreitos o título e o subtítulo passam do banner.
+        ys, xs = np.nonzero(o0[:, :, 3])
+        if ys.size:
+            self.x0, self.y0, self.x1, self.y1 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+        else:
+            self.x0 = self.y0 = self.x1 = self.y1 = 0
+        roi = (slice(self.y0, self.y1), slice(self.x0, self.x1))
+        o0 = o0[roi].astype(np.float32)
+        o1 = o1[roi].astype(np.float32)
+
+        a = o0[:, :, 3:4] / 255.0
+        K = (o1[:, :, :3] - o0[:, :, :3]) / 255.0
+        C = o0[:, :, :3]
+        # tudo em BGR (ordem do frame do OpenCV)
+        self.B = np.ascontiguousarray(1.0 - a, dtype=np.float32)
+        self.P = np.ascontiguousarray((K * a)[:, :, ::-1], dtype=np.float32)
+        self.Q = np.ascontiguousarray((C * a)[:, :, ::-1] + 0.5, dtype=np.float32)  # +0.5 = arredonda
+
+        # buffers reaproveitados a cada frame (só a ROI, nunca o frame todo)
+        self._acc = np.empty_like(self.P)
+        self._tmp = np.empty_like(self.P)
+
+    def blend(self, frame, color_bgr):
+        roi = frame[self.y0:self.y1, self.x0:self.x1]
+        np.multiply(roi, self.B, out=self._acc)
+        np.multiply(self.P, color_bgr, out=self._tmp)
+        self._acc += self._tmp
+        self._acc += self.Q
+        np.clip(self._acc, 0, 255, out=self._acc)
+        np.copyto(roi, self._acc, casting="unsafe")
+
+
+@lru_cache(maxsize=8)
+def _alert_layers(W, H, title, subtitle, hint):
+    return _AlertLayers(W, H, title, subtitle, hint)
+
+
+def big_alert(frame,
+              title="RISCO - PAUSA AGORA",
+              subtitle="Você está há muito tempo focado. Faça uma pausa e retome com clareza.",
+              hint="Pressione R para resetar contadores",
+              pulse=0.0):
+    """
+    Desenha alerta grande, translúcido e centralizado com acentos corretos (Pillow).
+    A dica fica no canto inferior direito do banner.
+    Os textos são renderizados uma única vez por (tamanho, title, subtitle, hint);
+    a cada frame só a cor pulsante é misturada na ROI pintada pelo overlay.
+    Modifica 'frame' in-place.
+    """
+    H, W = frame.shape[:2]
+    layers = _alert_layers(W, H, title, subtitle, hint)
 
-    # Composição e volta para BGR
-    composed = Image.alpha_composite(base_img.convert("RGBA"), overlay).convert("RGB")
-    frame[:, :] = np.array(composed)[:, :, ::-1]
+    # Cor pulsante (vermelho), em BGR
+    c1 = np.array([64, 64, 255], dtype=np.float32)
+    c0 = np.array([40, 40, 220], dtype=np.float32)
+    c  = (c0 * (1.0 - pulse) + c1 * pulse).astype(int).astype(np.float32)
+    layers.blend(frame, c)
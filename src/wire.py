@@ -0,0 +1,189 @@
+# wire.py
+# Formato binário compacto da API (Accept: application/vnd.alertabet+struct),
+# para coletores que consultam muitos quiosques. JSON continua o padrão.
+#  - struct little-endian, campos float32/uint8/uint32 e horários em epoch
+#    (sem strings ISO); textos como u8/u16 de tamanho + UTF-8;
+#  - /series vai em colunas (arrays NumPy copiados direto para os bytes);
+#  - cada payload começa com um "magic" de 4 bytes que diz o tipo e a versão.
+# Os decode_* servem de referência para o coletor (só dependem de NumPy).
+from __future__ import annotations
+
+import struct
+from typing import Dict, List, Mapping, Tuple
+
+import numpy as np
+
+MEDIA_JSON = "application/json"
+MEDIA_BIN = "application/vnd.alertabet+struct"
+GZIP_MIN_BYTES = 1024     # abaixo disso o gzip não compensa
+GZIP_LEVEL = 5            # compressão x CPU (o quiosque também roda a inferência)
+
+_STATUS = struct.Struct("<4sIdBBfffIHH")   # magic, versão, ts, flags, faces, ear, blink_rate, minutes_on, blink_count, n_sess, n_cams
+_SESSION = struct.Struct("<BfffI")         # flags, ear, blink_rate, minutes_on, blink_count
+_CAMERA = struct.Struct("<BBffffI")        # flags, faces, ear, blink_rate, minutes_on, fps, blink_count
+_EVENTS = struct.Struct("<4sIB")           # magic, n, n_tipos
+_EVENT = struct.Struct("<IdBH")            # id, ts, tipo, len(msg)
+_SERIES = struct.Struct("<4sII")           # magic, passo (s), n
+
+# flags (bits)
+HAVE_FACE, RISKY, PRESENT, HAS_NAME = 1, 2, 4, 8
+
+
+# ---------------- negociação ----------------
+def _q(accept: str) -> Dict[str, float]:
+    """Accept -> {tipo: q}."""
+    out: Dict[str, float] = {}
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        if not media:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        out[media.lower()] = q
+    return out
+
+
+def wants_binary(accept: str) -> bool:
+    """O cliente pediu o formato binário (e não prefere JSON)?"""
+    q = _q(accept or "")
+    qb = q.get(MEDIA_BIN, 0.0)
+    return qb > 0 and qb >= q.get(MEDIA_JSON, q.get("application/*", q.get("*/*", 0.0)))
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    q = _q(accept_encoding or "")
+    return q.get("gzip", q.get("*", 0.0)) > 0
+
+
+# ---------------- texto ----------------
+def _str8(s: str) -> bytes:
+    b = str(s).encode("utf-8")[:255]
+    return bytes((len(b),)) + b
+
+
+def _read_str8(buf: bytes, off: int) -> Tuple[str, int]:
+    n = buf[off]
+    return buf[off + 1:off + 1 + n].decode("utf-8", "replace"), off + 1 + n
+
+
+# ---------------- /status ----------------
+def encode_status(state: Mapping, version: int, ts: float) -> bytes:
+    sessions = state.get("sessions") or {}
+    cameras = state.get("cameras") or {}
+    parts = [_STATUS.pack(
+        b"ABS1", version & 0xFFFFFFFF, ts,
+        HAVE_FACE * bool(state.get("have_face")) | RISKY * bool(state.get("risky")),
+        min(int(state.get("faces", 0)), 255),
+        state.get("ear", 0.0), state.get("blink_rate", 0.0), state.get("minutes_on", 0.0),
+        int(state.get("blink_count", 0)), len(sessions), len(cameras))]
+    for sid, s in sessions.items():
+        name = s.get("name")
+        parts.append(_str8(sid))
+        parts.append(_SESSION.pack(
+            PRESENT * bool(s.get("present")) | RISKY * bool(s.get("risky"))
+            | HAS_NAME * (name is not None),
+            s.get("ear", 0.0), s.get("blink_rate", 0.0), s.get("minutes_on", 0.0),
+            int(s.get("blink_count", 0))))
+        if name is not None:
+            parts.append(_str8(name) + struct.pack("<f", s.get("name_conf") or 0.0))
+    for cam, c in cameras.items():
+        parts.append(_str8(cam))
+        parts.append(_CAMERA.pack(
+            HAVE_FACE * bool(c.get("have_face")) | RISKY * bool(c.get("risky")),
+            min(int(c.get("faces", 0)), 255),
+            c.get("ear", 0.0), c.get("blink_rate", 0.0), c.get("minutes_on", 0.0),
+            c.get("fps", 0.0), int(c.get("blink_count", 0))))
+    return b"".join(parts)
+
+
+def decode_status(buf: bytes) -> dict:
+    (magic, version, ts, flags, faces, ear, rate, minutes, count,
+     n_sess, n_cams) = _STATUS.unpack_from(buf)
+    if magic != b"ABS1":
+        raise ValueError("payload não é um status")
+    out = {"version": version, "ts": ts, "have_face": bool(flags & HAVE_FACE),
+           "risky": bool(flags & RISKY), "faces": faces, "ear": ear, "blink_rate": rate,
+           "minutes_on": minutes, "blink_count": count, "sessions": {}, "cameras": {}}
+    off = _STATUS.size
+    for _ in range(n_sess):
+        sid, off = _read_str8(buf, off)
+        flags, ear, rate, minutes, count = _SESSION.unpack_from(buf, off)
+        off += _SESSION.size
+        s = {"present": bool(flags & PRESENT), "risky": bool(flags & RISKY), "ear": ear,
+             "blink_rate": rate, "minutes_on": minutes, "blink_count": count}
+        if flags & HAS_NAME:
+            s["name"], off = _read_str8(buf, off)
+            (s["name_conf"],) = struct.unpack_from("<f", buf, off)
+            off += 4
+        out["sessions"][sid] = s
+    for _ in range(n_cams):
+        cam, off = _read_str8(buf, off)
+        flags, faces, ear, rate, minutes, fps, count = _CAMERA.unpack_from(buf, off)
+        off += _CAMERA.size
+        out["cameras"][cam] = {"have_face": bool(flags & HAVE_FACE), "risky": bool(flags & RISKY),
+                               "faces": faces, "ear": ear, "blink_rate": rate,
+                               "minutes_on": minutes, "fps": fps, "blink_count": count}
+    return out
+
+
+# ---------------- /events ----------------
+def encode_events(events: List[Mapping]) -> bytes:
+    """Eventos no formato de /events; tipos viram índices numa tabela no cabeçalho."""
+    types: Dict[str, int] = {}
+    body = []
+    for ev in events:
+        t = types.setdefault(ev["type"], len(types))
+        if t > 255:
+            raise ValueError("mais de 256 tipos de evento")
+        msg = (ev.get("msg") or "").encode("utf-8")[:65535]
+        body.append(_EVENT.pack(int(ev.get("id") or 0), ev["ts"], t, len(msg)) + msg)
+    head = _EVENTS.pack(b"ABE1", len(events), len(types)) + b"".join(_str8(t) for t in types)
+    return head + b"".join(body)
+
+
+def decode_events(buf: bytes) -> List[dict]:
+    magic, n, n_types = _EVENTS.unpack_from(buf)
+    if magic != b"ABE1":
+        raise ValueError("payload não é uma lista de eventos")
+    off, types = _EVENTS.size, []
+    for _ in range(n_types):
+        t, off = _read_str8(buf, off)
+        types.append(t)
+    out = []
+    for _ in range(n):
+        eid, ts, t, ln = _EVENT.unpack_from(buf, off)
+        off += _EVENT.size
+        out.append({"id": eid, "ts": ts, "type": types[t],
+                    "msg": buf[off:off + ln].decode("utf-8", "replace")})
+        off += ln
+    return out
+
+
+# ---------------- /series ----------------
+_COLUMNS = (("t", "<u4"), ("min", "<f4"), ("max", "<f4"), ("mean", "<f4"), ("n", "<u4"))
+
+
+def encode_series(data: Mapping) -> bytes:
+    """Resposta do /series em colunas: t (u32 epoch), min/max/mean (f32), n (u32)."""
+    n = len(data["t"])
+    head = (_SERIES.pack(b"ABT1", int(data["step"]), n)
+            + _str8(data["metric"]) + _str8(data["res"]))
+    return head + b"".join(np.asarray(data[k], dtype=dt).tobytes() for k, dt in _COLUMNS)
+
+
+def decode_series(buf: bytes) -> dict:
+    magic, step, n = _SERIES.unpack_from(buf)
+    if magic != b"ABT1":
+        raise ValueError("payload não é uma série")
+    metric, off = _read_str8(buf, _SERIES.size)
+    res, off = _read_str8(buf, off)
+    out = {"metric": metric, "res": res, "step": step}
+    for k, dt in _COLUMNS:
+        out[k] = np.frombuffer(buf, dtype=dt, count=n, offset=off)
+        off += 4 * n
+    return out
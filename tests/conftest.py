@@ -0,0 +1,5 @@
+# Os módulos do app ficam soltos em src/ e são importados pelo nome (como o main.py faz).
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
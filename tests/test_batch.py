@@ -0,0 +1,27 @@
+# Nomes de saída do batch: entradas com o mesmo nome não podem se sobrescrever.
+import os
+
+import pytest
+
+from batch import output_stems
+
+
+def test_unique_names_keep_file_stem():
+    assert output_stems(["a/cam.mp4", "b/lab.mp4"]) == {"a/cam.mp4": "cam", "b/lab.mp4": "lab"}
+
+
+def test_same_name_in_different_folders_uses_relative_path():
+    stems = output_stems(["x/a/cam.mp4", "x/b/cam.mp4", "x/other.mp4"])
+    assert stems == {"x/a/cam.mp4": "a__cam", "x/b/cam.mp4": "b__cam", "x/other.mp4": "other"}
+
+
+def test_same_stem_different_extension_keeps_extension():
+    stems = output_stems(["v/cam.mp4", "v/cam.avi"])
+    assert stems == {"v/cam.mp4": "cam.mp4", "v/cam.avi": "cam.avi"}
+    assert len(set(stems.values())) == 2
+
+
+def test_unresolvable_collision_fails():
+    # q/a/b/cam.mp4 e q/a__b/cam.mp4 viram os dois "a__b__cam(.mp4)"
+    with pytest.raises(ValueError):
+        output_stems([os.path.join("q", "a", "b", "cam.mp4"), os.path.join("q", "a__b", "cam.mp4")])
@@ -0,0 +1,40 @@
+# big_alert com camadas em cache (só a ROI) x composição do frame inteiro no Pillow (antiga).
+import numpy as np
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+import utils  # noqa: E402
+
+TITLE = "RISCO - PAUSA AGORA"
+SUBTITLE = "Você está há muito tempo focado. Faça uma pausa e retome com clareza."
+HINT = "Pressione R para resetar contadores"
+
+
+def full_frame_alert(frame, pulse):
+    """Composição antiga: overlay RGBA do frame todo + alpha_composite."""
+    H, W = frame.shape[:2]
+    c1 = np.array([255, 64, 64], dtype=np.float32)
+    c0 = np.array([220, 40, 40], dtype=np.float32)
+    c = (c0 * (1.0 - pulse) + c1 * pulse).astype(int)
+    overlay = utils._render_alert_overlay(W, H, TITLE, SUBTITLE, HINT, tuple(int(v) for v in c))
+    base = Image.fromarray(np.ascontiguousarray(frame[:, :, ::-1])).convert("RGBA")
+    composed = Image.alpha_composite(base, overlay).convert("RGB")
+    return np.array(composed)[:, :, ::-1]
+
+
+@pytest.mark.parametrize("shape", [(240, 320), (300, 200), (360, 480), (480, 640)])
+@pytest.mark.parametrize("pulse", [0.0, 0.5, 1.0])
+def test_cached_layers_match_full_frame_blend(shape, pulse):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+    expected = full_frame_alert(frame, pulse)
+    utils.big_alert(frame, TITLE, SUBTITLE, HINT, pulse=pulse)
+    diff = np.abs(frame.astype(int) - expected.astype(int))
+    # iguais a menos do arredondamento: a mistura é em float e o Pillow arredonda
+    # o texto anti-serrilhado sobre o banner em inteiros (1-2 níveis, raros).
+    # Texto cortado fora da ROI dá diferenças de até 255.
+    assert diff.max() <= 2
+    assert (diff > 1).sum() <= 2
+    assert (diff > 0).sum() < diff.size * 0.01
@@ -0,0 +1,47 @@
+# Validação/limites da config e a fonte dos sliders (sem abrir janela do HighGUI).
+import pytest
+
+from config import SCHEMA, ConfigService, TrackbarSource, clamp, validate
+from utils import TRACKBARS
+
+
+def test_clamp_limits_and_types():
+    assert clamp("risk_minutes", 0) == 1.0            # piso do antigo get_params
+    assert clamp("risk_minutes", 30) == 30.0
+    assert clamp("risk_minutes", 10_000) == 1440.0
+    assert clamp("scaleFactor", 1.0) == 1.01
+    assert clamp("minNeighbors", 7.6) == 7 and isinstance(clamp("minNeighbors", 7.6), int)
+    assert clamp("EAR_thr", 0.0) == SCHEMA["EAR_thr"][1]
+
+
+def test_validate_rejects_out_of_range():
+    with pytest.raises(ValueError, match="risk_minutes"):
+        validate({"risk_minutes": 0})
+    with pytest.raises(ValueError, match="chave desconhecida"):
+        validate({"nope": 1})
+    assert validate({"minNeighbors": 3.0}) == {"minNeighbors": 3}
+
+
+def _sliders(service):
+    # TrackbarSource sem create_trackbars (não há janela nos testes)
+    src = TrackbarSource.__new__(TrackbarSource)
+    src.service, src.win = service, "test"
+    src._shown = service.version
+    src._top = {key: top for _, key, _, top in TRACKBARS}
+    return src
+
+
+def test_risk_slider_at_zero_keeps_floor_of_one():
+    svc = ConfigService()
+    sliders = _sliders(svc)
+    sliders._on_change("risk_minutes", 1, 0)
+    assert svc.current.params["risk_minutes"] == 1.0
+    sliders._on_change("risk_minutes", 1, 20)
+    assert svc.current.params["risk_minutes"] == 20.0
+    assert svc.current.source == "trackbars"
+
+
+def test_update_without_change_keeps_version():
+    svc = ConfigService()
+    v = svc.update({"EAR_thr": 0.2}, "api").version
+    assert svc.update({"EAR_thr": 0.2}, "api").version == v
@@ -0,0 +1,16 @@
+# annotate() não pode mexer nos dicts do snapshot já publicado para a API.
+from identity import IdentityService
+
+
+def test_annotate_returns_new_dicts():
+    svc = IdentityService(loader=lambda: (None, []))
+    svc._known["cam0:f1"] = ("ana", 42.0, 0.0)
+    published = {"cam0:f1": {"ear": 0.25}, "cam1:f1": {"ear": 0.3}}
+    before = {k: dict(v) for k, v in published.items()}
+
+    out = svc.annotate(published)
+    svc.close()
+
+    assert out["cam0:f1"] == {"ear": 0.25, "name": "ana", "name_conf": 42.0}
+    assert out["cam0:f1"] is not published["cam0:f1"]
+    assert published == before                     # nada escrito no snapshot original
@@ -0,0 +1,49 @@
+import threading
+
+from metrics import Histogram, Metrics
+
+
+def test_observe_concorrente_nao_perde_contagens():
+    h = Histogram(buckets=(0.5,))
+    n_threads, n_obs = 8, 5000
+
+    def worker():
+        for i in range(n_obs):
+            h.observe(0.25 if i % 2 else 1.0)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counts, total, n = h.snapshot()
+    assert n == n_threads * n_obs
+    assert counts == [n // 2, n // 2]
+    assert total == (0.25 + 1.0) * n // 2
+
+
+def test_span_compartilhado_entre_threads():
+    m = Metrics()
+    sp = m.span("x")
+    inside = threading.Barrier(2)
+
+    def worker():
+        with sp:
+            inside.wait()   # as duas threads ficam dentro do mesmo span ao mesmo tempo
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _, total, n = sp.hist.snapshot()
+    assert n == 2
+    assert 0.0 <= total < 5.0
+    assert 'alertabet_stage_seconds_count{stage="x"} 2' in m.render()
+
+
+def test_span_desligado_nao_mede():
+    m = Metrics(enabled=False)
+    with m.span("x"):
+        pass
+    assert "alertabet_stage_seconds" not in m.render()
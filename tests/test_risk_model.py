@@ -0,0 +1,129 @@
+# Testes do RiskModel/BlinkWindow com relógio falso (clock=...), sem esperar tempo real.
+import pytest
+
+from risk_model import BlinkWindow, RiskModel
+
+
+class FakeClock:
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+    def advance(self, dt: float) -> float:
+        self.t += dt
+        return self.t
+
+
+def blink_every(model: RiskModel, clock: FakeClock, period_s: float, n: int) -> None:
+    for _ in range(n):
+        clock.advance(period_s)
+        model.note_blink()
+
+
+def test_rate_after_blink_uses_configured_window():
+    # antes lia self.window_s (inexistente) e levantava AttributeError
+    clock = FakeClock()
+    m = RiskModel(clock=clock)
+    m.note_blink()
+    clock.advance(1.0)
+    assert m.blink_rate_per_min() > 0.0
+    assert m.blinks_in_window() == 1
+
+
+def test_window_trim_and_running_count():
+    clock = FakeClock()
+    m = RiskModel(blink_window_s=10.0, clock=clock)
+    blink_every(m, clock, 1.0, 5)                 # piscos em +1..+5 s
+    assert m.blinks_in_window() == 5
+    assert m.blinks.oldest() == pytest.approx(1001.0)
+
+    clock.advance(7.0)                            # agora +12: +1 sai da janela
+    assert m.blinks_in_window() == 4
+    assert m.blinks.oldest() == pytest.approx(1002.0)
+
+    clock.advance(10.0)
+    assert m.blinks_in_window() == 0
+    assert m.blinks.oldest() is None
+
+
+def test_steady_blinks_converge_to_rate():
+    clock = FakeClock()
+    m = RiskModel(blink_window_s=15.0, clock=clock)
+    blink_every(m, clock, 1.0, 150)               # 60/min por 10 constantes de tempo
+    clock.advance(0.5)                            # entre dois piscos
+    assert m.blink_rate_per_min() == pytest.approx(60.0, rel=0.03)
+
+
+def test_bursty_blinks_do_not_swing():
+    # rajadas de 5 piscos a cada 15 s = 20/min em média
+    clock = FakeClock()
+    m = RiskModel(blink_window_s=15.0, clock=clock)
+    rates = []
+    for _ in range(20):
+        blink_every(m, clock, 0.3, 5)
+        for _ in range(6):
+            clock.advance(2.0)
+            rates.append(m.blink_rate_per_min())
+    steady = rates[-30:]
+    assert sum(steady) / len(steady) == pytest.approx(20.0, rel=0.15)
+    assert max(steady) < 40.0 and min(steady) > 8.0
+
+    clock.advance(60.0)                           # silêncio: a taxa decai
+    assert m.blink_rate_per_min() < 1.0
+    assert m.blinks_in_window() == 0
+
+
+def test_ring_buffer_wraps_around():
+    w = BlinkWindow(capacity=4, tau_s=5.0)
+    for k in range(20):                           # add/trim alternados: o índice dá várias voltas
+        w.add(float(k))
+        w.trim(float(k), 2.5)
+        assert w.count == min(k + 1, 3)
+        assert w.oldest() == float(max(0, k - 2))
+    assert w._cap == 4                            # nunca lotou: sem realocação
+
+
+def test_ring_buffer_grows_when_full():
+    w = BlinkWindow(capacity=4, tau_s=5.0)
+    w.add(0.0)
+    w.add(1.0)
+    w.trim(1.0, 0.5)                              # tail fora do índice 0 antes de lotar
+    for k in range(2, 12):
+        w.add(float(k))
+    assert len(w) == 11                           # nenhum piscar perdido
+    assert w._cap >= 11
+    assert w.oldest() == 1.0
+    w.trim(11.0, 4.5)
+    assert len(w) == 5 and w.oldest() == 7.0
+
+
+def test_reset_counters():
+    clock = FakeClock()
+    m = RiskModel(warmup_s=0.0, risk_minutes=0.05, clock=clock)
+    m.update(True)
+    for _ in range(10):                           # 5 s ativos, com piscos
+        clock.advance(0.5)
+        m.note_blink()
+        risky, _, _ = m.update(True)
+    assert risky and m.block_mode
+    assert m.seconds_on() == pytest.approx(5.0)
+
+    m.reset_counters()
+    assert m.seconds_on() == 0.0
+    assert m.blinks_in_window() == 0
+    assert m.blink_rate_per_min() == 0.0
+    assert not m.block_mode
+
+    clock.advance(30.0)                           # reset recomeça o dt no relógio atual
+    m.update(True)
+    assert m.seconds_on() == pytest.approx(m.cfg.max_dt_s)
+
+
+def test_first_interval_counts_from_media_time_zero():
+    # batch: relógio da mídia começa em 0.0, que não pode ser tratado como "sem frame anterior"
+    m = RiskModel(clock=lambda: 0.0)
+    m.update(True, 0.0)
+    m.update(True, 0.1)
+    assert m.seconds_on() == pytest.approx(0.1)
@@ -0,0 +1,17 @@
+import numpy as np
+
+from utils import ear_batch
+
+# olho de largura 4 e abertura 1: EAR = (1 + 1) / (2 * 4) = 0.25
+_EYE = [(0, 0), (1, 0.5), (3, 0.5), (4, 0), (3, -0.5), (1, -0.5)]
+
+
+def test_ear_batch_um_frame():
+    eyes = np.array(_EYE + [(x + 10, y) for x, y in _EYE])
+    assert abs(float(ear_batch(eyes)) - 0.25) < 1e-5
+
+
+def test_ear_batch_lote_media_dos_olhos():
+    fechado = [(x, y * 0.2) for x, y in _EYE]          # EAR 0.05
+    eyes = np.array([_EYE + _EYE, _EYE + fechado])
+    np.testing.assert_allclose(ear_batch(eyes), [0.25, 0.15], atol=1e-5)